@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Event loop lag and thread pool saturation monitor.
+
+A probe task sleeps `interval` seconds on the loop and measures how late it wakes up, sampling the anyio worker
+thread usage at the same time. A watchdog thread checks that the probe keeps running: when the loop is blocked for
+longer than `stall_threshold`, it captures the stack of the loop thread, i.e. the blocking frame, and logs it.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+
+import anyio.to_thread
+import numpy as np
+from loguru import logger
+
+from . import metrics
+
+
+@dataclass
+class EventLoopStall:
+    timestamp: float  # Wall clock time at which the stall was detected
+    seconds: float  # Blocked time: at detection, then the full stall once the loop runs again
+    stack: str  # Stack of the loop thread at detection
+
+
+@dataclass
+class LoopMonitorStats:
+    # Over the last minute
+    lag_seconds: float | None
+    max_lag_seconds: float | None
+    p99_lag_seconds: float | None
+    threadpool_in_flight: int
+    threadpool_queued: int
+    threadpool_capacity: int
+    stalls: int
+    recent_stalls: list[EventLoopStall] = field(default_factory=list)
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, stall_threshold: float, keep_stalls: int = 20):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self._lock = threading.Lock()
+        self._lags: deque[float] = deque(maxlen=max(1, int(60 / interval)))
+        self._stalls: deque[EventLoopStall] = deque(maxlen=keep_stalls)
+        self._stall_count = 0
+        self._in_flight = 0
+        self._queued = 0
+        self._capacity = 0
+        self._heartbeat = time.monotonic()
+        self._reported_heartbeat: float | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stopped = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Call from the monitored event loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop monitor started, stall threshold {self.stall_threshold * 1000:.0f} ms")
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    async def _probe(self) -> None:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        while True:
+            scheduled_at = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - scheduled_at - self.interval)
+            statistics = limiter.statistics()
+            with self._lock:
+                self._heartbeat = now
+                self._lags.append(lag)
+                self._in_flight = statistics.borrowed_tokens
+                self._queued = statistics.tasks_waiting
+                self._capacity = int(statistics.total_tokens)
+                if lag >= self.stall_threshold and self._reported_heartbeat is not None and len(self._stalls) > 0:
+                    # The stall reported by the watchdog is over: record its full duration
+                    self._stalls[-1].seconds = lag
+                    self._reported_heartbeat = None
+            metrics.EVENT_LOOP_LAG_SECONDS.observe(lag)
+            metrics.THREADPOOL_IN_FLIGHT.set(statistics.borrowed_tokens)
+            metrics.THREADPOOL_QUEUED.set(statistics.tasks_waiting)
+            metrics.THREADPOOL_CAPACITY.set(statistics.total_tokens)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.stall_threshold / 2):
+            with self._lock:
+                heartbeat = self._heartbeat
+                if heartbeat == self._reported_heartbeat:
+                    continue  # Stall already reported
+                blocked = time.monotonic() - heartbeat - self.interval
+                if blocked < self.stall_threshold:
+                    continue
+                self._reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)  # pylint: disable=protected-access
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            with self._lock:
+                self._stalls.append(EventLoopStall(timestamp=time.time(), seconds=blocked, stack=stack))
+                self._stall_count += 1
+            metrics.EVENT_LOOP_STALLS.inc()
+            logger.warning(f"Event loop blocked for {blocked * 1000:.0f} ms, blocking frame:\n{stack}")
+
+    def stats(self) -> LoopMonitorStats:
+        with self._lock:
+            lags = np.array(self._lags)
+            return LoopMonitorStats(
+                lag_seconds=float(lags[-1]) if len(lags) > 0 else None,
+                max_lag_seconds=float(lags.max()) if len(lags) > 0 else None,
+                p99_lag_seconds=float(np.percentile(lags, 99)) if len(lags) > 0 else None,
+                threadpool_in_flight=self._in_flight,
+                threadpool_queued=self._queued,
+                threadpool_capacity=self._capacity,
+                stalls=self._stall_count,
+                recent_stalls=[EventLoopStall(s.timestamp, s.seconds, s.stack) for s in self._stalls],
+            )
+
+
+_monitor: LoopMonitor | None = None
+
+
+def get_loop_monitor() -> LoopMonitor | None:
+    return _monitor
+
+
+async def start_loop_monitor(interval: float, stall_threshold: float) -> LoopMonitor:
+    global _monitor
+    _monitor = LoopMonitor(interval=interval, stall_threshold=stall_threshold)
+    _monitor.start()
+    return _monitor
+
+
+async def stop_loop_monitor() -> None:
+    global _monitor
+    if _monitor is not None:
+        await _monitor.stop()
+        _monitor = None
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Prometheus metrics of the auth and enroll pipelines.
+
+Stage timers and counters are labelled by the API endpoint (route template, e.g. `/v1/auth/`) serving the request
+and by the device (serial port). The endpoint comes from a context variable set by the `track_endpoint` dependency,
+it follows the request into the threadpool and into the device broker.
+"""
+
+import functools
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+
+from fastapi import Request
+from prometheus_client import Counter, Gauge, Histogram
+
+# Device round trips take seconds, DB lookups and matching take (sub-)milliseconds
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Label of the DB stages, which don't involve the device
+DB_DEVICE = "host-db"
+
+STAGE_SECONDS = Histogram(
+    "rsid_stage_seconds",
+    "Duration of the auth and enroll pipeline stages.",
+    ["stage", "endpoint", "device"],
+    buckets=_BUCKETS,
+)
+DEVICE_QUEUE_WAIT_SECONDS = Histogram(
+    "rsid_device_queue_wait_seconds",
+    "Time spent waiting for the device, held by other requests.",
+    ["endpoint", "device"],
+    buckets=_BUCKETS,
+)
+DEVICE_QUEUE_DEPTH = Gauge(
+    "rsid_device_queue_depth",
+    "Requests waiting for the device.",
+    ["device"],
+)
+AUTH_RESULTS = Counter(
+    "rsid_auth_results_total",
+    "Authentication results by status.",
+    ["status", "endpoint", "device"],
+)
+ENROLL_RESULTS = Counter(
+    "rsid_enroll_results_total",
+    "Enrollment results by status.",
+    ["status", "endpoint", "device"],
+)
+DEVICE_CONNECTS = Counter(
+    "rsid_device_connects_total",
+    "Serial sessions opened with the device, every operation reconnects.",
+    ["device", "result"],
+)
+DEVICE_QUERY_CACHE = Counter(
+    "rsid_device_query_cache_total",
+    "Device info and config queries: served from the cache (hit), sharing a call in flight (shared) or not (miss).",
+    ["query", "result"],
+)
+FACEPRINTS_CACHE_LOOKUPS = Counter(
+    "rsid_faceprints_cache_lookups_total",
+    "Faceprints cache lookups by result: hit (deserialized faceprints reused) or miss.",
+    ["result"],
+)
+FACEPRINTS_CACHE_MARSHAL_SECONDS = Counter(
+    "rsid_faceprints_cache_marshal_seconds_total",
+    "Time spent deserializing DB records into faceprints, on cache misses.",
+)
+FACEPRINTS_CACHE_SAVED_SECONDS = Counter(
+    "rsid_faceprints_cache_saved_seconds_total",
+    "Deserialization time saved by cache hits, estimated from the average cost of a miss.",
+)
+FACEPRINTS_CACHE_ENTRIES = Gauge(
+    "rsid_faceprints_cache_entries",
+    "Faceprints held by the cache.",
+)
+RECENT_MATCH_LOOKUPS = Counter(
+    "rsid_recent_match_lookups_total",
+    "Recent matches fast path lookups by result: hit (vector search skipped) or miss.",
+    ["result"],
+)
+RECENT_MATCH_ENTRIES = Gauge(
+    "rsid_recent_match_entries",
+    "Recently matched users held by the fast path cache.",
+)
+PREVIEW_FRAMES = Counter(
+    "rsid_preview_frames_total",
+    "Preview frames received from the device.",
+    ["device"],
+)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "rsid_event_loop_lag_seconds",
+    "How late the event loop runs a callback scheduled on time.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_STALLS = Counter(
+    "rsid_event_loop_stalls_total",
+    "Event loop stalls beyond the loop monitor threshold.",
+)
+THREADPOOL_IN_FLIGHT = Gauge(
+    "rsid_threadpool_in_flight",
+    "Calls running in the anyio worker threads (run_in_threadpool, sync endpoints).",
+)
+THREADPOOL_QUEUED = Gauge(
+    "rsid_threadpool_queued",
+    "Calls waiting for an anyio worker thread.",
+)
+THREADPOOL_CAPACITY = Gauge(
+    "rsid_threadpool_capacity",
+    "Number of anyio worker threads.",
+)
+SDK_LOG_MESSAGES = Counter(
+    "rsid_sdk_log_messages_total",
+    "SDK log messages: forwarded to the log, sampled out (repeated too often) or dropped (log queue full).",
+    ["result"],
+)
+WARMUP_STEP_SECONDS = Gauge(
+    "rsid_warmup_step_seconds",
+    "Duration of the last attempt of each warm-up step.",
+    ["step"],
+)
+WARMUP_READY = Gauge(
+    "rsid_warmup_ready",
+    "1 once all the warm-up steps succeeded.",
+)
+
+_endpoint: ContextVar[str] = ContextVar("rsid_metrics_endpoint", default="")
+
+
+def current_endpoint() -> str:
+    return _endpoint.get()
+
+
+def set_endpoint(endpoint: str) -> None:
+    _endpoint.set(endpoint)
+
+
+async def track_endpoint(request: Request) -> None:
+    """App dependency labelling the metrics recorded while serving the request."""
+    route = request.scope.get("route")
+    _endpoint.set(getattr(route, "path", ""))
+
+
+@contextmanager
+def stage(name: str, device: str | None) -> Iterator[None]:
+    """Time a pipeline stage. Failed stages are recorded too: a slow timeout is still time spent."""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(name, _endpoint.get(), device or "").observe(time.perf_counter() - started_at)
+
+
+def timed(name: str, device: str | None) -> Callable:
+    """`stage` decorator for coroutine functions."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with stage(name, device):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count_auth(status: Enum, device: str | None) -> None:
+    AUTH_RESULTS.labels(status.name, _endpoint.get(), device or "").inc()
+
+
+def count_enroll(status: Enum, device: str | None) -> None:
+    ENROLL_RESULTS.labels(status.name, _endpoint.get(), device or "").inc()
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+On-demand profiling of single requests, for dev and staging.
+
+A request carrying an `X-Profile` header is profiled: in dev (`profiling` setting) with any value, otherwise the
+value must be the `profiling_admin_key`. Profiles are stored under the request correlation id (`X-Request-ID`
+response header):
+- `<id>.pstats`: cProfile of the event loop thread, open with `python -m pstats` or snakeviz.
+- `<id>.folded`: stacks of all threads sampled while the request ran, which covers the worker threads of sync
+  endpoints and `run_in_threadpool` calls. Folded format, for flamegraph.pl or speedscope.
+
+Other requests served at the same time show up in both: profile on a quiet server.
+"""
+
+import cProfile
+import hmac
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from asgi_correlation_id import correlation_id
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_app_settings
+from .settings.base import ProfileFormatTypes
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_SUFFIXES = {ProfileFormatTypes.pstats: ".pstats", ProfileFormatTypes.folded: ".folded"}
+_PROFILE_ID = re.compile(r"^[A-Za-z0-9-]{1,64}$")
+
+
+def profiling_allowed(key: str | None) -> bool:
+    """True in dev, or when `key` is the admin key."""
+    settings = get_app_settings()
+    if settings.profiling:
+        return True
+    admin_key = settings.profiling_admin_key
+    return admin_key is not None and key is not None and hmac.compare_digest(key, admin_key)
+
+
+def valid_profile_id(profile_id: str) -> bool:
+    return _PROFILE_ID.match(profile_id) is not None
+
+
+class _StackSampler(threading.Thread):
+    """Samples the stacks of every thread, counting identical stacks."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                if ident == self.ident:
+                    continue
+                if frame.f_code.co_name == "select" and frame.f_code.co_filename.endswith("selectors.py"):
+                    continue  # Idle event loop
+                stack = []
+                idle = False
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_name == "get" and code.co_filename.endswith("queue.py"):
+                        idle = True  # Worker thread waiting for work
+                        break
+                    if code.co_name == "_watch" and code.co_filename.endswith("loop_monitor.py"):
+                        idle = True  # Loop monitor watchdog
+                        break
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if idle or len(stack) == 0:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                self.samples[";".join([names.get(ident, str(ident)), *reversed(stack)])] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class ProfilingMiddleware:
+    """Add it inside `CorrelationIdMiddleware`: profiles are named after the correlation id."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # cProfile profiles one request at a time
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        key = dict(scope["headers"]).get(PROFILE_HEADER)
+        if key is None or not profiling_allowed(key.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+        if not self._lock.acquire(blocking=False):
+            logger.warning("Profiling: another request is being profiled, not profiling this one")
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_app_settings()
+        status_code = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        sampler = _StackSampler(settings.profiling_sample_interval)
+        started_at = time.perf_counter()
+        try:
+            sampler.start()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+                sampler.stop()
+                seconds = time.perf_counter() - started_at
+                self._save(profiler, sampler, scope, status_code, seconds)
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _save(
+        profiler: cProfile.Profile, sampler: _StackSampler, scope: Scope, status_code: int | None, seconds: float
+    ) -> None:
+        settings = get_app_settings()
+        profile_id = correlation_id.get()
+        if profile_id is None or not valid_profile_id(profile_id):
+            logger.error("Profiling: no usable correlation id, profile dropped")
+            return
+        profiles_dir = Path(settings.profiling_dir)
+        profiles_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(profiles_dir / f"{profile_id}.pstats")
+        (profiles_dir / f"{profile_id}.folded").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in sampler.samples.most_common())
+        )
+        (profiles_dir / f"{profile_id}.json").write_text(json.dumps({
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "status_code": status_code,
+            "seconds": seconds,
+            "timestamp": time.time(),
+        }))
+        logger.info(f"Profiled {scope['method']} {scope['path']} in {seconds * 1000:.0f} ms: {profile_id}")
+        _prune(profiles_dir, settings.profiling_keep)
+
+
+def _prune(profiles_dir: Path, keep: int) -> None:
+    metas = sorted(profiles_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for meta in metas[keep:]:
+        for suffix in (".json", *PROFILE_SUFFIXES.values()):
+            meta.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict]:
+    """Captured profiles, most recent first."""
+    profiles_dir = Path(get_app_settings().profiling_dir)
+    if not profiles_dir.exists():
+        return []
+    profiles = []
+    for meta in profiles_dir.glob("*.json"):
+        try:
+            profiles.append(json.loads(meta.read_text()))
+        except (OSError, ValueError):
+            continue  # Pruned or being written
+    return sorted(profiles, key=lambda p: p["timestamp"], reverse=True)
+
+
+def profile_file(profile_id: str, profile_format: ProfileFormatTypes) -> Path | None:
+    if not valid_profile_id(profile_id):
+        return None
+    path = Path(get_app_settings().profiling_dir) / f"{profile_id}{PROFILE_SUFFIXES[profile_format]}"
+    return path if path.exists() else None
@@ -17,7 +17,8 @@
 from rsid_rest.core.settings.base import (
     ApplicationDBTypes,
     BaseAppSettings,
-    HostModeAuthTypes, StreamEncodingStypes,
+    HostModeAuthTypes, StreamEncodingStypes, HybridCandidateCutTypes, PreviewModeTypes, RsidBackendTypes,
+    WarmupStepTypes,
 )
 
 
@@ -35,12 +36,78 @@ class AppSettings(BaseAppSettings, validate_assignment=True):
     api_v1_prefix: str = "/v1"
 
     allowed_hosts: list[str] = ["*"]
+    """" Don't mount the web demo on `/gui/`: NiceGUI and the frontend are not imported, for a faster start. """
+    headless: bool = False
 
     # Device discovery and serial port configuration
     auto_detect: bool = True
     com_port: str | None = None
     preview_camera_number: int = -1  # -1 = auto-detect
 
+    # SDK backend
+    """" `device`: the rsid_py SDK and a connected F4xx module. `fake`: in-process fake SDK for tests and
+    benchmarks. """
+    rsid_backend: RsidBackendTypes = RsidBackendTypes.device
+    """" Fake backend: per-call latency overrides in seconds, e.g. {"authenticate": 0.3, "match_faceprints": 0.001}. """
+    rsid_fake_latencies: dict[str, float] = {}
+    """" Fake backend: seed of the synthetic faceprints. """
+    rsid_fake_seed: int = 0
+    """" Fake backend: identities presented to the camera in turn. Default: the enrolled users. """
+    rsid_fake_faces: list[str] = []
+
+    # Multi-worker deployment
+    """" Unix domain socket (named pipe on Windows) of the device broker. When set, HTTP workers forward the
+    serial port operations to the broker process, started with `poe broker`. """
+    device_broker_socket: Path | None = None
+    """" Shared secret authenticating the HTTP workers to the device broker, at least 16 characters. Required with
+    `device_broker_socket`: the broker unpickles the calls of authenticated clients. """
+    device_broker_authkey: str | None = None
+
+    # Metrics
+    """" Serve the auth/enroll pipeline stage timings and counters on `/metrics`, in Prometheus text format. """
+    metrics_enabled: bool = True
+    """" Device broker: port of its Prometheus endpoint. With a broker, the stage metrics are recorded there. """
+    metrics_broker_port: int | None = None
+    """" Sample the event loop lag and the worker threads usage, log the blocking frame of event loop stalls. """
+    loop_monitor: bool = True
+    """" Loop monitor sampling interval in seconds. """
+    loop_monitor_interval: Annotated[float, Field(gt=0)] = 0.1
+    """" Event loop stalls longer than this, in seconds, are logged with the stack of the blocking frame. """
+    loop_monitor_stall_threshold: Annotated[float, Field(gt=0)] = 0.25
+
+    # Device queries
+    """" Seconds the device info (serial number, firmware version) and config are cached. 0: no caching, concurrent
+    queries still share one device round trip. """
+    device_query_cache_ttl: Annotated[float, Field(ge=0)] = 300.0
+
+    # Warm-up
+    """" Run in the background at start, in this order: `/readyz` fails until they all succeeded. Empty: ready
+    right away. """
+    warmup_steps: list[WarmupStepTypes] = list(WarmupStepTypes)
+    """" Seconds between two attempts of failed warm-up steps, e.g. while the device is unplugged. """
+    warmup_retry_interval: Annotated[float, Field(gt=0)] = 5.0
+
+    # Health checks
+    """" Seconds between refreshes of the `/healthz` and `/readyz` responses: readiness and device queue depth. """
+    health_refresh_interval: Annotated[float, Field(gt=0)] = 1.0
+    """" Seconds between background device probes (serial number, firmware version). Each one takes the device for
+    a few hundred ms. """
+    health_device_probe_interval: Annotated[float, Field(gt=0)] = 30.0
+    """" Host DB mode: seconds between background DB probes (users count). """
+    health_db_probe_interval: Annotated[float, Field(gt=0)] = 30.0
+
+    # Request profiling
+    """" Profile requests carrying an `X-Profile` header, with any value. Enabled in dev. """
+    profiling: bool = False
+    """" Outside dev: profile requests whose `X-Profile` header is this key, and serve profiles to the same key. """
+    profiling_admin_key: str | None = None
+    """" Directory of the captured profiles. """
+    profiling_dir: Path = Path("profiles")
+    """" Number of profiles kept, the oldest ones are deleted. """
+    profiling_keep: Annotated[int, Field(ge=1)] = 50
+    """" Interval in seconds between stack samples of all threads. """
+    profiling_sample_interval: Annotated[float, Field(gt=0)] = 0.005
+
     # DB mode
     db_mode: ApplicationDBTypes = ApplicationDBTypes.device
 
@@ -53,14 +120,102 @@ class AppSettings(BaseAppSettings, validate_assignment=True):
     host_mode_hybrid_max_results: int | None = 10
     """" Vector DB threshold for searching. """
     host_mode_hybrid_score_threshold: float | None = 0.2
+    """" Adaptive candidate count: `gap` cuts at the largest score gap, `relative` keeps scores >= top-1 x threshold """
+    host_mode_hybrid_cut: HybridCandidateCutTypes = HybridCandidateCutTypes.none
+    """" Minimum number of candidates kept by the adaptive cut. """
+    host_mode_hybrid_min_results: Annotated[int, Field(ge=1)] = 1
+    """" `relative` cut: keep candidates scoring at least this fraction of the top-1 score. """
+    host_mode_hybrid_relative_threshold: Annotated[float, Field(gt=0, le=1)] = 0.9
+    """" JSONL file to log vector search scores and match outcomes to, for `poe calibrate-hybrid`. """
+    host_mode_hybrid_score_log: Path | None = None
+
+    # Vector index tuning (HNSW graph and quantization are only used by a Qdrant server)
+    """" HNSW edges per node. Higher improves recall at the cost of memory and indexing time. """
+    host_mode_hnsw_m: Annotated[int, Field(ge=4)] = 16
+    """" HNSW neighbours considered while building the index. """
+    host_mode_hnsw_ef_construct: Annotated[int, Field(ge=4)] = 100
+    """" HNSW neighbours considered while searching. Higher improves recall at the cost of latency. """
+    host_mode_hnsw_ef: Annotated[int, Field(ge=1)] = 128
+    """" Brute force search instead of HNSW. """
+    host_mode_exact_search: bool = False
+    """" Scalar int8 quantization of the faceprint vectors (4x less memory). """
+    host_mode_quantization: bool = False
+    """" Re-score quantized search results with the original vectors. """
+    host_mode_quantization_rescore: bool = True
+    """" Fetch `oversampling` x `host_mode_hybrid_max_results` quantized candidates before re-scoring. """
+    host_mode_quantization_oversampling: Annotated[float, Field(ge=1.0)] = 2.0
+    """" Keep the original vectors on disk (memory-mapped) instead of RAM. """
+    host_mode_vectors_on_disk: bool = False
+
+    # Faceprints cache
+    """" Memory budget (MB) for deserialized faceprints kept ready for matching. 0 disables the cache. """
+    host_mode_faceprints_cache_mb: Annotated[int, Field(ge=0)] = 64
+    """" Number of most frequently matched users loaded into the faceprints cache on startup. """
+    host_mode_faceprints_cache_prewarm: Annotated[int, Field(ge=0)] = 1000
+
+    # Matcher pool
+    """" Number of matcher worker processes, each holding a shard of the gallery. 0 matches in-process. """
+    host_mode_matcher_workers: Annotated[int, Field(ge=0)] = 0
+    """" Minimum number of candidates before a hybrid search result is matched in the worker pool. """
+    host_mode_matcher_pool_min_candidates: Annotated[int, Field(ge=1)] = 64
+
+    # Recently matched users fast path
+    """" Try the faceprints of recently authenticated users before searching the DB. """
+    host_mode_recent_matches: bool = True
+    """" Maximum number of recently authenticated users kept for the fast path. A miss matches against all of them. """
+    host_mode_recent_matches_size: Annotated[int, Field(ge=1)] = 32
+    """" Seconds a user stays in the fast path after the last successful authentication. """
+    host_mode_recent_matches_ttl: Annotated[float, Field(gt=0)] = 600.0
+
+    # Adaptive faceprints updates
+    """" Return authentication results before the adaptive faceprints update is written to the DB. """
+    host_mode_write_behind: bool = True
+    """" Seconds between write-behind flushes. """
+    host_mode_write_behind_flush_interval: Annotated[float, Field(gt=0)] = 1.0
+    """" Maximum number of users written per DB batch. """
+    host_mode_write_behind_batch_size: Annotated[int, Field(ge=1)] = 64
+    """" Minimum seconds between two persisted adaptive updates of the same user. """
+    host_mode_update_min_interval: Annotated[float, Field(ge=0)] = 300.0
+
+    # DB maintenance
+    """" Compact the local file DB storage during quiet hours. Rewrites qdrant-client's private sqlite storage. """
+    host_mode_maintenance: bool = False
+    """" Quiet hours (local time) during which maintenance may run, e.g. 02:00-05:00. May wrap around midnight. """
+    host_mode_maintenance_window: Annotated[str, Field(pattern=r"^\d{2}:\d{2}-\d{2}:\d{2}$")] = "02:00-05:00"
+    """" Seconds without authentication before maintenance starts blocking the DB. """
+    host_mode_maintenance_idle_seconds: Annotated[float, Field(ge=0)] = 60.0
+    """" Only compact storage files with at least this ratio of free pages. """
+    host_mode_maintenance_min_fragmentation: Annotated[float, Field(ge=0, le=1)] = 0.2
 
     # Preview and streaming configuration
+    """" Camera preview mode. 720p lowers the capture, decode and encode cost of every viewer. """
+    preview_mode: PreviewModeTypes = PreviewModeTypes.mjpeg_1080p
+    """" Width of the `thumbnail` preview variant. """
+    preview_thumbnail_width: Annotated[int, Field(ge=16)] = 384
     preview_jpeg_quality: Annotated[int, Field(ge=1, le=100)] = 80  # 1 - 100
     """ JPEG performance is better with TurboJPEG than WebP with OpenCV """
     preview_stream_type: StreamEncodingStypes = StreamEncodingStypes.jpeg
     preview_webp_quality: Annotated[int, Field(ge=1, le=100)] = 90  # 1 - 100
+    """" Seconds the preview keeps running after the last viewer left, reconnecting viewers skip the camera start. """
+    preview_keep_warm_seconds: Annotated[float, Field(ge=0)] = 10.0
+    """" Start the preview with the server and never stop it. """
+    preview_always_on: bool = False
+    """" Publish raw preview frames into a shared memory ring for consumers on the same host. """
+    preview_shm_ring: bool = False
+    """" Shared memory name of the preview frame ring. """
+    preview_shm_name: str = "rsid_preview"
+    """" Frames kept in the ring: readers have this many frame intervals to process a frame. """
+    preview_shm_slots: Annotated[int, Field(ge=2, le=16)] = 3
+    """" Max frame size in bytes, larger frames are not published. Default fits 1080p RGB. """
+    preview_shm_slot_size: Annotated[int, Field(ge=1)] = 1920 * 1080 * 3
+    """" Seconds without heartbeat before a ring subscriber no longer keeps the preview running. """
+    preview_shm_subscriber_timeout: Annotated[float, Field(gt=0)] = 5.0
 
     logging_level: int = logging.INFO
+    """" SDK messages waiting to be logged, beyond that they are dropped rather than block the SDK thread. """
+    sdk_log_queue_size: Annotated[int, Field(ge=1)] = 1000
+    """" Times per second an SDK message is logged, repeats beyond that are counted and summarized. 0 logs all. """
+    sdk_log_sample_rate: Annotated[int, Field(ge=0)] = 10
     loggers: list[str] = ["uvicorn.asgi", "uvicorn.access", "authlib"]
 
     @property
@@ -14,6 +14,11 @@ class AppEnvTypes(Enum):
     test: str = "test"
 
 
+class RsidBackendTypes(Enum):
+    device: str = "device"
+    fake: str = "fake"
+
+
 class ApplicationDBTypes(Enum):
     device: str = "device"
     host: str = "host"
@@ -24,6 +29,35 @@ class HostModeAuthTypes(Enum):
     device: str = "device"
 
 
+class HybridCandidateCutTypes(Enum):
+    none: str = "none"
+    gap: str = "gap"
+    relative: str = "relative"
+
+
+class PreviewModeTypes(Enum):
+    mjpeg_1080p: str = "mjpeg_1080p"
+    mjpeg_720p: str = "mjpeg_720p"
+
+
+class PreviewVariantTypes(Enum):
+    full: str = "full"
+    p720: str = "720p"
+    thumbnail: str = "thumbnail"
+
+
+class WarmupStepTypes(Enum):
+    port_discovery: str = "port_discovery"
+    db: str = "db"
+    encoders: str = "encoders"
+    device: str = "device"
+
+
+class ProfileFormatTypes(Enum):
+    pstats: str = "pstats"
+    folded: str = "folded"
+
+
 class StreamEncodingStypes(Enum):
     jpeg: str = "jpeg"
     webp: str = "webp"
@@ -19,6 +19,7 @@ class DevAppSettings(AppSettings, validate_assignment=True):
     title: str = "Dev RealSenseID API"
     debug: bool = True
     logging_level: int = logging.DEBUG
+    profiling: bool = True
 
     # Device discovery and serial port configuration
     auto_detect: bool = True
@@ -6,20 +6,30 @@
 from pathlib import Path
 
 from asgi_correlation_id import CorrelationIdMiddleware
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 # from fastapi.middleware.gzip import GZipMiddleware # TODO
 from fastapi.responses import FileResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from rsid_rest.core import metrics
+from rsid_rest.core.loop_monitor import start_loop_monitor, stop_loop_monitor
+from rsid_rest.core.profiling import ProfilingMiddleware
 from rsid_rest.core.config import get_app_settings
 from rsid_rest.core.exception import http422_error_handler, unhandled_exception_handler
-from rsid_rest.frontend import demo
+from rsid_rest.core.settings.base import ApplicationDBTypes
 from rsid_rest.routers.v1.auth import router as auth_router
+from rsid_rest.routers.v1.debug import router as debug_router
 from rsid_rest.routers.v1.device import router as device_router
+from rsid_rest.routers.v1.match import router as match_router
 from rsid_rest.routers.v1.preview import router as preview_router
 from rsid_rest.routers.v1.users import router as users_router
 from rsid_rest.routers.v1.utility import router as utility_router
+from rsid_rest.rsid_lib.health import NOT_STARTED, get_health_prober, start_health_prober, stop_health_prober
+from rsid_rest.rsid_lib.models import HealthResponse, ReadinessResponse
+from rsid_rest.rsid_lib.rsid_api_wrapper import RSIDApiWrapper
+from rsid_rest.rsid_lib.warmup import start_warmup, stop_warmup
 
 
 @asynccontextmanager
@@ -27,7 +37,23 @@ async def lifespan(
     # pylint: disable=unused-argument
     application: FastAPI,
 ):
+    settings = get_app_settings()
+    if settings.loop_monitor:
+        await start_loop_monitor(settings.loop_monitor_interval, settings.loop_monitor_stall_threshold)
+    # With a device broker too: the workers own the host DB, the broker only serves the serial port
+    host_mode = settings.db_mode == ApplicationDBTypes.host
+    if host_mode:
+        await RSIDApiWrapper().startup()
+    start_warmup(settings.warmup_steps, settings.warmup_retry_interval)
+    start_health_prober(
+        settings.health_refresh_interval, settings.health_device_probe_interval, settings.health_db_probe_interval
+    )
     yield
+    await stop_health_prober()
+    await stop_warmup()
+    if host_mode:
+        await RSIDApiWrapper().shutdown()
+    await stop_loop_monitor()
 
 
 def get_application() -> FastAPI:
@@ -37,6 +63,7 @@ def get_application() -> FastAPI:
 
     args = settings.fastapi_kwargs
     args["lifespan"] = lifespan
+    args["dependencies"] = [Depends(metrics.track_endpoint)]
     application = FastAPI(**args)
 
     application.add_middleware(
@@ -48,6 +75,9 @@ def get_application() -> FastAPI:
     )
     # TODO: Add this back after we remove it from the preview stream
     # application.add_middleware(GZipMiddleware, minimum_size=1000)
+    if settings.profiling or settings.profiling_admin_key is not None:
+        # Inside CorrelationIdMiddleware: profiles are named after the request id
+        application.add_middleware(ProfilingMiddleware)
     application.add_middleware(
         CorrelationIdMiddleware,
         header_name="X-Request-ID",
@@ -60,8 +90,41 @@ def get_application() -> FastAPI:
     application.include_router(router=users_router, prefix=settings.api_v1_prefix)
     application.include_router(router=device_router, prefix=settings.api_v1_prefix)
     application.include_router(router=auth_router, prefix=settings.api_v1_prefix)
+    application.include_router(router=match_router, prefix=settings.api_v1_prefix)
     application.include_router(router=preview_router, prefix=settings.api_v1_prefix)
     application.include_router(router=utility_router, prefix=settings.api_v1_prefix)
+    application.include_router(router=debug_router, prefix=settings.api_v1_prefix)
+
+    if settings.metrics_enabled:
+        @application.get("/metrics", include_in_schema=False)
+        def prometheus_metrics():
+            return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    @application.get(
+        "/healthz",
+        name="app:healthz",
+        summary="Liveness, with the device and host DB state of the last background probes",
+        description="Never touches the device: the response is refreshed in the background.",
+        response_class=Response,
+        responses={"200": {"model": HealthResponse}},
+    )
+    async def healthz():
+        prober = get_health_prober()
+        status_code, content = NOT_STARTED if prober is None else prober.healthz
+        return Response(content=content, status_code=status_code, media_type="application/json")
+
+    @application.get(
+        "/readyz",
+        name="app:readyz",
+        summary="Readiness: 200 once warmed up, with the device reachable and the host DB readable, 503 otherwise",
+        description="Never touches the device: the response is refreshed in the background.",
+        response_class=Response,
+        responses={"200": {"model": ReadinessResponse}, "503": {"model": ReadinessResponse}},
+    )
+    async def readyz():
+        prober = get_health_prober()
+        status_code, content = NOT_STARTED if prober is None else prober.readyz
+        return Response(content=content, status_code=status_code, media_type="application/json")
 
     return application
 
@@ -85,4 +148,7 @@ async def favicon():
         raise HTTPException(status_code=404, detail="")
 
 
-demo.init(app)
+if not get_app_settings().headless:
+    from rsid_rest.frontend import demo
+
+    demo.init(app)
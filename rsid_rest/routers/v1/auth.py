@@ -4,7 +4,7 @@
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from loguru import logger
 
 from rsid_rest.core.config import get_app_settings
@@ -48,13 +48,21 @@
 async def auth(
     response: Response,
     api_wrapper: Annotated[RSIDApiWrapper, Depends(get_rsid_api)],
+    zone: Annotated[
+        str | None,
+        Query(max_length=100, min_length=1, description="Only match users enrolled in this group/zone (host mode)"),
+    ] = None,
 ) -> AuthenticationResponse:
+    if zone is not None and get_app_settings().db_mode == ApplicationDBTypes.device:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="`zone` is only supported in host DB mode"
+        )
     try:
         result: AuthenticationResponse
         if get_app_settings().db_mode == ApplicationDBTypes.device:
             result = await api_wrapper.auth()
         else:
-            result = await api_wrapper.auth_host()
+            result = await api_wrapper.auth_host(zone=zone)
         response.status_code = status.HTTP_200_OK
         if result.status != AuthenticateStatusEnum.Success:
             result.user_id = None  # Ensure we pass null instead of empty string
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from rsid_rest.core.config import get_app_settings
+from rsid_rest.core.loop_monitor import get_loop_monitor
+from rsid_rest.core.profiling import list_profiles, profile_file, profiling_allowed
+from rsid_rest.core.settings.base import ProfileFormatTypes
+from rsid_rest.rsid_lib.models import EventLoopStatsResponse, ProfileInfoModel
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["debug"],
+)
+
+
+def profiling_access(x_admin_key: Annotated[str | None, Header()] = None) -> None:
+    settings = get_app_settings()
+    if not settings.profiling and settings.profiling_admin_key is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    if not profiling_allowed(x_admin_key):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin key")
+
+
+@router.get(
+    "/event-loop/",
+    name="v1:debug:event-loop",
+    summary="Event loop lag, worker threads usage and recent event loop stalls with their blocking frame",
+    responses={
+        "404": {"description": "Not Found - the loop monitor is disabled (`loop_monitor` setting)."},
+    },
+)
+async def event_loop_stats() -> EventLoopStatsResponse:
+    monitor = get_loop_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loop monitor is disabled")
+    return EventLoopStatsResponse(**dataclasses.asdict(monitor.stats()))
+
+
+@router.get(
+    "/profiles/",
+    name="v1:debug:profiles",
+    summary="Requests profiled with an `X-Profile` header, most recent first",
+    description="Available in dev, or with the `profiling_admin_key` in the `X-Admin-Key` header.",
+    dependencies=[Depends(profiling_access)],
+)
+def profiles() -> list[ProfileInfoModel]:
+    return [ProfileInfoModel(**profile) for profile in list_profiles()]
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    name="v1:debug:profile",
+    summary="Download a profile: cProfile stats of the event loop thread, or sampled stacks of all threads",
+    description="`pstats`: open with `python -m pstats` or snakeviz. "
+                "`folded`: folded stacks for flamegraph.pl or speedscope.",
+    dependencies=[Depends(profiling_access)],
+    response_class=FileResponse,
+)
+def profile(
+    profile_id: str,
+    profile_format: Annotated[ProfileFormatTypes, Query(alias="format")] = ProfileFormatTypes.pstats,
+) -> FileResponse:
+    path = profile_file(profile_id, profile_format)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No profile {profile_id}")
+    return FileResponse(path, filename=path.name, media_type="application/octet-stream")
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from loguru import logger
+
+from rsid_rest.core.config import get_app_settings
+from rsid_rest.core.settings.base import ApplicationDBTypes
+from rsid_rest.rsid_lib.gen.models import AuthenticateStatusEnum
+from rsid_rest.rsid_lib.models import MatchBatchRequest, MatchBatchResponse, MatchResult
+from rsid_rest.rsid_lib.rsid_api_wrapper import RSIDApiWrapper, get_rsid_api
+
+router = APIRouter(
+    prefix="/match",
+    tags=["auth"],
+)
+
+
+@router.post(
+    "/batch",
+    name="v1:match:batch",
+    summary="Match faceprints extracted by remote devices against the host database",
+    responses={
+        "422": {
+            "description": "Unprocessable Entity - not supported in device DB mode or matching error.",
+            "content": {
+                "application/json": {
+                    "schema": {"$ref": "#/components/schemas/HTTPValidationError"},
+                }
+            },
+        },
+    },
+)
+async def match_batch(
+    request: MatchBatchRequest,
+    api_wrapper: Annotated[RSIDApiWrapper, Depends(get_rsid_api)],
+) -> MatchBatchResponse:
+    if get_app_settings().db_mode == ApplicationDBTypes.device:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Batch matching is only supported in host DB mode"
+        )
+    try:
+        best_matches = await api_wrapper.match_batch(
+            [item.to_rsid_py() for item in request.items], zone=request.zone
+        )
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY) from e
+
+    results = []
+    for item, best_match in zip(request.items, best_matches, strict=True):
+        if best_match is None:
+            results.append(
+                MatchResult(
+                    id=item.id, status=AuthenticateStatusEnum.Forbidden, user_id=None, score=None, should_update=False
+                )
+            )
+        else:
+            results.append(
+                MatchResult(
+                    id=item.id,
+                    status=AuthenticateStatusEnum.Success,
+                    user_id=best_match.user_id,
+                    score=best_match.score,
+                    should_update=best_match.should_update,
+                )
+            )
+    return MatchBatchResponse(results=results)
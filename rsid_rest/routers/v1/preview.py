@@ -2,13 +2,16 @@
 # Copyright (C) 2018-2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 
+import dataclasses
 import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from loguru import logger
 from starlette.responses import StreamingResponse
 
+from rsid_rest.core.settings.base import PreviewVariantTypes
+from rsid_rest.rsid_lib.models import PreviewStatsResponse
 from rsid_rest.rsid_lib.rsid_api_wrapper import RSIDApiWrapper, get_rsid_api
 
 router = APIRouter(
@@ -39,6 +42,10 @@
 def stream(
     request: Request,
     api_wrapper: Annotated[RSIDApiWrapper, Depends(get_rsid_api)],
+    variant: Annotated[
+        PreviewVariantTypes,
+        Query(description="Resolution: `full` (camera resolution), `720p` or `thumbnail` (small, cheaper to serve)"),
+    ] = PreviewVariantTypes.full,
 ) -> StreamingResponse:
     try:
         ticket: uuid.UUID = uuid.uuid4()
@@ -47,7 +54,7 @@ def stream(
         # https://github.com/tiangolo/fastapi/discussions/10104#discussioncomment-6785703
 
         response = StreamingResponse(
-            api_wrapper.stream(ticket),
+            api_wrapper.stream(ticket, variant),
             status_code=status.HTTP_206_PARTIAL_CONTENT,
             media_type="multipart/x-mixed-replace;boundary=frame",
         )
@@ -56,3 +63,14 @@ def stream(
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY) from e
+
+
+@router.get(
+    "/stats/",
+    name="v1:preview:stats",
+    summary="Preview lifecycle: subscribers, start latency and time to first frame",
+)
+def stats(
+    api_wrapper: Annotated[RSIDApiWrapper, Depends(get_rsid_api)],
+) -> PreviewStatsResponse:
+    return PreviewStatsResponse(**dataclasses.asdict(api_wrapper.query_preview_stats()))
@@ -14,18 +14,25 @@
     File,
     HTTPException,
     Query,
+    Request,
     Response,
     UploadFile,
     status,
 )
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from loguru import logger
 
 from rsid_rest.core.config import get_app_settings
 from rsid_rest.core.settings.base import ApplicationDBTypes
+from rsid_rest.rsid_lib import faceprints_transfer
 from rsid_rest.rsid_lib.gen.models import EnrollStatusEnum, StatusEnum
 from rsid_rest.rsid_lib.models import (
+    BulkDeleteRequest,
+    BulkDeleteResponse,
     CommonOperationResponse,
     EnrollResponse,
+    ImportResponse,
     UsersQueryResponse,
 )
 from rsid_rest.rsid_lib.rsid_api_wrapper import RSIDApiWrapper, get_rsid_api
@@ -72,13 +79,17 @@ async def enroll(
     response: Response,
     api_wrapper: Annotated[RSIDApiWrapper, Depends(get_rsid_api)],
     user_id: Annotated[str, Query(max_length=100, min_length=1)],
+    groups: Annotated[
+        list[str] | None,
+        Query(description="Groups/zones the user belongs to, used to scope authentication (host mode)"),
+    ] = None,
 ) -> EnrollResponse:
     try:
         result: EnrollResponse
         if get_app_settings().db_mode == ApplicationDBTypes.device:
             result = await api_wrapper.enroll(user_id=user_id)
         else:
-            result = await api_wrapper.enroll_host(user_id=user_id)
+            result = await api_wrapper.enroll_host(user_id=user_id, groups=groups)
         response.status_code = status.HTTP_201_CREATED
 
         if result.status != EnrollStatusEnum.Success:
@@ -130,6 +141,10 @@ async def enroll_image(
             alias_priority=1,
         ),
     ],
+    groups: Annotated[
+        list[str] | None,
+        Query(description="Groups/zones the user belongs to, used to scope authentication (host mode)"),
+    ] = None,
 ) -> EnrollResponse:
     async def delete_temp_uploads(uploaded_file: Path | None) -> None:
         if uploaded_file is not None and uploaded_file.exists():
@@ -158,7 +173,7 @@ async def delete_temp_uploads(uploaded_file: Path | None) -> None:
         if get_app_settings().db_mode == ApplicationDBTypes.device:
             result = await api_wrapper.enroll_image(user_id=user_id, file_path=temp_path)
         else:
-            result = await api_wrapper.enroll_host_image(user_id=user_id, file_path=temp_path)
+            result = await api_wrapper.enroll_host_image(user_id=user_id, file_path=temp_path, groups=groups)
         response.status_code = status.HTTP_201_CREATED
 
         if result.status != EnrollStatusEnum.Success:
@@ -206,15 +221,15 @@ async def query_users(
 
 
 @router.delete("/clear-all/", name="v1:users:remove_all_users")
-def remove_all_users(
+async def remove_all_users(
     response: Response,
     api_wrapper: Annotated[RSIDApiWrapper, Depends(get_rsid_api)]
 ) -> CommonOperationResponse:
     try:
         if get_app_settings().db_mode == ApplicationDBTypes.device:
-            api_wrapper.remove_all_users()
+            await run_in_threadpool(api_wrapper.remove_all_users)
         else:
-            raise RuntimeError("Not implemented.")
+            await api_wrapper.remove_all_host_users()
         response.status_code = status.HTTP_200_OK
         return CommonOperationResponse(message="Ok", status=StatusEnum.Ok)
     except Exception as e:
@@ -222,6 +237,150 @@ def remove_all_users(
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY) from e
 
 
+@router.post(
+    "/bulk-delete",
+    name="v1:users:bulk_delete",
+    summary="Remove several users from the host database at once",
+    responses={
+        "422": {
+            "description": "Unprocessable Entity - not supported in device DB mode or DB error.",
+            "content": {
+                "application/json": {
+                    "schema": {"$ref": "#/components/schemas/HTTPValidationError"},
+                }
+            },
+        },
+    },
+)
+async def bulk_delete(
+    request: BulkDeleteRequest,
+    api_wrapper: Annotated[RSIDApiWrapper, Depends(get_rsid_api)],
+) -> BulkDeleteResponse:
+    if get_app_settings().db_mode == ApplicationDBTypes.device:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Bulk delete is only supported in host DB mode"
+        )
+    try:
+        not_found = await api_wrapper.remove_host_users(user_ids=request.user_ids)
+        return BulkDeleteResponse(
+            status=StatusEnum.Ok,
+            deleted=[user_id for user_id in request.user_ids if user_id not in not_found],
+            not_found=not_found,
+        )
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY) from e
+
+
+def _require_host_mode() -> None:
+    if get_app_settings().db_mode == ApplicationDBTypes.device:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Only supported in host DB mode"
+        )
+
+
+@router.get(
+    "/export",
+    name="v1:users:export",
+    summary="Stream the host database users, faceprints and metadata for migration",
+    response_class=StreamingResponse,
+    responses={
+        "200": {
+            "description": "NDJSON or length-prefixed binary stream, see `rsid_lib/faceprints_transfer.py`.",
+            "content": {faceprints_transfer.NDJSON_MEDIA_TYPE: {}, faceprints_transfer.BINARY_MEDIA_TYPE: {}},
+        },
+    },
+)
+async def export_users(
+    api_wrapper: Annotated[RSIDApiWrapper, Depends(get_rsid_api)],
+    export_format: Annotated[str, Query(alias="format", pattern="^(ndjson|binary)$")] = "ndjson",
+    cursor: Annotated[str | None, Query(description="Resume from a cursor of a previous export")] = None,
+    page_size: Annotated[int, Query(ge=1, le=100_000)] = 10_000,
+) -> StreamingResponse:
+    _require_host_mode()
+    if export_format == "ndjson":
+        encode_record = faceprints_transfer.encode_ndjson_record
+        encode_cursor = faceprints_transfer.encode_ndjson_cursor
+        media_type = faceprints_transfer.NDJSON_MEDIA_TYPE
+    else:
+        encode_record = faceprints_transfer.encode_binary_record
+        encode_cursor = faceprints_transfer.encode_binary_cursor
+        media_type = faceprints_transfer.BINARY_MEDIA_TYPE
+
+    async def content():
+        # One chunk per page: few large writes are much cheaper than one write per record
+        chunk = bytearray()
+        async for kind, item in api_wrapper.export_host_users(cursor, page_size):
+            if kind == "record":
+                chunk += encode_record(item)
+            else:
+                chunk += encode_cursor(item)
+                yield bytes(chunk)
+                chunk.clear()
+
+    return StreamingResponse(content(), media_type=media_type)
+
+
+@router.post(
+    "/import",
+    name="v1:users:import",
+    summary="Upsert users from an export stream (`application/x-ndjson` or `application/octet-stream`)",
+    responses={
+        "422": {
+            "description": "Unprocessable Entity - not supported in device DB mode or invalid stream.",
+            "content": {
+                "application/json": {
+                    "schema": {"$ref": "#/components/schemas/HTTPValidationError"},
+                }
+            },
+        },
+    },
+)
+async def import_users(
+    request: Request,
+    response: Response,
+    api_wrapper: Annotated[RSIDApiWrapper, Depends(get_rsid_api)],
+    dedupe: Annotated[
+        bool,
+        Query(description="Skip users whose `user_id` is already in the DB. Without it, duplicate users are created"),
+    ] = True,
+    batch_size: Annotated[int, Query(ge=1, le=100_000)] = 10_000,
+) -> ImportResponse:
+    _require_host_mode()
+    if request.headers.get("content-type", "").startswith(faceprints_transfer.BINARY_MEDIA_TYPE):
+        items = faceprints_transfer.decode_binary(request.stream())
+    else:
+        items = faceprints_transfer.decode_ndjson(request.stream())
+
+    imported = received = 0
+    cursor: str | None = None
+    batch: list[dict] = []
+    try:
+        async for kind, item in items:
+            if kind == "record":
+                batch.append(item)
+                received += 1
+                if len(batch) >= batch_size:
+                    imported += await api_wrapper.import_host_users(batch, dedupe=dedupe)
+                    batch = []
+            else:
+                # Everything before a cursor entry is imported once the pending batch is written
+                if len(batch) > 0:
+                    imported += await api_wrapper.import_host_users(batch, dedupe=dedupe)
+                    batch = []
+                cursor = item
+        if len(batch) > 0:
+            imported += await api_wrapper.import_host_users(batch, dedupe=dedupe)
+    except Exception as e:
+        logger.error(f"Import failed after {imported} user(s), last cursor {cursor}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Import failed after {imported} user(s), resume the export from cursor {cursor}",
+        ) from e
+    response.status_code = status.HTTP_200_OK
+    return ImportResponse(status=StatusEnum.Ok, imported=imported, skipped=received - imported, cursor=cursor)
+
+
 @router.delete("/{user_id}", name="v1:users:remove_user_by_id")
 async def remove_user(
     response: Response,
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import sys
+
+from ..core.config import get_app_settings
+from ..core.settings.base import RsidBackendTypes
+
+if get_app_settings().rsid_backend == RsidBackendTypes.fake:
+    # Must happen before any module imports rsid_py
+    from . import fake_rsid_py
+
+    fake_rsid_py.device.configure(
+        latencies=get_app_settings().rsid_fake_latencies,
+        seed=get_app_settings().rsid_fake_seed,
+        faces=get_app_settings().rsid_fake_faces or None,
+    )
+    sys.modules["rsid_py"] = fake_rsid_py
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import atexit
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from ..core.settings.base import HybridCandidateCutTypes
+
+
+def adaptive_candidate_count(
+    scores: list[float],
+    cut: HybridCandidateCutTypes,
+    min_results: int,
+    max_results: int,
+    relative_threshold: float,
+) -> int:
+    """
+    Number of vector search candidates (sorted by descending score) worth sending to the matcher.
+
+    `gap` cuts after the largest drop between two consecutive scores, `relative` keeps the candidates scoring at
+    least `relative_threshold` x the top-1 score. The result is always within [min_results, max_results].
+    """
+    count = len(scores)
+    upper = min(count, max_results)
+    lower = min(upper, min_results)
+    if upper <= lower or cut == HybridCandidateCutTypes.none:
+        return upper
+    if cut == HybridCandidateCutTypes.gap:
+        gaps = [scores[i - 1] - scores[i] for i in range(lower, upper)]
+        if len(gaps) == 0 or max(gaps) <= 0:
+            return upper
+        return lower + gaps.index(max(gaps))
+    kept = sum(1 for score in scores[:upper] if score >= scores[0] * relative_threshold)
+    return max(lower, kept)
+
+
+class HybridScoreLog:
+    """
+    Appends one JSON line per hybrid authentication: the vector search scores, how many candidates were matched and
+    the rank of the matched user (null if no match). Replayed offline by `poe calibrate-hybrid`.
+
+    `write()` only enqueues, a background thread appends to the file: the event loop never waits for the disk. Lines
+    arriving while `queue_size` lines are pending are dropped and counted.
+    """
+
+    def __init__(self, file_path: Path, queue_size: int = 1000):
+        self.file_path = file_path
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="hybrid-score-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def write(self, scores: list[float], candidates: int, matched_rank: int | None) -> None:
+        try:
+            self._queue.put_nowait({"ts": time.time(), "scores": scores, "candidates": candidates,
+                                    "matched": matched_rank})
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            entries = [self._queue.get()]
+            while not self._queue.empty():  # Batch what accumulated while writing
+                entries.append(self._queue.get_nowait())
+            stop = None in entries
+            lines = "".join(json.dumps(entry) + "\n" for entry in entries if entry is not None)
+            try:
+                with open(self.file_path, "a") as f:
+                    f.write(lines)
+            except OSError as e:
+                logger.warning(f"Unable to write hybrid score log {self.file_path}: {e}")
+            if stop:
+                return
+
+    def stop(self) -> None:
+        """Write the pending lines and stop."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Device broker for multi-worker deployments.
+
+The broker is a single process owning the serial device(s). It serves the `RSIDApiWrapper` methods opening a serial
+session (`BROKER_METHODS`) over a Unix domain socket (a named pipe on Windows), authenticated with
+`device_broker_authkey`, and publishes the preview frames in the shared memory frame ring. HTTP workers use a
+`BrokerClient` instead of the wrapper: the host DB, its caches, matching and preview encoding run in the workers and
+scale with them, while device access stays serialized in the broker.
+
+Start it with `poe broker` and run the HTTP server with the same `device_broker_socket` and `device_broker_authkey`.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+from collections.abc import AsyncIterator, Callable
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from multiprocessing.reduction import ForkingPickler
+from pathlib import Path
+from typing import Any
+
+import rsid_py
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+from prometheus_client import start_http_server
+
+from ..core import metrics
+from ..core.config import get_app_settings
+from .host_db_base import faceprints_from_payload, faceprints_to_payload
+
+# Wrapper methods served by the broker: the ones using the serial port. The others run in the HTTP workers.
+BROKER_METHODS = frozenset({
+    "auth",
+    "enroll",
+    "enroll_image_pixels",
+    "extract_faceprints_for_auth",
+    "extract_faceprints_for_enroll",
+    "extract_image_faceprints_for_enroll",
+    "query_users",
+    "remove_user",
+    "remove_all_users",
+    "query_device_info",
+    "query_device_config",
+    "update_device_config",
+    "query_device_queue_depth",
+    "query_update_status",
+    "query_fw_update_status",
+})
+# Shorter keys are easy to guess: the socket unpickles what authenticated clients send
+_MIN_AUTHKEY_LENGTH = 16
+
+
+def _broker_methods() -> dict[str, Callable]:
+    from .rsid_api_wrapper import RSIDApiWrapper
+
+    return {name: getattr(RSIDApiWrapper, name) for name in BROKER_METHODS}
+
+
+def _authkey() -> bytes:
+    authkey = get_app_settings().device_broker_authkey
+    if authkey is None or len(authkey) < _MIN_AUTHKEY_LENGTH:
+        raise RuntimeError(
+            f"Misconfigured: device_broker_socket requires a device_broker_authkey of at least {_MIN_AUTHKEY_LENGTH} "
+            "characters, shared by the broker and the HTTP workers, e.g. `python -c \"import secrets; "
+            "print(secrets.token_urlsafe(32))\"`."
+        )
+    return authkey.encode()
+
+
+def _extracted_from_state(flags: int, version: int, features_type: int, features: list[int]):
+    extracted = rsid_py.ExtractedFaceprintsElement()
+    extracted.flags = flags
+    extracted.version = version
+    extracted.features_type = features_type
+    extracted.features = features
+    return extracted
+
+
+# Connections pickle with ForkingPickler: teach it the SDK types crossing the socket, wherever they are nested
+ForkingPickler.register(
+    rsid_py.ExtractedFaceprintsElement,
+    lambda e: (_extracted_from_state, (e.flags, e.version, e.features_type, e.features)),
+)
+ForkingPickler.register(rsid_py.Faceprints, lambda f: (faceprints_from_payload, (faceprints_to_payload(f),)))
+
+
+def _sendable_error(e: Exception) -> Exception:
+    # SDK exceptions don't always survive pickling, keep the message at least
+    return e if type(e).__module__ == "builtins" else RuntimeError(f"{type(e).__name__}: {e}")
+
+
+_is_broker_process = False
+
+
+def use_broker() -> bool:
+    """True in HTTP workers of a deployment with a device broker."""
+    return get_app_settings().device_broker_socket is not None and not _is_broker_process
+
+
+def is_broker_process() -> bool:
+    return _is_broker_process
+
+
+class DeviceBroker:
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._methods = _broker_methods()
+        self._loop = asyncio.new_event_loop()
+
+    def serve_forever(self) -> None:
+        from .rsid_api_wrapper import RSIDApiWrapper
+
+        threading.Thread(target=self._loop.run_forever, name="broker-loop", daemon=True).start()
+        RSIDApiWrapper()  # Creates the preview frame ring before the workers attach to it
+        if os.name != "nt":
+            Path(self.address).unlink(missing_ok=True)
+        listener = Listener(self.address, authkey=self.authkey)
+        if os.name != "nt":
+            os.chmod(self.address, 0o600)
+        logger.info(f"Device broker listening on {self.address}")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, OSError) as e:  # Wrong authkey or the client went away
+                    logger.warning(f"Device broker: rejected connection: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _serve_connection(self, conn: Connection) -> None:
+        from .rsid_api_wrapper import get_rsid_api
+
+        with conn:
+            while True:
+                try:
+                    name, args, kwargs, endpoint = conn.recv()
+                except (EOFError, OSError):
+                    return
+                # Metrics recorded here are labelled with the endpoint the worker is serving
+                metrics.set_endpoint(endpoint)
+                method = self._methods.get(name)
+                if method is None:
+                    conn.send(("error", AttributeError(f"Device broker: no method {name}")))
+                    continue
+                try:
+                    bound = getattr(get_rsid_api(), name)
+                    if inspect.isasyncgenfunction(method):
+                        self._stream(conn, bound(*args, **kwargs))
+                        continue
+                    if inspect.iscoroutinefunction(method):
+                        result = asyncio.run_coroutine_threadsafe(bound(*args, **kwargs), self._loop).result()
+                    else:
+                        result = bound(*args, **kwargs)
+                    conn.send(("ok", result))
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    conn.send(("error", _sendable_error(e)))
+
+    @staticmethod
+    def _stream(conn: Connection, generator: AsyncIterator) -> None:
+        # Streams (preview, export) run on their own loop: the preview generator blocks while waiting for frames.
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    item = loop.run_until_complete(generator.__anext__())
+                except StopAsyncIteration:
+                    conn.send(("end", None))
+                    return
+                try:
+                    conn.send(("item", item))
+                except OSError:
+                    # Client is gone: same as a cancelled HTTP response, let the generator clean up.
+                    try:
+                        loop.run_until_complete(generator.athrow(asyncio.CancelledError()))
+                    except (StopAsyncIteration, asyncio.CancelledError):
+                        pass
+                    raise
+        finally:
+            loop.close()
+
+
+class BrokerClient:
+    """
+    Stand-in for `RSIDApiWrapper` in HTTP workers: `BROKER_METHODS` calls are forwarded to the device broker, the
+    other attributes are the ones of the worker's own wrapper (host DB, matching, preview encoding).
+    """
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._methods = _broker_methods()
+        self._idle: list[Connection] = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> Connection:
+        with self._lock:
+            if len(self._idle) > 0:
+                return self._idle.pop()
+        return Client(self.address, authkey=self.authkey)
+
+    def _release(self, conn: Connection) -> None:
+        with self._lock:
+            self._idle.append(conn)
+
+    def _call(self, name: str, args: tuple, kwargs: dict) -> Any:
+        conn = self._acquire()
+        try:
+            conn.send((name, args, kwargs, metrics.current_endpoint()))
+            status, result = conn.recv()
+        except BaseException:
+            conn.close()
+            raise
+        self._release(conn)
+        if status == "error":
+            raise result
+        return result
+
+    async def _stream(self, name: str, args: tuple, kwargs: dict) -> AsyncIterator:
+        # Dedicated connection: closing it is how the broker learns that the client is gone
+        conn = await run_in_threadpool(Client, self.address, authkey=self.authkey)
+        try:
+            conn.send((name, args, kwargs, metrics.current_endpoint()))
+            while True:
+                status, item = await run_in_threadpool(conn.recv)
+                if status == "end":
+                    return
+                if status == "error":
+                    raise item
+                yield item
+        finally:
+            conn.close()
+
+    def __getattr__(self, name: str) -> Any:
+        method = self.__dict__.get("_methods", {}).get(name)
+        if method is None:
+            from .rsid_api_wrapper import RSIDApiWrapper
+
+            return getattr(RSIDApiWrapper(), name)
+        if inspect.isasyncgenfunction(method):
+            return lambda *args, **kwargs: self._stream(name, args, kwargs)
+        if inspect.iscoroutinefunction(method):
+            async def call_async(*args, **kwargs):
+                return await run_in_threadpool(self._call, name, args, kwargs)
+
+            return call_async
+        return lambda *args, **kwargs: self._call(name, args, kwargs)
+
+
+_broker_client: BrokerClient | None = None
+
+
+def get_broker_client() -> BrokerClient:
+    global _broker_client
+    if _broker_client is None:
+        settings = get_app_settings()
+        _broker_client = BrokerClient(str(settings.device_broker_socket), _authkey())
+    return _broker_client
+
+
+def serve_broker() -> None:
+    global _is_broker_process
+    _is_broker_process = True
+    settings = get_app_settings()
+    settings.configure_logging()
+    if settings.device_broker_socket is None:
+        raise RuntimeError("Misconfigured: device_broker_socket is not set.")
+    authkey = _authkey()
+    if settings.metrics_enabled and settings.metrics_broker_port is not None:
+        start_http_server(settings.metrics_broker_port)
+    DeviceBroker(str(settings.device_broker_socket), authkey).serve_forever()
+
+
+if __name__ == "__main__":
+    # Run the package module rather than `__main__`: `use_broker()` checks the flag set by `serve_broker()`
+    from rsid_rest.rsid_lib import device_broker
+
+    device_broker.serve_broker()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from ..core import metrics
+
+
+@dataclass
+class _Flight:
+    done: threading.Event
+    generation: int
+    result: Any = None
+    exception: Exception | None = None
+
+
+class DeviceQueryCache:
+    """
+    Results of device queries that rarely change: serial number, firmware version and device config.
+
+    Entries expire after `ttl` seconds and are dropped by `invalidate()`, e.g. when the config is updated or the
+    device port changes. Concurrent calls for the same query share a single device round trip (single-flight): the
+    first caller queries the device, the others wait for its result. Queries run in threads (sync SDK calls).
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._flights: dict[str, _Flight] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, query: Callable[[], Any], refresh: bool = False) -> Any:
+        """Cached result of `query`, or the result of the call in flight, or a new call. `refresh` skips the cache."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not refresh and entry[0] > time.monotonic():
+                metrics.DEVICE_QUERY_CACHE.labels(key, "hit").inc()
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight(done=threading.Event(), generation=self._generation)
+                self._flights[key] = flight
+        if not leader:
+            metrics.DEVICE_QUERY_CACHE.labels(key, "shared").inc()
+            flight.done.wait()
+            if flight.exception is not None:
+                raise flight.exception
+            return flight.result
+
+        metrics.DEVICE_QUERY_CACHE.labels(key, "miss").inc()
+        try:
+            flight.result = query()
+        except Exception as e:
+            flight.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                # Invalidated meanwhile: the result may predate the change, don't keep it
+                if flight.exception is None and flight.generation == self._generation and self.ttl > 0:
+                    self._entries[key] = (time.monotonic() + self.ttl, flight.result)
+            flight.done.set()
+        return flight.result
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            if self.ttl > 0:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
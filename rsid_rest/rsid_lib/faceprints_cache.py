@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import rsid_py
+from loguru import logger
+
+from ..core import metrics
+from .host_db_base import faceprints_from_payload
+
+# Three descriptors of RSID_FEATURES_VECTOR_ALLOC_SIZE shorts plus wrapper/bookkeeping overhead.
+FACEPRINTS_ENTRY_BYTES = 3 * rsid_py.RSID_FEATURES_VECTOR_ALLOC_SIZE * 2 + 256
+
+
+def record_revision(payload: dict[str, Any]) -> str | None:
+    """Revision of a DB record. Changes every time the record's faceprints are written."""
+    return payload.get("updated_at") or payload.get("created_at")
+
+
+@dataclass
+class FaceprintsCacheStats:
+    hits: int = 0
+    misses: int = 0
+    marshal_seconds: float = 0.0
+    saved_seconds: float = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.hits} hit(s), {self.misses} miss(es), "
+            f"marshalling {self.marshal_seconds * 1000:.2f} ms, saved ~{self.saved_seconds * 1000:.2f} ms"
+        )
+
+
+class FaceprintsCache:
+    """Memory bounded LRU of ready-to-match `rsid_py.Faceprints`, keyed by point id and record revision."""
+
+    def __init__(self, max_mb: int):
+        self.max_entries: int = max_mb * 1024 * 1024 // FACEPRINTS_ENTRY_BYTES
+        self.stats = FaceprintsCacheStats()
+        self._entries: OrderedDict[str, tuple[str | None, rsid_py.Faceprints]] = OrderedDict()
+        self._match_counts: Counter[str] = Counter()
+        self._avg_marshal_seconds: float = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, db_record: dict[str, Any], request_stats: FaceprintsCacheStats | None = None) -> rsid_py.Faceprints:
+        point_id = db_record.get("point_id")
+        revision = record_revision(db_record)
+        if self.enabled and point_id is not None:
+            with self._lock:
+                entry = self._entries.get(point_id)
+                if entry is not None and entry[0] == revision:
+                    self._entries.move_to_end(point_id)
+                    self._count(request_stats, hit=True, seconds=self._avg_marshal_seconds)
+                    return entry[1]
+
+        start = time.perf_counter()
+        faceprints = faceprints_from_payload(db_record)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            # Exponential moving average of the marshalling cost, used to estimate the time saved on hits
+            self._avg_marshal_seconds = (
+                elapsed if self._avg_marshal_seconds == 0.0 else 0.9 * self._avg_marshal_seconds + 0.1 * elapsed
+            )
+            self._count(request_stats, hit=False, seconds=elapsed)
+            if self.enabled and point_id is not None:
+                self._entries[point_id] = (revision, faceprints)
+                self._entries.move_to_end(point_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                metrics.FACEPRINTS_CACHE_ENTRIES.set(len(self._entries))
+        return faceprints
+
+    def _count(self, request_stats: FaceprintsCacheStats | None, hit: bool, seconds: float) -> None:
+        if hit:
+            metrics.FACEPRINTS_CACHE_LOOKUPS.labels("hit").inc()
+            metrics.FACEPRINTS_CACHE_SAVED_SECONDS.inc(seconds)
+        else:
+            metrics.FACEPRINTS_CACHE_LOOKUPS.labels("miss").inc()
+            metrics.FACEPRINTS_CACHE_MARSHAL_SECONDS.inc(seconds)
+        for stats in (self.stats, request_stats):
+            if stats is None:
+                continue
+            if hit:
+                stats.hits += 1
+                stats.saved_seconds += seconds
+            else:
+                stats.misses += 1
+                stats.marshal_seconds += seconds
+
+    def invalidate(self, point_id: str) -> None:
+        with self._lock:
+            self._entries.pop(str(point_id), None)
+            metrics.FACEPRINTS_CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            metrics.FACEPRINTS_CACHE_ENTRIES.set(0)
+
+    def note_match(self, user_id: str) -> None:
+        with self._lock:
+            self._match_counts[user_id] += 1
+
+    def forget_user(self, user_id: str) -> None:
+        with self._lock:
+            self._match_counts.pop(user_id, None)
+
+    def forget_all_users(self) -> None:
+        with self._lock:
+            self._match_counts.clear()
+
+    def most_matched(self, count: int) -> list[str]:
+        with self._lock:
+            return [user_id for user_id, _ in self._match_counts.most_common(count)]
+
+    def load_match_counts(self, file_path: Path) -> None:
+        if not file_path.exists():
+            return
+        try:
+            counts = json.loads(file_path.read_text())
+            with self._lock:
+                self._match_counts.update({str(k): int(v) for k, v in counts.items()})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unable to load faceprints cache match counts from {file_path}: {e}")
+
+    def save_match_counts(self, file_path: Path, keep: int) -> None:
+        with self._lock:
+            counts = dict(self._match_counts.most_common(keep))
+        try:
+            file_path.write_text(json.dumps(counts))
+        except OSError as e:
+            logger.warning(f"Unable to save faceprints cache match counts to {file_path}: {e}")
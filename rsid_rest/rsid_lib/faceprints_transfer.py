@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Host DB export/import formats.
+
+A stream is a sequence of user records, with a cursor control entry after each page. Resuming an export from a
+cursor (or restarting an import after the last cursor it reported) never loses or duplicates a record.
+
+- NDJSON: one JSON object per line. Descriptors are packed as base64 little-endian int16.
+  Cursor entries are `{"cursor": "<point id>"}`, the last one is `{"cursor": null}`.
+- Binary: frames of `type (1 byte) | length (uint32 BE) | body`. Record frames (`R`) hold a uint16 BE length
+  prefixed JSON header followed by the raw packed descriptors, cursor frames (`C`) the cursor as UTF-8 (empty
+  when done).
+"""
+
+import base64
+import json
+import struct
+from collections.abc import AsyncIterator
+from typing import Any
+
+import numpy as np
+
+DESCRIPTOR_FIELDS = ("adaptive_descriptor_nomask", "adaptive_descriptor_withmask", "enroll_descriptor")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+_FRAME_HEADER = struct.Struct(">cI")
+_RECORD_HEADER = struct.Struct(">H")
+
+
+def pack_descriptors(record: dict[str, Any]) -> bytes:
+    return np.array([record[field] for field in DESCRIPTOR_FIELDS], dtype="<i2").tobytes()
+
+
+def unpack_descriptors(data: bytes) -> dict[str, list[int]]:
+    descriptors = np.frombuffer(data, dtype="<i2").reshape(len(DESCRIPTOR_FIELDS), -1)
+    return {field: descriptors[i].tolist() for i, field in enumerate(DESCRIPTOR_FIELDS)}
+
+
+def _header(record: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in record.items() if key not in DESCRIPTOR_FIELDS and key != "score"}
+
+
+def encode_ndjson_record(record: dict[str, Any]) -> bytes:
+    line = _header(record)
+    line["descriptors"] = base64.b64encode(pack_descriptors(record)).decode("ascii")
+    return json.dumps(line).encode() + b"\n"
+
+
+def encode_ndjson_cursor(cursor: str | None) -> bytes:
+    return json.dumps({"cursor": cursor}).encode() + b"\n"
+
+
+def encode_binary_record(record: dict[str, Any]) -> bytes:
+    header = json.dumps(_header(record)).encode()
+    body = _RECORD_HEADER.pack(len(header)) + header + pack_descriptors(record)
+    return _FRAME_HEADER.pack(b"R", len(body)) + body
+
+
+def encode_binary_cursor(cursor: str | None) -> bytes:
+    body = (cursor or "").encode()
+    return _FRAME_HEADER.pack(b"C", len(body)) + body
+
+
+# Decoders yield ("record", dict) and ("cursor", str | None) items
+
+
+async def decode_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[str, Any]]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _decode_ndjson_line(line)
+    if buffer.strip():
+        yield _decode_ndjson_line(buffer)
+
+
+def _decode_ndjson_line(line: bytes) -> tuple[str, Any]:
+    item = json.loads(line)
+    if "descriptors" not in item:
+        return "cursor", item.get("cursor")
+    item.update(unpack_descriptors(base64.b64decode(item.pop("descriptors"))))
+    return "record", item
+
+
+async def decode_binary(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[str, Any]]:
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= _FRAME_HEADER.size:
+            frame_type, length = _FRAME_HEADER.unpack_from(buffer)
+            end = _FRAME_HEADER.size + length
+            if len(buffer) < end:
+                break
+            body = bytes(buffer[_FRAME_HEADER.size: end])
+            del buffer[:end]
+            if frame_type == b"C":
+                yield "cursor", body.decode() or None
+            elif frame_type == b"R":
+                (header_length,) = _RECORD_HEADER.unpack_from(body)
+                header_end = _RECORD_HEADER.size + header_length
+                record = json.loads(body[_RECORD_HEADER.size: header_end])
+                record.update(unpack_descriptors(body[header_end:]))
+                yield "record", record
+            else:
+                raise ValueError(f"Unknown frame type {frame_type!r}")
+    if len(buffer) > 0:
+        raise ValueError(f"Truncated stream: {len(buffer)} trailing byte(s)")
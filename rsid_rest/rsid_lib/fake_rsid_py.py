@@ -0,0 +1,619 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+In-process fake of the `rsid_py` surface used by the app, for tests and benchmarks without an F4xx module.
+
+Selected with `rsid_backend=fake`: `rsid_lib/__init__.py` installs this module as `rsid_py` before anything imports
+the SDK. Blocking calls sleep for a configurable latency, like the SDK blocks on the serial link.
+
+Faces are synthetic: each identity (a string) has a deterministic 512-d faceprint, see `synthetic_features`. The face
+in front of the camera is the next identity presented with `device.present(...)` (or `rsid_fake_faces`), and
+otherwise cycles through the users enrolled on the fake device. Outcomes can be scripted per operation, e.g.::
+
+    from rsid_rest.rsid_lib.fake_rsid_py import device, AuthenticateStatus
+    device.script("authenticate", AuthenticateStatus.Spoof)
+"""
+
+import threading
+import time
+import zlib
+from collections import deque
+from collections.abc import Callable
+from enum import Enum
+from typing import Any
+
+import numpy as np
+
+RSID_FACEPRINTS_VERSION = 9
+RSID_FEATURES_VECTOR_ALLOC_SIZE = 515
+RSID_NUM_OF_RECOGNITION_FEATURES = 512
+
+DEFAULT_LATENCIES: dict[str, float] = {
+    "connect": 0.02,
+    "authenticate": 0.7,
+    "extract_faceprints_for_auth": 0.6,
+    "enroll": 2.0,
+    "extract_faceprints_for_enroll": 2.0,
+    "enroll_image": 0.5,
+    "extract_image_faceprints_for_enroll": 0.5,
+    "match_faceprints": 0.0,
+    "query_user_ids": 0.05,
+    "remove_user": 0.05,
+    "remove_all_users": 0.2,
+    "query_device_config": 0.03,
+    "set_device_config": 0.1,
+    "query_serial_number": 0.02,
+    "query_firmware_version": 0.02,
+    "preview_start": 0.5,
+}
+
+
+class _SdkEnum(Enum):
+    def __int__(self):
+        return self.value
+
+
+def _sdk_enum(name: str, members: dict[str, int]) -> type[_SdkEnum]:
+    return _SdkEnum(name, members, module=__name__)
+
+
+_COMMON_STATUS = {
+    "Ok": 100, "Error": 101, "SerialError": 102, "SecurityError": 103, "VersionMismatch": 104, "CrcError": 105,
+    "LicenseError": 106, "LicenseCheck": 107,
+}
+_SPOOF_STATUS = {
+    "Spoof_2D": 120, "Spoof_3D": 121, "Spoof_LR": 122, "Spoof_Disparity": 123, "Spoof_Surface": 124,
+    "Spoof_Plane_Disparity": 125,
+}
+_FACE_POSITION_STATUS = {
+    "Success": 0, "NoFaceDetected": 1, "FaceDetected": 2, "LedFlowSuccess": 3, "FaceIsTooFarToTheTop": 4,
+    "FaceIsTooFarToTheBottom": 5, "FaceIsTooFarToTheRight": 6, "FaceIsTooFarToTheLeft": 7, "FaceTiltIsTooUp": 8,
+    "FaceTiltIsTooDown": 9, "FaceTiltIsTooRight": 10, "FaceTiltIsTooLeft": 11,
+}
+
+Status = _sdk_enum("Status", {**_COMMON_STATUS, "TooManySpoofs": 108})
+AuthenticateStatus = _sdk_enum("AuthenticateStatus", {
+    **_FACE_POSITION_STATUS, "CameraStarted": 12, "CameraStopped": 13, "MaskDetectedInHighSecurity": 14, "Spoof": 15,
+    "Forbidden": 16, "DeviceError": 17, "Failure": 18, "TooManySpoofs": 19, "InvalidFeatures": 20, **_COMMON_STATUS,
+    **_SPOOF_STATUS,
+})
+EnrollStatus = _sdk_enum("EnrollStatus", {
+    **_FACE_POSITION_STATUS, "FaceIsNotFrontal": 12, "CameraStarted": 13, "CameraStopped": 14,
+    "MultipleFacesDetected": 15, "Failure": 16, "DeviceError": 17, "EnrollWithMaskIsForbidden": 18, "Spoof": 19,
+    "InvalidFeatures": 20, **_COMMON_STATUS, **_SPOOF_STATUS,
+})
+AlgoFlow = _sdk_enum("AlgoFlow", {"All": 0, "FaceDetectionOnly": 1, "SpoofOnly": 2, "RecognitionOnly": 3})
+CameraRotation = _sdk_enum(
+    "CameraRotation", {"Rotation_0_Deg": 0, "Rotation_180_Deg": 1, "Rotation_90_Deg": 2, "Rotation_270_Deg": 3}
+)
+FaceSelectionPolicy = _sdk_enum("FaceSelectionPolicy", {"Single": 0, "All": 1})
+SecurityLevel = _sdk_enum("SecurityLevel", {"High": 0, "Medium": 1, "Low": 2})
+MatcherConfidenceLevel = _sdk_enum("MatcherConfidenceLevel", {"High": 0, "Medium": 1, "Low": 2})
+DumpMode = _sdk_enum("DumpMode", {"Disable": 0, "CroppedFace": 1, "FullFrame": 2})
+PreviewMode = _sdk_enum("PreviewMode", {"MJPEG_1080P": 0, "MJPEG_720P": 1, "RAW10_1080P": 2})
+LogLevel = _sdk_enum(
+    "LogLevel", {"Trace": 0, "Debug": 1, "Info": 2, "Warning": 3, "Error": 4, "Critical": 5, "Off": 6}
+)
+FacePose = _sdk_enum("FacePose", {"Center": 0, "Up": 1, "Down": 2, "Left": 3, "Right": 4})
+
+# Score of a faceprint matched against itself, like the SDK matcher
+_MAX_SCORE = 4096
+_MATCH_THRESHOLDS = {
+    MatcherConfidenceLevel.High: 1200,
+    MatcherConfidenceLevel.Medium: 1000,
+    MatcherConfidenceLevel.Low: 800,
+}
+_UPDATE_THRESHOLD = 2000
+_PREVIEW_SIZES = {PreviewMode.MJPEG_1080P: (1920, 1080), PreviewMode.MJPEG_720P: (1280, 720),
+                  PreviewMode.RAW10_1080P: (1920, 1080)}
+
+
+class FaceRect:
+    def __init__(self, x: int = 0, y: int = 0, w: int = 0, h: int = 0):
+        self.x, self.y, self.w, self.h = x, y, w, h
+
+
+class ExtractedFaceprintsElement:
+    def __init__(self):
+        self.version = RSID_FACEPRINTS_VERSION
+        self.flags = 0
+        self.features_type = 0
+        self.features = [0] * RSID_FEATURES_VECTOR_ALLOC_SIZE
+
+
+class Faceprints:
+    def __init__(self):
+        self.version = RSID_FACEPRINTS_VERSION
+        self.flags = 0
+        self.features_type = 0
+        self.reserved = [0] * 5
+        self.adaptive_descriptor_nomask = [0] * RSID_FEATURES_VECTOR_ALLOC_SIZE
+        self.adaptive_descriptor_withmask = [0] * RSID_FEATURES_VECTOR_ALLOC_SIZE
+        self.enroll_descriptor = [0] * RSID_FEATURES_VECTOR_ALLOC_SIZE
+
+
+class MatchResult:
+    def __init__(self, success: bool = False, should_update: bool = False, score: int = 0):
+        self.success, self.should_update, self.score = success, should_update, score
+
+
+class DeviceConfig:
+    def __init__(self):
+        self.algo_flow = AlgoFlow.All
+        self.camera_rotation = CameraRotation.Rotation_0_Deg
+        self.security_level = SecurityLevel.Medium
+        self.face_selection_policy = FaceSelectionPolicy.Single
+        self.matcher_confidence_level = MatcherConfidenceLevel.High
+        self.dump_mode = DumpMode.Disable
+        self.max_spoofs = 0
+
+
+class ReleaseInfo:
+    def __init__(self, sw_version: int = 0, fw_version: int = 0, sw_version_str: str = "", fw_version_str: str = ""):
+        self.sw_version, self.fw_version = sw_version, fw_version
+        self.sw_version_str, self.fw_version_str = sw_version_str, fw_version_str
+        self.release_url = ""
+        self.release_notes_url = ""
+
+
+class FirmwareBinInfo:
+    def __init__(self, fw_version: str = "", recognition_version: str = "", module_names: list[str] | None = None):
+        self.fw_version, self.recognition_version = fw_version, recognition_version
+        self.module_names = module_names or []
+
+
+class DeviceFirmwareInfo:
+    def __init__(self, fw_version: str = "", recognition_version: str = "", serial_number: str = ""):
+        self.fw_version, self.recognition_version, self.serial_number = fw_version, recognition_version, serial_number
+
+
+class ImageMetadata:
+    def __init__(self, timestamp: int = 0):
+        self.timestamp = timestamp
+        self.status = 0
+        self.sensor_id = 0
+        self.exposure = 0
+        self.gain = 0
+        self.led = False
+
+
+class Image:
+    def __init__(self, buffer: np.ndarray, width: int, height: int, number: int):
+        self._buffer = buffer
+        self.width, self.height, self.number = width, height, number
+        self.size = buffer.nbytes
+        self.stride = width * 3
+        self.metadata = ImageMetadata(timestamp=time.monotonic_ns() // 1000)
+
+    def get_buffer(self) -> np.ndarray:
+        return self._buffer
+
+
+class PreviewConfig:
+    def __init__(self):
+        self.camera_number = -1
+        self.preview_mode = PreviewMode.MJPEG_1080P
+        self.portrait_mode = False
+        self.rotate_raw = False
+
+
+class PreviewException(Exception):
+    pass
+
+
+def synthetic_features(identity: str, noise: int = 0, seed: int | None = None) -> list[int]:
+    """Deterministic faceprint of `identity`, with optional per-capture noise (same `seed`, same noise)."""
+    rng = np.random.default_rng([device.seed, zlib.crc32(identity.encode())])
+    features = rng.integers(-100, 101, RSID_NUM_OF_RECOGNITION_FEATURES)
+    if noise > 0:
+        noise_rng = np.random.default_rng([device.seed, zlib.crc32(identity.encode()), seed or 0])
+        features = features + noise_rng.integers(-noise, noise + 1, RSID_NUM_OF_RECOGNITION_FEATURES)
+    padding = [0] * (RSID_FEATURES_VECTOR_ALLOC_SIZE - RSID_NUM_OF_RECOGNITION_FEATURES)
+    return features.tolist() + padding
+
+
+def _score(features: list[int], descriptor: list[int]) -> int:
+    a = np.asarray(features[:RSID_NUM_OF_RECOGNITION_FEATURES], dtype=np.float32)
+    b = np.asarray(descriptor[:RSID_NUM_OF_RECOGNITION_FEATURES], dtype=np.float32)
+    norms = float(np.linalg.norm(a) * np.linalg.norm(b))
+    if norms == 0:
+        return 0
+    return max(0, round(float(a @ b) / norms * _MAX_SCORE))
+
+
+class FakeDevice:
+    """State of the fake module: enrolled users, configuration, presented faces, scripted outcomes and latencies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.seed = 0
+            self.latencies = dict(DEFAULT_LATENCIES)
+            self.capture_noise = 10
+            self.preview_fps = 15.0
+            self.serial_number = "FAKE00001"
+            self.firmware_version = "OPFW:7.9.0.1;NNLED:7.9.0.1;DNNFD:7.9.0.1;DNNFR:7.9.0.1;DNNAS:7.9.0.1;RECOG:7.9.0.1"
+            self.users: dict[str, list[int]] = {}
+            # Identities enrolled through faceprints extraction (host DB mode), they come back for authentication
+            self.enrolled_faces: list[str] = []
+            self.config = DeviceConfig()
+            self._faces: deque[str] = deque()
+            self._default_faces: list[str] = []
+            self._scripts: dict[str, deque] = {}
+            self._captures = 0
+            self._next_default_face = 0
+
+    def configure(
+        self,
+        latencies: dict[str, float] | None = None,
+        seed: int | None = None,
+        faces: list[str] | None = None,
+        preview_fps: float | None = None,
+    ) -> None:
+        with self._lock:
+            if latencies is not None:
+                self.latencies.update(latencies)
+            if seed is not None:
+                self.seed = seed
+            if faces is not None:
+                self._default_faces = list(faces)
+            if preview_fps is not None:
+                self.preview_fps = preview_fps
+
+    def present(self, *identities: str) -> None:
+        """Queue the faces of the next captures."""
+        with self._lock:
+            self._faces.extend(identities)
+
+    def script(self, operation: str, *outcomes: Any) -> None:
+        """
+        Queue outcomes of the next calls to `operation`: a status (`AuthenticateStatus` / `EnrollStatus`), or an
+        exception instance to raise.
+        """
+        with self._lock:
+            self._scripts.setdefault(operation, deque()).extend(outcomes)
+
+    def delay(self, operation: str) -> None:
+        latency = self.latencies.get(operation, 0.0)
+        if latency > 0:
+            time.sleep(latency)
+
+    def scripted(self, operation: str) -> Any:
+        with self._lock:
+            outcomes = self._scripts.get(operation)
+            outcome = outcomes.popleft() if outcomes else None
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def next_face(self) -> str | None:
+        """Identity in front of the camera for the next capture, None when nobody is there."""
+        with self._lock:
+            if len(self._faces) > 0:
+                return self._faces.popleft()
+            candidates = self._default_faces or sorted(self.users) + self.enrolled_faces
+            if len(candidates) == 0:
+                return None
+            face = candidates[self._next_default_face % len(candidates)]
+            self._next_default_face += 1
+            return face
+
+    def next_enroll_face(self) -> str:
+        """Like `next_face`, with a new person in front of the camera by default."""
+        with self._lock:
+            if len(self._faces) > 0:
+                return self._faces.popleft()
+            identity = f"person-{len(self.enrolled_faces) + 1}"
+            self.enrolled_faces.append(identity)
+            return identity
+
+    def capture(self, identity: str) -> list[int]:
+        with self._lock:
+            self._captures += 1
+            capture = self._captures
+        return synthetic_features(identity, noise=self.capture_noise, seed=capture)
+
+
+device = FakeDevice()
+_log_callback: Callable[[Any, str], None] | None = None
+_log_level = LogLevel.Off
+
+
+def set_log_callback(callback: Callable[[Any, str], None], log_level: Any, do_formatting: bool = True) -> None:
+    global _log_callback, _log_level
+    _log_callback, _log_level = callback, log_level
+
+
+def _log(level: Any, message: str) -> None:
+    if _log_callback is not None and level.value >= _log_level.value:
+        _log_callback(level, message)
+
+
+def _face_rects() -> list[FaceRect]:
+    return [FaceRect(x=810, y=340, w=300, h=400)]
+
+
+class _Session:
+    def __init__(self, port: str | None = None):
+        self.port = port
+        self.connected = False
+        if port is not None:
+            self.connect(port)
+
+    def connect(self, port: str) -> None:
+        device.delay("connect")
+        self.port = port
+        self.connected = True
+        _log(LogLevel.Debug, f"Fake device connected on {port!r}")
+
+    def disconnect(self) -> None:
+        self.connected = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.disconnect()
+
+
+class FaceAuthenticator(_Session):
+    MAX_USERID_LENGTH = 31
+
+    def authenticate(self, on_result, on_progress=None, on_hint=None, on_faces=None) -> None:
+        device.delay("authenticate")
+        status = device.scripted("authenticate")
+        identity = device.next_face()
+        user_id = None
+        if status is None:
+            if identity is None:
+                status = AuthenticateStatus.NoFaceDetected
+            else:
+                features = device.capture(identity)
+                scores = {uid: _score(features, descriptor) for uid, descriptor in device.users.items()}
+                threshold = _MATCH_THRESHOLDS[device.config.matcher_confidence_level]
+                user_id = max(scores, key=scores.get) if len(scores) > 0 else None
+                if user_id is None or scores[user_id] < threshold:
+                    status, user_id = AuthenticateStatus.Forbidden, None
+                else:
+                    status = AuthenticateStatus.Success
+        if identity is not None and on_faces is not None:
+            on_faces(_face_rects(), time.monotonic_ns() // 1000)
+        on_result(status, user_id or "")
+
+    def extract_faceprints_for_auth(self, on_result, on_progress=None, on_hint=None, on_faces=None) -> None:
+        device.delay("extract_faceprints_for_auth")
+        status = device.scripted("extract_faceprints_for_auth")
+        identity = device.next_face()
+        extracted = None
+        if status is None:
+            status = AuthenticateStatus.NoFaceDetected if identity is None else AuthenticateStatus.Success
+        if status == AuthenticateStatus.Success and identity is not None:
+            extracted = ExtractedFaceprintsElement()
+            extracted.features = device.capture(identity)
+        if identity is not None and on_faces is not None:
+            on_faces(_face_rects(), time.monotonic_ns() // 1000)
+        on_result(status, extracted)
+
+    def enroll(self, on_result, user_id: str, on_progress=None, on_hint=None, on_faces=None) -> None:
+        device.delay("enroll")
+        status = device.scripted("enroll") or EnrollStatus.Success
+        if on_progress is not None:
+            for pose in FacePose:
+                on_progress(pose)
+        if on_faces is not None:
+            on_faces(_face_rects(), time.monotonic_ns() // 1000)
+        if status == EnrollStatus.Success:
+            device.users[user_id] = synthetic_features(user_id)
+        on_result(status, user_id)
+
+    def enroll_image(self, user_id: str, buffer: list[int], width: int, height: int) -> Any:
+        device.delay("enroll_image")
+        status = device.scripted("enroll_image") or EnrollStatus.Success
+        if status == EnrollStatus.Success:
+            device.users[user_id] = synthetic_features(user_id)
+        return status
+
+    def extract_faceprints_for_enroll(self, on_result, on_progress=None, on_hint=None, on_faces=None) -> None:
+        device.delay("extract_faceprints_for_enroll")
+        status = device.scripted("extract_faceprints_for_enroll") or EnrollStatus.Success
+        identity = device.next_enroll_face()
+        extracted = None
+        if status == EnrollStatus.Success:
+            extracted = ExtractedFaceprintsElement()
+            extracted.features = synthetic_features(identity)
+        if on_progress is not None:
+            for pose in FacePose:
+                on_progress(pose)
+        on_result(status, extracted)
+
+    def extract_image_faceprints_for_enroll(self, buffer: list[int], width: int, height: int):
+        device.delay("extract_image_faceprints_for_enroll")
+        device.scripted("extract_image_faceprints_for_enroll")
+        # The identity of an image is its content
+        extracted = ExtractedFaceprintsElement()
+        extracted.features = synthetic_features(str(zlib.crc32(bytes(np.asarray(buffer, dtype=np.uint8)))))
+        return extracted
+
+    def match_faceprints(
+        self,
+        new_faceprints: ExtractedFaceprintsElement,
+        existing_faceprints: Faceprints,
+        updated_faceprints: Faceprints,
+        confidence_level: Any = MatcherConfidenceLevel.High,
+    ) -> MatchResult:
+        device.delay("match_faceprints")
+        score = max(
+            _score(new_faceprints.features, existing_faceprints.adaptive_descriptor_nomask),
+            _score(new_faceprints.features, existing_faceprints.enroll_descriptor),
+        )
+        success = score >= _MATCH_THRESHOLDS[confidence_level]
+        should_update = success and _UPDATE_THRESHOLD <= score < _MAX_SCORE
+        updated_faceprints.version = existing_faceprints.version
+        updated_faceprints.flags = existing_faceprints.flags
+        updated_faceprints.features_type = existing_faceprints.features_type
+        updated_faceprints.enroll_descriptor = list(existing_faceprints.enroll_descriptor)
+        updated_faceprints.adaptive_descriptor_withmask = list(existing_faceprints.adaptive_descriptor_withmask)
+        updated_faceprints.adaptive_descriptor_nomask = (
+            list(new_faceprints.features) if should_update else list(existing_faceprints.adaptive_descriptor_nomask)
+        )
+        return MatchResult(success=success, should_update=should_update, score=score)
+
+    def query_user_ids(self) -> list[str]:
+        device.delay("query_user_ids")
+        device.scripted("query_user_ids")
+        return sorted(device.users)
+
+    def query_number_of_users(self) -> int:
+        return len(device.users)
+
+    def remove_user(self, user_id: str) -> None:
+        device.delay("remove_user")
+        device.scripted("remove_user")
+        device.users.pop(user_id, None)
+
+    def remove_all_users(self) -> None:
+        device.delay("remove_all_users")
+        device.scripted("remove_all_users")
+        device.users.clear()
+
+    def query_device_config(self) -> DeviceConfig:
+        device.delay("query_device_config")
+        device.scripted("query_device_config")
+        config = DeviceConfig()
+        config.__dict__.update(device.config.__dict__)
+        return config
+
+    def set_device_config(self, config: DeviceConfig) -> None:
+        device.delay("set_device_config")
+        device.scripted("set_device_config")
+        device.config.__dict__.update(config.__dict__)
+
+    def cancel(self) -> None:
+        pass
+
+    def standby(self) -> None:
+        pass
+
+
+class DeviceController(_Session):
+    def query_serial_number(self) -> str:
+        device.delay("query_serial_number")
+        device.scripted("query_serial_number")
+        return device.serial_number
+
+    def query_firmware_version(self) -> str:
+        device.delay("query_firmware_version")
+        device.scripted("query_firmware_version")
+        return device.firmware_version
+
+    def ping(self) -> None:
+        pass
+
+    def reboot(self) -> bool:
+        return True
+
+    def fetch_log(self) -> str:
+        return ""
+
+
+class Preview:
+    """Synthetic frames at `device.preview_fps`: a gradient with a moving square, in the configured mode size."""
+
+    def __init__(self, config: PreviewConfig):
+        self._width, self._height = _PREVIEW_SIZES[config.preview_mode]
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, preview_callback: Callable[[Image], None], snapshot_callback: Any = None) -> None:
+        device.delay("preview_start")
+        device.scripted("preview_start")
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(preview_callback,), name="fake-preview", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self, preview_callback: Callable[[Image], None]) -> None:
+        gradient = np.linspace(0, 255, self._width, dtype=np.uint8)
+        background = np.empty((self._height, self._width, 3), dtype=np.uint8)
+        background[:, :, 0] = gradient
+        background[:, :, 1] = gradient[::-1]
+        background[:, :, 2] = 96
+        square = self._height // 4
+        number = 0
+        interval = 1.0 / device.preview_fps
+        next_frame = time.monotonic()
+        while not self._stop.is_set():
+            frame = background.copy()
+            x = number * 8 % max(1, self._width - square)
+            frame[square: 2 * square, x: x + square] = 255
+            number += 1
+            try:
+                preview_callback(Image(frame.reshape(-1), self._width, self._height, number))
+            except Exception as e:
+                _log(LogLevel.Error, f"Fake preview callback failed: {e}")
+            next_frame += interval
+            self._stop.wait(max(0.0, next_frame - time.monotonic()))
+
+
+class FWUpdater(_Session):
+    def __init__(self, file_path: str, port: str):
+        self.file_path = file_path
+        super().__init__(port)
+
+    def get_firmware_bin_info(self) -> FirmwareBinInfo:
+        return FirmwareBinInfo(fw_version="7.9.0.1", recognition_version="7.9.0.1", module_names=["OPFW", "RECOG"])
+
+    def get_device_firmware_info(self) -> DeviceFirmwareInfo:
+        return DeviceFirmwareInfo(fw_version="7.9.0.1", recognition_version="7.9.0.1",
+                                  serial_number=device.serial_number)
+
+    def is_sku_compatible(self) -> tuple[bool, str]:
+        return True, ""
+
+    def is_host_compatible(self) -> tuple[bool, str]:
+        return True, ""
+
+    def is_db_compatible(self) -> tuple[bool, str]:
+        return True, ""
+
+    def is_policy_compatible(self) -> tuple[bool, str]:
+        return True, ""
+
+    def update(self, force_version: bool = False, allow_recovery: bool = False, progress_callback=None) -> None:
+        if progress_callback is not None:
+            for progress in (0.0, 0.5, 1.0):
+                progress_callback(progress)
+
+
+class UpdateChecker:
+    @staticmethod
+    def get_local_release_info(port: str) -> ReleaseInfo:
+        return ReleaseInfo(sw_version=790, fw_version=790, sw_version_str="0.79.0", fw_version_str="7.9.0.1")
+
+    @staticmethod
+    def get_remote_release_info() -> ReleaseInfo:
+        return UpdateChecker.get_local_release_info("")
+
+    @staticmethod
+    def is_update_available(port: str) -> tuple[bool, ReleaseInfo, ReleaseInfo]:
+        return False, UpdateChecker.get_local_release_info(port), UpdateChecker.get_remote_release_info()
+
+
+def discover_devices() -> list:
+    return []
+
+
+def faceprints_version() -> int:
+    return RSID_FACEPRINTS_VERSION
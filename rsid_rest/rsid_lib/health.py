@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import dataclasses
+import time
+
+import anyio.to_thread
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from ..core.config import get_app_settings
+from ..core.settings.base import ApplicationDBTypes
+from .device_broker import get_broker_client, use_broker
+from .models import HealthResponse, ReadinessResponse, WarmupStepModel
+from .warmup import get_warmup
+
+# Before the prober runs
+NOT_STARTED = (503, b'{"status":"starting"}')
+
+
+class HealthProber:
+    """
+    Serves `/healthz` and `/readyz` from state refreshed in the background: a health check never waits for the
+    device or the DB, it returns bytes serialized beforehand.
+
+    The device (serial number and firmware version) and the host DB are probed every `device_interval` and
+    `db_interval` seconds, in the background and queued behind the requests like any device call. The device
+    queue depth and the readiness are refreshed every `refresh_interval` seconds.
+    """
+
+    def __init__(self, refresh_interval: float, device_interval: float, db_interval: float):
+        self.refresh_interval = refresh_interval
+        self.device_interval = device_interval
+        self.db_interval = db_interval
+        self.host_mode = get_app_settings().db_mode == ApplicationDBTypes.host
+        self._health = HealthResponse(
+            status="ok",
+            device_reachable=None,
+            serial_number=None,
+            firmware_version=None,
+            device_error=None,
+            device_checked_at=None,
+            db_readable=None,
+            db_users=None,
+            db_error=None,
+            db_checked_at=None,
+            device_queue_depth=None,
+            threadpool_queued=None,
+            updated_at=time.time(),
+        )
+        self.healthz: tuple[int, bytes] = NOT_STARTED
+        self.readyz: tuple[int, bytes] = NOT_STARTED
+        self._tasks: list[asyncio.Task] = []
+        self._render()
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._refresh_loop()), loop.create_task(self._device_loop())]
+        if self.host_mode:
+            self._tasks.append(loop.create_task(self._db_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    @staticmethod
+    def _api():
+        # Not get_rsid_api(): setting the port waits for the device
+        if use_broker():
+            return get_broker_client()
+        from .rsid_api_wrapper import RSIDApiWrapper
+
+        return RSIDApiWrapper()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                api = await run_in_threadpool(self._api)
+                self._health.device_queue_depth = await run_in_threadpool(api.query_device_queue_depth)
+            except Exception as e:
+                logger.warning(f"Health: unable to read the device queue depth: {e}")
+                self._health.device_queue_depth = None
+            self._health.threadpool_queued = anyio.to_thread.current_default_thread_limiter().statistics().tasks_waiting
+            self._render()
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _device_loop(self) -> None:
+        from .rsid_api_wrapper import get_rsid_api
+
+        while True:
+            health = self._health
+            try:
+                api = await run_in_threadpool(get_rsid_api)
+                info = await run_in_threadpool(api.query_device_info, refresh=True)
+                if health.device_reachable is False:
+                    logger.info("Health: device reachable again")
+                health.device_reachable, health.device_error = True, None
+                health.serial_number, health.firmware_version = info.serial_number, info.firmware_version
+            except Exception as e:
+                if health.device_reachable is not False:
+                    logger.warning(f"Health: device not reachable: {e}")
+                health.device_reachable, health.device_error = False, f"{type(e).__name__}: {e}"
+            health.device_checked_at = time.time()
+            self._render()
+            await asyncio.sleep(self.device_interval)
+
+    async def _db_loop(self) -> None:
+        while True:
+            health = self._health
+            try:
+                api = await run_in_threadpool(self._api)
+                health.db_users = await api.query_host_users_count()
+                health.db_readable, health.db_error = True, None
+            except Exception as e:
+                if health.db_readable is not False:
+                    logger.warning(f"Health: host DB not readable: {e}")
+                health.db_readable, health.db_error = False, f"{type(e).__name__}: {e}"
+            health.db_checked_at = time.time()
+            self._render()
+            await asyncio.sleep(self.db_interval)
+
+    def _render(self) -> None:
+        health = self._health
+        health.status = "ok" if health.device_reachable and health.db_readable is not False else "degraded"
+        health.updated_at = time.time()
+
+        warmup = get_warmup()
+        reasons = []
+        if warmup is None or not warmup.ready:
+            reasons.append("warming up")
+        if not health.device_reachable:
+            reasons.append("device not probed yet" if health.device_reachable is None else "device not reachable")
+        if self.host_mode and not health.db_readable:
+            reasons.append("host DB not probed yet" if health.db_readable is None else "host DB not readable")
+        readiness = ReadinessResponse(
+            ready=len(reasons) == 0,
+            reasons=reasons,
+            warmup_seconds=None if warmup is None else warmup.seconds,
+            warmup_steps=[] if warmup is None else [
+                WarmupStepModel(**dataclasses.asdict(step)) for step in warmup.steps.values()
+            ],
+            health=health,
+        )
+        # Liveness: the process serves requests, even without its device
+        self.healthz = (200, health.model_dump_json().encode())
+        self.readyz = (200 if readiness.ready else 503, readiness.model_dump_json().encode())
+
+
+_prober: HealthProber | None = None
+
+
+def get_health_prober() -> HealthProber | None:
+    return _prober
+
+
+def start_health_prober(refresh_interval: float, device_interval: float, db_interval: float) -> HealthProber:
+    global _prober
+    _prober = HealthProber(refresh_interval=refresh_interval, device_interval=device_interval, db_interval=db_interval)
+    _prober.start()
+    return _prober
+
+
+async def stop_health_prober() -> None:
+    global _prober
+    if _prober is not None:
+        await _prober.stop()
+        _prober = None
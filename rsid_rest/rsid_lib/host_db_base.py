@@ -8,34 +8,92 @@
 import rsid_py
 
 
+def faceprints_to_payload(faceprints: rsid_py.Faceprints) -> dict[str, Any]:
+    return {
+        "flags": faceprints.flags,
+        "version": faceprints.version,
+        "features_type": faceprints.features_type,
+        "adaptive_descriptor_nomask": faceprints.adaptive_descriptor_nomask,
+        "adaptive_descriptor_withmask": faceprints.adaptive_descriptor_withmask,
+        "enroll_descriptor": faceprints.enroll_descriptor,
+    }
+
+
+def faceprints_from_payload(payload: dict[str, Any]) -> rsid_py.Faceprints:
+    faceprints = rsid_py.Faceprints()
+    faceprints.flags = payload["flags"]
+    faceprints.version = payload["version"]
+    faceprints.features_type = payload["features_type"]
+    faceprints.adaptive_descriptor_nomask = payload["adaptive_descriptor_nomask"]
+    faceprints.adaptive_descriptor_withmask = payload["adaptive_descriptor_withmask"]
+    faceprints.enroll_descriptor = payload["enroll_descriptor"]
+    return faceprints
+
+
 class HostDBBase:
     def __init__(self, **kwargs: Any):
         pass
 
     @abstractmethod
-    async def add_faceprints(self, user_id: str, faceprints: rsid_py.Faceprints) -> None:
+    async def add_faceprints(
+        self, user_id: str, faceprints: rsid_py.Faceprints, groups: list[str] | None = None
+    ) -> None:
         ...
 
     @abstractmethod
     async def update_faceprints(self, user_id: str, faceprints: rsid_py.Faceprints) -> None:
         ...
 
+    @abstractmethod
+    async def update_faceprints_batch(self, updates: dict[str, dict[str, Any]]) -> list[str]:
+        ...
+
     @abstractmethod
     async def get_user_ids(self) -> list[str]:
         ...
 
     @abstractmethod
-    async def get_all_faceprints(self) -> list:
+    async def count_users(self) -> int:
+        ...
+
+    @abstractmethod
+    async def get_all_faceprints(self, zone: str | None = None) -> list:
+        ...
+
+    # `zone` restricts the candidates to users enrolled with that group/zone tag. Backends without payload
+    # filtering should keep a sub-index per zone.
+    @abstractmethod
+    async def get_faceprints(
+        self, extracted_faceprints: rsid_py.ExtractedFaceprintsElement, zone: str | None = None
+    ) -> list:
+        ...
+
+    # Records of at most `limit` users starting at `cursor`, and the cursor of the next page (None when done)
+    @abstractmethod
+    async def export_page(self, cursor: str | None, limit: int) -> tuple[list[dict], str | None]:
         ...
 
+    # Upserts exported records, returns the number of records written
     @abstractmethod
-    async def get_faceprints(self, extracted_faceprints: rsid_py.ExtractedFaceprintsElement) -> list:
+    async def import_records(self, records: list[dict], dedupe: bool = True) -> int:
+        ...
+
+    # One search for several faceprints, results in the same order
+    @abstractmethod
+    async def get_faceprints_batch(
+        self, extracted_faceprints: list[rsid_py.ExtractedFaceprintsElement], zone: str | None = None
+    ) -> list[list]:
         ...
 
     @abstractmethod
     async def delete_user(self, user_id: str) -> None:
         ...
 
+    # Returns the user ids that were not found
+    @abstractmethod
+    async def delete_users(self, user_ids: list[str]) -> list[str]:
+        ...
+
     @abstractmethod
     async def delete_all_users(self) -> None:
         ...
@@ -2,21 +2,31 @@
 # Copyright (C) 2018-2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 
+import asyncio
 import datetime
-import multiprocessing
+import os
+import sqlite3
 import sys
+import time
 import uuid
+import weakref
+from collections.abc import Callable
+from contextlib import closing
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 import rsid_py
+from fastapi.concurrency import run_in_threadpool
 from loguru import logger
 from qdrant_client import QdrantClient, models, AsyncQdrantClient
 from qdrant_client.conversions import common_types as types
 from qdrant_client.http.models import Distance, PointStruct, VectorParams
 
-from .host_db_base import HostDBBase
+from .faceprints_cache import FaceprintsCache
+from .host_db_base import HostDBBase, faceprints_to_payload
+from .interprocess_lock import InterProcessLock
+from ..core import metrics
 from ..core.config import get_app_settings
 
 
@@ -24,8 +34,73 @@ def _rfc3339_string():
     return datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-4] + "Z"
 
 
+def _record_to_dict(record: types.Record | types.ScoredPoint) -> dict:
+    result = record.payload
+    result["point_id"] = str(record.id)
+    if isinstance(record, types.ScoredPoint):
+        result["score"] = record.score
+    return result
+
+
+def _file_version(file_path: Path) -> tuple[int, int]:
+    stat = file_path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _zone_filter(zone: str | None) -> models.Filter | None:
+    if zone is None:
+        return None
+    return models.Filter(must=[models.FieldCondition(key="groups", match=models.MatchValue(value=zone))])
+
+
+def vector_index_config(settings) -> dict[str, Any]:
+    """Collection vectors, HNSW and quantization configuration from the `host_mode_hnsw_*` settings."""
+    quantization_config = None
+    if settings.host_mode_quantization:
+        quantization_config = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    return {
+        "vectors_config": VectorParams(
+            size=RSID_NUM_OF_RECOGNITION_FEATURES,
+            distance=Distance.COSINE,
+            on_disk=settings.host_mode_vectors_on_disk,
+        ),
+        "hnsw_config": models.HnswConfigDiff(
+            m=settings.host_mode_hnsw_m, ef_construct=settings.host_mode_hnsw_ef_construct
+        ),
+        "quantization_config": quantization_config,
+    }
+
+
+def vector_search_params(settings) -> models.SearchParams:
+    quantization = None
+    if settings.host_mode_quantization:
+        quantization = models.QuantizationSearchParams(
+            rescore=settings.host_mode_quantization_rescore,
+            oversampling=settings.host_mode_quantization_oversampling,
+        )
+    return models.SearchParams(
+        hnsw_ef=settings.host_mode_hnsw_ef, exact=settings.host_mode_exact_search, quantization=quantization
+    )
+
+
 RSID_NUM_OF_RECOGNITION_FEATURES = 512
-DATABASE_LOCK = multiprocessing.Lock()
+# Qdrant local mode can only be opened by one client at a time, across all the processes (workers) using the DB.
+DATABASE_LOCK = InterProcessLock(Path(f"{get_app_settings().db_file}.session.lock"))
+# Sessions of an event loop queue here (FIFO) before waiting for DATABASE_LOCK: a single thread of the pool waits
+_loop_session_locks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = weakref.WeakKeyDictionary()
+
+
+async def _acquire_database_lock() -> None:
+    """Acquire DATABASE_LOCK from a thread, the event loop keeps running while e.g. a compaction holds it."""
+    acquire = asyncio.ensure_future(run_in_threadpool(DATABASE_LOCK.acquire))
+    try:
+        await asyncio.shield(acquire)
+    except asyncio.CancelledError:
+        # The thread still gets the lock, give it back
+        acquire.add_done_callback(lambda f: f.exception() is None and DATABASE_LOCK.release())
+        raise
 
 
 # Qdrant in local mode locks the DB files per client. Let's make every client close the connection
@@ -35,13 +110,23 @@ def __init__(self, deb_file: str):
         self._db_file = str(Path(deb_file).resolve())
 
     async def __aenter__(self):
-        DATABASE_LOCK.acquire()
+        loop = asyncio.get_running_loop()
+        self._session_lock = _loop_session_locks.setdefault(loop, asyncio.Lock())
+        await self._session_lock.acquire()
+        try:
+            await _acquire_database_lock()
+        except BaseException:
+            self._session_lock.release()
+            raise
         self.client = AsyncQdrantClient(path=self._db_file, force_disable_check_same_thread=True)
         return self.client
 
     async def __aexit__(self, exc_type, exc_value, exc_tb):
-        await self.client.close()
-        DATABASE_LOCK.release()
+        try:
+            await self.client.close()
+        finally:
+            DATABASE_LOCK.release()
+            self._session_lock.release()
 
 
 class HostDBLocalFile(HostDBBase):
@@ -51,31 +136,131 @@ def __init__(self, **kwargs: Any):
         super().__init__(**kwargs)
         self.db_file = str(get_app_settings().db_file)
         self.collections_name: str = "RealsenseID_FacePrints"
-        client: QdrantClient | None = None
-        try:
-            client = QdrantClient(path=self.db_file)
-            client.create_collection(
+        self.faceprints_cache = FaceprintsCache(max_mb=get_app_settings().host_mode_faceprints_cache_mb)
+        self.faceprints_cache.load_match_counts(self._match_counts_file)
+        index_config = vector_index_config(get_app_settings())
+        with DATABASE_LOCK:
+            client: QdrantClient | None = None
+            try:
+                client = QdrantClient(path=self.db_file)
+                client.create_collection(collection_name=self.collections_name, **index_config)
+            except ValueError:
+                # Existing collection: apply the current index settings (HNSW is rebuilt by the server if needed)
+                try:
+                    client.update_collection(
+                        collection_name=self.collections_name,
+                        vectors_config={"": models.VectorParamsDiff(on_disk=index_config["vectors_config"].on_disk)},
+                        hnsw_config=index_config["hnsw_config"],
+                        quantization_config=index_config["quantization_config"] or models.Disabled.DISABLED,
+                    )
+                except Exception as e:
+                    logger.warning(f"Unable to update {self.collections_name} index configuration: {e}")
+            # Group/zone tags are used to filter the search
+            try:
+                client.create_payload_index(
+                    collection_name=self.collections_name,
+                    field_name="groups",
+                    field_schema="keyword",
+                )
+            except Exception:
+                pass
+            # In server deployment, you want to enable indexing:
+            # try:
+            #    client.create_payload_index(
+            #        collection_name=self.collections_name,
+            #        field_name="user_id",
+            #        field_schema="keyword",
+            #    )
+            # except Exception:
+            #    pass
+            if client is not None:
+                client.close()
+
+    @property
+    def _match_counts_file(self) -> Path:
+        return Path(f"{self.db_file}.hits.json")
+
+    async def prewarm_faceprints_cache(self) -> None:
+        """Load the faceprints of the most frequently matched users into the faceprints cache."""
+        prewarm_count = get_app_settings().host_mode_faceprints_cache_prewarm
+        user_ids = self.faceprints_cache.most_matched(min(prewarm_count, self.faceprints_cache.max_entries))
+        if len(user_ids) == 0:
+            return
+        async with AsyncClosableDBSession(self.db_file) as client:
+            records, _ = await client.scroll(
                 collection_name=self.collections_name,
-                vectors_config=VectorParams(size=RSID_NUM_OF_RECOGNITION_FEATURES, distance=Distance.COSINE),
+                scroll_filter=models.Filter(
+                    must=[models.FieldCondition(key="user_id", match=models.MatchAny(any=user_ids))]
+                ),
+                limit=len(user_ids),
             )
-        except ValueError:
-            pass
-        # In server deployment, you want to enable indexing:
-        # try:
-        #    client.create_payload_index(
-        #        collection_name=self.collections_name,
-        #        field_name="user_id",
-        #        field_schema="keyword",
-        #    )
-        # except Exception:
-        #    pass
-        if client is not None:
+        for record in records:
+            self.faceprints_cache.get(_record_to_dict(record))
+        logger.info(f"Faceprints cache prewarmed with {len(records)} user(s): {self.faceprints_cache.stats}")
+
+    def save_faceprints_cache_stats(self) -> None:
+        self.faceprints_cache.save_match_counts(
+            self._match_counts_file, keep=get_app_settings().host_mode_faceprints_cache_prewarm
+        )
+
+    def storage_size(self) -> int:
+        """Size in bytes of the local storage files."""
+        return sum(f.stat().st_size for f in Path(self.db_file).rglob("*") if f.is_file())
+
+    def measure_load_seconds(self) -> float:
+        """Time it takes to open (load) the local DB, paid by every `AsyncClosableDBSession`."""
+        with DATABASE_LOCK:
+            start = time.perf_counter()
+            client = QdrantClient(path=self.db_file)
+            elapsed = time.perf_counter() - start
             client.close()
+        return elapsed
+
+    def storage_fragmentation(self) -> dict[Path, float]:
+        """Free page ratio of each collection's sqlite storage."""
+        result = {}
+        for storage_file in Path(self.db_file).glob("collection/*/storage.sqlite"):
+            with closing(sqlite3.connect(storage_file)) as con:
+                free_pages = con.execute("PRAGMA freelist_count").fetchone()[0]
+                pages = con.execute("PRAGMA page_count").fetchone()[0]
+            result[storage_file] = free_pages / pages if pages > 0 else 0.0
+        return result
+
+    def compact_storage(
+        self, storage_file: Path, attempts: int = 3, should_swap: Callable[[], bool] | None = None
+    ) -> bool:
+        """
+        Rewrite a collection's sqlite storage without free pages. The compacted copy is written while DB sessions
+        go on (VACUUM INTO reads a consistent snapshot), sessions only wait for it to be swapped in. Retried if the
+        storage was written meanwhile; returns False if it was written during every attempt, or if `should_swap`
+        returns False once the copy is written (e.g. the node got busy).
+        """
+        compacted_file = storage_file.with_name(f"{storage_file.name}.{os.getpid()}.compact")  # Per worker
+        try:
+            for _ in range(attempts):
+                before = _file_version(storage_file)
+                compacted_file.unlink(missing_ok=True)
+                with closing(sqlite3.connect(storage_file)) as con:
+                    con.execute("VACUUM INTO ?", (str(compacted_file),))
+                if should_swap is not None and not should_swap():
+                    logger.info(f"{storage_file} compaction not swapped in, the DB is in use")
+                    return False
+                with DATABASE_LOCK:
+                    if _file_version(storage_file) == before:
+                        os.replace(compacted_file, storage_file)
+                        return True
+                logger.info(f"{storage_file} written during compaction, retrying")
+            return False
+        finally:
+            compacted_file.unlink(missing_ok=True)
 
     # Production notes: client should use a server and should be a member variable (self.client) so that
     # it can be reused.
 
-    async def add_faceprints(self, user_id: str, faceprints: rsid_py.Faceprints) -> None:
+    @metrics.timed("db_add", metrics.DB_DEVICE)
+    async def add_faceprints(
+        self, user_id: str, faceprints: rsid_py.Faceprints, groups: list[str] | None = None
+    ) -> None:
         async with AsyncClosableDBSession(self.db_file) as client:
             collection_info = await client.get_collection(collection_name=self.collections_name)
             logger.info(f"Before: Collection: {self.collections_name} - {collection_info.points_count} records.")
@@ -90,12 +275,8 @@ async def add_faceprints(self, user_id: str, faceprints: rsid_py.Faceprints) ->
                         vector=vector,
                         payload={
                             "user_id": user_id,
-                            "flags": faceprints.flags,
-                            "version": faceprints.version,
-                            "features_type": faceprints.features_type,
-                            "adaptive_descriptor_nomask": faceprints.adaptive_descriptor_nomask,
-                            "adaptive_descriptor_withmask": faceprints.adaptive_descriptor_withmask,
-                            "enroll_descriptor": faceprints.enroll_descriptor,
+                            "groups": groups or [],
+                            **faceprints_to_payload(faceprints),
                             "created_at": _rfc3339_string()
                         },
                     )
@@ -104,6 +285,7 @@ async def add_faceprints(self, user_id: str, faceprints: rsid_py.Faceprints) ->
             collection_info = await client.get_collection(collection_name=self.collections_name)
             logger.info(f"After: Collection: {self.collections_name} - {collection_info.points_count} records.")
 
+    @metrics.timed("db_update", metrics.DB_DEVICE)
     async def update_faceprints(self, user_id: str, faceprints: rsid_py.Faceprints) -> None:
         async with AsyncClosableDBSession(self.db_file) as client:
             collection_info = await client.get_collection(collection_name=self.collections_name)
@@ -114,43 +296,81 @@ async def update_faceprints(self, user_id: str, faceprints: rsid_py.Faceprints)
             records = await self._validate_single_user(client, user_id)
             point_id = records[0].id
 
-            vector = faceprints.enroll_descriptor[:RSID_NUM_OF_RECOGNITION_FEATURES]
             await client.batch_update_points(
                 collection_name=self.collections_name,
                 wait=True,
-                update_operations=[
-                    models.UpdateVectorsOperation(
-                        update_vectors=models.UpdateVectors(
-                            points=[
-                                models.PointVectors(
-                                    id=point_id,
-                                    vector=vector,
-                                )
-                            ]
-                        )
-                    ),
-                    # Don't use overwrite_payload to maintain `created_at`
-                    models.SetPayloadOperation(
-                        set_payload=models.SetPayload(
-                            payload={
-                                "flags": faceprints.flags,
-                                "version": faceprints.version,
-                                "features_type": faceprints.features_type,
-                                "adaptive_descriptor_nomask": faceprints.adaptive_descriptor_nomask,
-                                "adaptive_descriptor_withmask": faceprints.adaptive_descriptor_withmask,
-                                "enroll_descriptor": faceprints.enroll_descriptor,
-                                "updated_at": _rfc3339_string()
-                            },
-                            points=[point_id],
-                        )
-                    ),
-                ],
+                update_operations=self._update_operations(point_id, faceprints_to_payload(faceprints)),
             )
+            self.faceprints_cache.invalidate(point_id)
             collection_info = await client.get_collection(collection_name=self.collections_name)
             logger.info(
                 f"update_faceprints: < Collection: {self.collections_name} - {collection_info.points_count} records."
             )
 
+    @metrics.timed("db_update_batch", metrics.DB_DEVICE)
+    async def update_faceprints_batch(self, updates: dict[str, dict[str, Any]]) -> list[str]:
+        """
+        Apply faceprints payloads (user_id -> payload) in a single session and a single batch update.
+        Returns the user ids that could not be updated.
+        """
+        async with AsyncClosableDBSession(self.db_file) as client:
+            records, _ = await client.scroll(
+                collection_name=self.collections_name,
+                scroll_filter=models.Filter(
+                    must=[models.FieldCondition(key="user_id", match=models.MatchAny(any=list(updates.keys())))]
+                ),
+                limit=len(updates) * 2,
+            )
+            point_ids: dict[str, list] = {}
+            for record in records:
+                point_ids.setdefault(record.payload["user_id"], []).append(record.id)
+
+            operations = []
+            skipped = []
+            for user_id, payload in updates.items():
+                user_point_ids = point_ids.get(user_id, [])
+                if len(user_point_ids) != 1:
+                    logger.error(f"update_faceprints_batch: {len(user_point_ids)} records found for user {user_id}")
+                    skipped.append(user_id)
+                    continue
+                operations.extend(self._update_operations(user_point_ids[0], payload))
+
+            if len(operations) > 0:
+                await client.batch_update_points(
+                    collection_name=self.collections_name,
+                    wait=True,
+                    update_operations=operations,
+                )
+            for user_id in updates.keys() - set(skipped):
+                self.faceprints_cache.invalidate(point_ids[user_id][0])
+        logger.info(f"update_faceprints_batch: updated {len(updates) - len(skipped)} user(s)")
+        return skipped
+
+    def _update_operations(self, point_id, payload: dict[str, Any]) -> list:
+        vector = payload["enroll_descriptor"][:RSID_NUM_OF_RECOGNITION_FEATURES]
+        return [
+            models.UpdateVectorsOperation(
+                update_vectors=models.UpdateVectors(
+                    points=[
+                        models.PointVectors(
+                            id=point_id,
+                            vector=vector,
+                        )
+                    ]
+                )
+            ),
+            # Don't use overwrite_payload to maintain `created_at`
+            models.SetPayloadOperation(
+                set_payload=models.SetPayload(
+                    payload={
+                        **payload,
+                        "updated_at": _rfc3339_string()
+                    },
+                    points=[point_id],
+                )
+            ),
+        ]
+
     async def get_user_ids(self) -> list[str]:
         records: list[types.Record]
         async with AsyncClosableDBSession(self.db_file) as client:
@@ -162,35 +382,103 @@ async def get_user_ids(self) -> list[str]:
             users.append(record.payload["user_id"])
         return users
 
-    async def get_all_faceprints(self) -> list:
+    async def count_users(self) -> int:
+        async with AsyncClosableDBSession(self.db_file) as client:
+            result = await client.count(collection_name=self.collections_name, exact=True)
+        return result.count
+
+    @metrics.timed("db_scan", metrics.DB_DEVICE)
+    async def get_all_faceprints(self, zone: str | None = None) -> list:
         records: list[types.Record]
         async with AsyncClosableDBSession(self.db_file) as client:
             collection_info = await client.get_collection(collection_name=self.collections_name)
             logger.info(f"Collection: {self.collections_name} - {collection_info.points_count} records.")
-            records, _ = await client.scroll(limit=sys.maxsize, collection_name=self.collections_name)
+            records, _ = await client.scroll(
+                limit=sys.maxsize, collection_name=self.collections_name, scroll_filter=_zone_filter(zone)
+            )
         result = []
         for record in records:
-            result.append(record.payload)
+            result.append(_record_to_dict(record))
         return result
 
-    async def get_faceprints(self, extracted_faceprints: rsid_py.ExtractedFaceprintsElement) -> list:
-        records: list[types.ScoredPoint]
+    def _query_request(
+        self, extracted_faceprints: rsid_py.ExtractedFaceprintsElement, zone: str | None
+    ) -> models.QueryRequest:
+        vector = extracted_faceprints.features[:RSID_NUM_OF_RECOGNITION_FEATURES]
+        return models.QueryRequest(
+            query=np.array(vector, dtype=float).tolist(),
+            filter=_zone_filter(zone),
+            params=vector_search_params(get_app_settings()),
+            limit=get_app_settings().host_mode_hybrid_max_results,
+            score_threshold=get_app_settings().host_mode_hybrid_score_threshold,
+            with_payload=True,
+        )
+
+    async def get_faceprints(
+        self, extracted_faceprints: rsid_py.ExtractedFaceprintsElement, zone: str | None = None
+    ) -> list:
+        return (await self.get_faceprints_batch([extracted_faceprints], zone))[0]
+
+    @metrics.timed("db_search", metrics.DB_DEVICE)
+    async def get_faceprints_batch(
+        self, extracted_faceprints: list[rsid_py.ExtractedFaceprintsElement], zone: str | None = None
+    ) -> list[list]:
+        responses: list[types.QueryResponse]
         async with AsyncClosableDBSession(self.db_file) as client:
             collection_info = await client.get_collection(collection_name=self.collections_name)
             logger.info(f"Collection: {self.collections_name} - {collection_info.points_count} records.")
-            vector = extracted_faceprints.features[:RSID_NUM_OF_RECOGNITION_FEATURES]
-            vector = np.array(vector, dtype=float)
-            records = await client.search(
+            responses = await client.query_batch_points(
                 collection_name=self.collections_name,
-                search_params=models.SearchParams(hnsw_ef=128, exact=False),
-                query_vector=vector,
-                limit=get_app_settings().host_mode_hybrid_max_results,
-                score_threshold=get_app_settings().host_mode_hybrid_score_threshold,
+                requests=[self._query_request(extracted, zone) for extracted in extracted_faceprints],
             )
-        result = []
-        for record in records:
-            result.append(record.payload)
-        return result
+        return [[_record_to_dict(record) for record in response.points] for response in responses]
+
+    async def export_page(self, cursor: str | None, limit: int) -> tuple[list[dict], str | None]:
+        async with AsyncClosableDBSession(self.db_file) as client:
+            records, next_offset = await client.scroll(
+                collection_name=self.collections_name,
+                limit=limit,
+                offset=cursor,
+                with_payload=True,
+                with_vectors=False,
+            )
+        return [_record_to_dict(record) for record in records], None if next_offset is None else str(next_offset)
+
+    async def import_records(self, records: list[dict], dedupe: bool = True) -> int:
+        # Last record wins for the same point id (or user id when deduping)
+        by_key = {(r["user_id"] if dedupe else r.get("point_id") or str(uuid.uuid4())): r for r in records}
+        records = list(by_key.values())
+        async with AsyncClosableDBSession(self.db_file) as client:
+            if dedupe:
+                existing, _ = await client.scroll(
+                    collection_name=self.collections_name,
+                    scroll_filter=models.Filter(
+                        must=[models.FieldCondition(key="user_id", match=models.MatchAny(any=list(by_key.keys())))]
+                    ),
+                    limit=len(records) + 1,
+                )
+                existing_points = {record.payload["user_id"]: str(record.id) for record in existing}
+                # Keep the users already in the DB, unless it's the same record (resumed import)
+                records = [
+                    r for r in records if existing_points.get(r["user_id"], r.get("point_id")) == r.get("point_id")
+                ]
+            points = []
+            for record in records:
+                payload = {key: value for key, value in record.items() if key not in ("point_id", "score")}
+                payload.setdefault("groups", [])
+                payload.setdefault("created_at", _rfc3339_string())
+                points.append(
+                    PointStruct(
+                        id=record.get("point_id") or str(uuid.uuid4()),
+                        vector=payload["enroll_descriptor"][:RSID_NUM_OF_RECOGNITION_FEATURES],
+                        payload=payload,
+                    )
+                )
+            if len(points) > 0:
+                await client.upsert(collection_name=self.collections_name, points=points, wait=True)
+        for point in points:
+            self.faceprints_cache.invalidate(point.id)
+        return len(points)
 
     async def delete_user(self, user_id: str) -> None:
         async with AsyncClosableDBSession(self.db_file) as client:
@@ -201,6 +489,8 @@ async def delete_user(self, user_id: str) -> None:
                 points_selector=[point_id],
                 wait=True,
             )
+            self.faceprints_cache.invalidate(point_id)
+            self.faceprints_cache.forget_user(user_id)
             collection_info = await client.get_collection(collection_name=self.collections_name)
             logger.info(f"Collection: {self.collections_name} - {collection_info.points_count} records.")
 
@@ -227,7 +517,43 @@ async def _validate_single_user(self, client, user_id):
             raise RuntimeError(f"No records were found with this user_id {user_id}!")
         return records
 
+    async def delete_users(self, user_ids: list[str]) -> list[str]:
+        async with AsyncClosableDBSession(self.db_file) as client:
+            records, _ = await client.scroll(
+                collection_name=self.collections_name,
+                scroll_filter=models.Filter(
+                    must=[models.FieldCondition(key="user_id", match=models.MatchAny(any=user_ids))]
+                ),
+                limit=len(user_ids) + 1,
+            )
+            if len(records) > 0:
+                await client.delete(
+                    collection_name=self.collections_name,
+                    points_selector=[record.id for record in records],
+                    wait=True,
+                )
+        deleted = set()
+        for record in records:
+            self.faceprints_cache.invalidate(record.id)
+            self.faceprints_cache.forget_user(record.payload["user_id"])
+            deleted.add(record.payload["user_id"])
+        logger.info(f"Collection: {self.collections_name} - deleted {len(records)} records.")
+        return [user_id for user_id in user_ids if user_id not in deleted]
+
     async def delete_all_users(self) -> None:
-        # TODO: Implement
-        # delete_collection
-        raise RuntimeError("Not implemented in host mode")
+        # Dropping the collection is O(1) whatever the number of users. No other session can see the collection
+        # missing: sessions are serialized by DATABASE_LOCK.
+        async with AsyncClosableDBSession(self.db_file) as client:
+            await client.delete_collection(collection_name=self.collections_name)
+            await client.create_collection(
+                collection_name=self.collections_name, **vector_index_config(get_app_settings())
+            )
+            try:
+                await client.create_payload_index(
+                    collection_name=self.collections_name, field_name="groups", field_schema="keyword"
+                )
+            except Exception:
+                pass
+        self.faceprints_cache.clear()
+        self.faceprints_cache.forget_all_users()
+        logger.info(f"Collection: {self.collections_name} - recreated empty.")
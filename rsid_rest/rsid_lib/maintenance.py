@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import datetime
+import functools
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+if TYPE_CHECKING:
+    from .host_db_local_file import HostDBLocalFile
+
+
+@dataclass
+class MaintenanceReport:
+    compacted: int
+    size_before: int
+    size_after: int
+    load_seconds_before: float
+    load_seconds_after: float
+
+    def __str__(self):
+        return (
+            f"compacted {self.compacted} storage file(s), "
+            f"size {self.size_before / 1024 / 1024:.2f} MB -> {self.size_after / 1024 / 1024:.2f} MB, "
+            f"load time {self.load_seconds_before * 1000:.1f} ms -> {self.load_seconds_after * 1000:.1f} ms"
+        )
+
+
+def _parse_window(window: str) -> tuple[datetime.time, datetime.time]:
+    start, end = window.split("-")
+    return datetime.time.fromisoformat(start), datetime.time.fromisoformat(end)
+
+
+class MaintenanceScheduler:
+    """
+    Compacts the local DB storage once per quiet hours window (e.g. "02:00-05:00", local time).
+    Adaptive updates and deletes leave free pages behind, which every DB session pays for when it reloads the DB.
+    Each file is compacted into a copy that is swapped in once the storage is not written, so it waits until there
+    was no authentication for `idle_seconds` before each file, and drops the copy if there was one while it was
+    written. Only for the local file DB: the storage files are qdrant-client's, not a public interface.
+    """
+
+    def __init__(
+        self,
+        db: "HostDBLocalFile",
+        window: str,
+        idle_seconds: float,
+        min_fragmentation: float,
+        check_interval: float = 60.0,
+    ):
+        self._db = db
+        self._window_start, self._window_end = _parse_window(window)
+        self._idle_seconds = idle_seconds
+        self._min_fragmentation = min_fragmentation
+        self._check_interval = check_interval
+        self._last_activity: float = 0.0
+        self._last_window: datetime.datetime | None = None
+        self._task: asyncio.Task | None = None
+        self.last_report: MaintenanceReport | None = None
+
+    def note_activity(self) -> None:
+        self._last_activity = time.monotonic()
+
+    @property
+    def idle(self) -> bool:
+        return time.monotonic() - self._last_activity >= self._idle_seconds
+
+    def _idle_since(self, started: float) -> bool:
+        return self._last_activity < started
+
+    def current_window(self, now: datetime.datetime | None = None) -> datetime.datetime | None:
+        """Start of the quiet hours window `now` is in, None if outside quiet hours."""
+        now = now or datetime.datetime.now()
+        start = datetime.datetime.combine(now.date(), self._window_start)
+        if now < start:
+            start -= datetime.timedelta(days=1)
+        end = datetime.datetime.combine(start.date(), self._window_end)
+        if end <= start:
+            end += datetime.timedelta(days=1)  # Window wraps around midnight
+        return start if now < end else None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="db-maintenance")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._check_interval)
+            window = self.current_window()
+            if window is None or window == self._last_window:
+                continue
+            try:
+                if await self.run_once():
+                    self._last_window = window
+            except Exception as e:
+                logger.error(f"DB maintenance failed: {e}")
+                self._last_window = window  # Don't retry in a loop, next window will
+
+    async def _wait_until_idle(self) -> bool:
+        while not self.idle:
+            if self.current_window() is None:
+                return False
+            await asyncio.sleep(min(self._idle_seconds, self._check_interval))
+        return True
+
+    async def run_once(self, force: bool = False) -> bool:
+        """Compact fragmented storage. Returns False if quiet hours ended before it could complete."""
+        fragmentation = await run_in_threadpool(self._db.storage_fragmentation)
+        to_compact = [f for f, ratio in fragmentation.items() if force or ratio >= self._min_fragmentation]
+        if len(to_compact) == 0:
+            logger.info("DB maintenance: storage fragmentation below threshold, nothing to do")
+            return True
+
+        size_before = await run_in_threadpool(self._db.storage_size)
+        load_before = await run_in_threadpool(self._db.measure_load_seconds)
+        compacted = 0
+        for storage_file in to_compact:
+            if not force and not await self._wait_until_idle():
+                logger.info(f"DB maintenance: quiet hours ended, compacted {compacted}/{len(to_compact)} file(s)")
+                return False
+            logger.info(f"DB maintenance: compacting {storage_file} ({fragmentation[storage_file]:.0%} free pages)")
+            started = time.monotonic()
+            should_swap = None if force else functools.partial(self._idle_since, started)
+            if await run_in_threadpool(self._db.compact_storage, storage_file, should_swap=should_swap):
+                compacted += 1
+            else:
+                logger.info(f"DB maintenance: {storage_file} written or authenticated against meanwhile, skipped")
+
+        self.last_report = MaintenanceReport(
+            compacted=compacted,
+            size_before=size_before,
+            size_after=await run_in_threadpool(self._db.storage_size),
+            load_seconds_before=load_before,
+            load_seconds_after=await run_in_threadpool(self._db.measure_load_seconds),
+        )
+        logger.info(f"DB maintenance: {self.last_report}")
+        return True
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import multiprocessing
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Any
+
+import rsid_py
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from .host_db_base import faceprints_from_payload, faceprints_to_payload
+
+
+def extracted_to_payload(extracted: rsid_py.ExtractedFaceprintsElement) -> dict[str, Any]:
+    return {
+        "flags": extracted.flags,
+        "version": extracted.version,
+        "features_type": extracted.features_type,
+        "features": extracted.features,
+    }
+
+
+def extracted_from_payload(payload: dict[str, Any]) -> rsid_py.ExtractedFaceprintsElement:
+    extracted = rsid_py.ExtractedFaceprintsElement()
+    extracted.flags = payload["flags"]
+    extracted.version = payload["version"]
+    extracted.features_type = payload["features_type"]
+    extracted.features = payload["features"]
+    return extracted
+
+
+def default_matcher_factory():
+    # Matching runs on the host, an authenticator that is not connected to any port is enough.
+    return rsid_py.FaceAuthenticator()
+
+
+class MatcherWorkerDied(RuntimeError):
+    """A matcher worker process exited (crash, OOM kill...): its shard is lost until the pool is reloaded."""
+
+
+@dataclass
+class MatcherPoolResult:
+    point_id: str
+    user_id: str
+    groups: list[str]
+    score: int
+    should_update: bool
+    # Faceprints to keep for the user: the adapted ones when `should_update` is set
+    faceprints: dict[str, Any]
+
+
+def _worker_main(conn: Connection, matcher_factory: Callable) -> None:
+    matcher = matcher_factory()
+    # point_id -> (user_id, groups, faceprints)
+    gallery: dict[str, tuple[str, list[str], rsid_py.Faceprints]] = {}
+    while True:
+        try:
+            command, *args = conn.recv()
+        except EOFError:
+            break
+        try:
+            if command == "close":
+                break
+            elif command == "load":
+                records: list[dict] = args[0]
+                gallery = {
+                    r["point_id"]: (r["user_id"], r.get("groups") or [], faceprints_from_payload(r)) for r in records
+                }
+                conn.send(("ok", len(gallery)))
+            elif command == "update":
+                user_id, payload = args
+                updated = 0
+                for point_id, (record_user_id, groups, _) in gallery.items():
+                    if record_user_id == user_id:
+                        gallery[point_id] = (user_id, groups, faceprints_from_payload(payload))
+                        updated += 1
+                conn.send(("ok", updated))
+            elif command == "match":
+                extracted_payload, point_ids, zone = args
+                extracted = extracted_from_payload(extracted_payload)
+                best: MatcherPoolResult | None = None
+                candidates = gallery.keys() if point_ids is None else [p for p in point_ids if p in gallery]
+                for point_id in candidates:
+                    user_id, groups, db_faceprints = gallery[point_id]
+                    if zone is not None and zone not in groups:
+                        continue
+                    out_faceprints = rsid_py.Faceprints()
+                    match_result = matcher.match_faceprints(extracted, db_faceprints, out_faceprints)
+                    if match_result.success and (best is None or match_result.score > best.score):
+                        best = MatcherPoolResult(
+                            point_id=point_id,
+                            user_id=user_id,
+                            groups=groups,
+                            score=match_result.score,
+                            should_update=match_result.should_update,
+                            faceprints=faceprints_to_payload(
+                                out_faceprints if match_result.should_update else db_faceprints
+                            ),
+                        )
+                conn.send(("ok", best))
+            else:
+                conn.send(("error", f"Unknown matcher command {command}"))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+    conn.close()
+
+
+class _MatcherWorker:
+    def __init__(self, ctx, index: int, matcher_factory: Callable):
+        self.index = index
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, matcher_factory), name=f"rsid-matcher-{index}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+
+    def call(self, *message) -> Any:
+        with self.lock:
+            try:
+                self.conn.send(message)
+                status, result = self.conn.recv()
+            except (EOFError, OSError) as e:  # BrokenPipeError, ConnectionResetError
+                raise MatcherWorkerDied(
+                    f"Matcher worker {self.index} died (exit code {self.process.exitcode}): {type(e).__name__}"
+                ) from e
+        if status != "ok":
+            raise RuntimeError(f"Matcher worker {self.index}: {result}")
+        return result
+
+    def close(self) -> None:
+        with self.lock:
+            try:
+                self.conn.send(("close",))
+            except (OSError, BrokenPipeError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+
+
+class MatcherPool:
+    """
+    Worker processes, each holding a shard of the host DB gallery and its own matching context.
+    A match request is fanned out to all shards and the best result per shard is reduced to one.
+
+    A worker that died is respawned empty and the pool marked stale: the call raises `MatcherWorkerDied`, the caller
+    matches in process and the next match reloads the shards.
+    """
+
+    def __init__(self, workers: int, matcher_factory: Callable = default_matcher_factory):
+        self.size = workers
+        self._matcher_factory = matcher_factory
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: list[_MatcherWorker] = []
+        self._lock = threading.Lock()
+        self.stale = True
+
+    def start(self) -> None:
+        with self._lock:
+            if len(self._workers) > 0:
+                return
+            self._workers = [_MatcherWorker(self._ctx, i, self._matcher_factory) for i in range(self.size)]
+            logger.info(f"Started matcher pool with {self.size} worker(s)")
+
+    def close(self) -> None:
+        with self._lock:
+            for worker in self._workers:
+                worker.close()
+            self._workers = []
+            self.stale = True
+
+    def invalidate(self) -> None:
+        self.stale = True
+
+    async def _broadcast(self, *messages) -> list[Any]:
+        workers = list(self._workers)
+        results = await asyncio.gather(
+            *(run_in_threadpool(worker.call, *message) for worker, message in zip(workers, messages, strict=True)),
+            return_exceptions=True,
+        )
+        died = [r for r in results if isinstance(r, MatcherWorkerDied)]
+        if len(died) > 0:
+            self._respawn([w for w, r in zip(workers, results, strict=True) if isinstance(r, MatcherWorkerDied)])
+            raise died[0]
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    def _respawn(self, dead: list[_MatcherWorker]) -> None:
+        with self._lock:
+            for worker in dead:
+                worker.close()
+                if worker in self._workers:  # Not respawned by a concurrent call
+                    logger.error(f"Matcher worker {worker.index} died (exit code {worker.process.exitcode}), "
+                                 "respawning")
+                    self._workers[worker.index] = _MatcherWorker(self._ctx, worker.index, self._matcher_factory)
+            # The new workers hold no shard
+            self.stale = True
+
+    async def load(self, records: list[dict]) -> None:
+        self.start()
+        # Round-robin sharding keeps the shards balanced regardless of point id distribution
+        shards = [records[i:: self.size] for i in range(self.size)]
+        await self._broadcast(*(("load", shard) for shard in shards))
+        self.stale = False
+        logger.info(f"Matcher pool loaded {len(records)} faceprints in {self.size} shard(s)")
+
+    async def update(self, user_id: str, faceprints: rsid_py.Faceprints) -> None:
+        if self.stale:
+            return  # Next load() picks up the change
+        payload = faceprints_to_payload(faceprints)
+        await self._broadcast(*(("update", user_id, payload) for _ in self._workers))
+
+    async def match(
+        self,
+        extracted: rsid_py.ExtractedFaceprintsElement | dict[str, Any],
+        point_ids: list[str] | None = None,
+        zone: str | None = None,
+    ) -> MatcherPoolResult | None:
+        payload = extracted if isinstance(extracted, dict) else extracted_to_payload(extracted)
+        results = await self._broadcast(*(("match", payload, point_ids, zone) for _ in self._workers))
+        best: MatcherPoolResult | None = None
+        for result in results:
+            if result is not None and (best is None or result.score > best.score):
+                best = result
+        return best
@@ -50,6 +50,27 @@ class CommonOperationResponse(
     message: Optional[str]
 
 
+class BulkDeleteRequest(BaseModel, validate_assignment=True):
+    user_ids: list[str] = Field(min_length=1, max_length=10000)
+
+
+class BulkDeleteResponse(BaseModel, validate_assignment=True):
+    status: StatusEnum
+    deleted: list[str]
+    not_found: list[str]
+
+
+class ImportResponse(BaseModel, validate_assignment=True):
+    status: StatusEnum
+    imported: int
+    skipped: int
+    cursor: Optional[str] = Field(
+        json_schema_extra={
+            "description": "Last export cursor fully imported. Resume the export from it if the import was interrupted.",
+        }
+    )
+
+
 class DeviceConfig(BaseModel, validate_assignment=True):
     algo_flow: AlgoFlowEnum = Field(
         json_schema_extra={
@@ -188,6 +209,47 @@ class AuthenticationResponse(
     )
 
 
+class ExtractedFaceprints(BaseModel, validate_assignment=True):
+    id: Optional[str] = Field(
+        default=None, json_schema_extra={"description": "Caller reference, echoed in the matching result"}
+    )
+    flags: int = 0
+    version: int = rsid_py.RSID_FACEPRINTS_VERSION
+    features_type: int = 0
+    features: list[int] = Field(
+        min_length=rsid_py.RSID_FEATURES_VECTOR_ALLOC_SIZE,
+        max_length=rsid_py.RSID_FEATURES_VECTOR_ALLOC_SIZE,
+        json_schema_extra={"description": "Extracted faceprints features, as returned by the device"},
+    )
+
+    def to_rsid_py(self) -> rsid_py.ExtractedFaceprintsElement:
+        extracted = rsid_py.ExtractedFaceprintsElement()
+        extracted.flags = self.flags
+        extracted.version = self.version
+        extracted.features_type = self.features_type
+        extracted.features = self.features
+        return extracted
+
+
+class MatchBatchRequest(BaseModel, validate_assignment=True):
+    items: list[ExtractedFaceprints] = Field(min_length=1, max_length=1000)
+    zone: Optional[str] = Field(
+        default=None, json_schema_extra={"description": "Only match users enrolled in this group/zone"}
+    )
+
+
+class MatchResult(BaseModel, validate_assignment=True):
+    id: Optional[str]
+    status: AuthenticateStatusEnum
+    user_id: Optional[str]
+    score: Optional[int]
+    should_update: bool
+
+
+class MatchBatchResponse(BaseModel, validate_assignment=True):
+    results: list[MatchResult]
+
+
 class EnrollResponse(BaseModel, validate_assignment=True):
     status: EnrollStatusEnum = Field(
         json_schema_extra={
@@ -298,3 +360,76 @@ class FWUpdateStatusReportResponse(BaseModel, validate_assignment=True):
     db_compat_display_message: str
     update_policy_compat: bool
     update_policy_compat_display_message: str
+
+
+class EventLoopStallModel(BaseModel, validate_assignment=True):
+    timestamp: float = Field(json_schema_extra={"description": "Unix time at which the stall was detected"})
+    seconds: float
+    stack: str = Field(json_schema_extra={"description": "Stack of the event loop thread: the blocking frame"})
+
+
+class EventLoopStatsResponse(BaseModel, validate_assignment=True):
+    lag_seconds: Optional[float] = Field(json_schema_extra={"description": "Last event loop lag sample"})
+    max_lag_seconds: Optional[float] = Field(json_schema_extra={"description": "Over the last minute"})
+    p99_lag_seconds: Optional[float] = Field(json_schema_extra={"description": "Over the last minute"})
+    threadpool_in_flight: int
+    threadpool_queued: int
+    threadpool_capacity: int
+    stalls: int
+    recent_stalls: list[EventLoopStallModel]
+
+
+class ProfileInfoModel(BaseModel, validate_assignment=True):
+    id: str = Field(json_schema_extra={"description": "Request id (X-Request-ID) of the profiled request"})
+    method: str
+    path: str
+    status_code: Optional[int]
+    seconds: float
+    timestamp: float
+
+
+class WarmupStepModel(BaseModel, validate_assignment=True):
+    name: str
+    done: bool
+    attempts: int
+    seconds: Optional[float] = Field(json_schema_extra={"description": "Duration of the last attempt"})
+    error: Optional[str] = Field(json_schema_extra={"description": "Error of the last attempt"})
+
+
+class HealthResponse(BaseModel, validate_assignment=True):
+    status: str
+    device_reachable: Optional[bool] = Field(json_schema_extra={"description": "None until the first probe"})
+    serial_number: Optional[str]
+    firmware_version: Optional[str]
+    device_error: Optional[str]
+    device_checked_at: Optional[float] = Field(json_schema_extra={"description": "Unix time of the last probe"})
+    db_readable: Optional[bool] = Field(json_schema_extra={"description": "None in device DB mode"})
+    db_users: Optional[int]
+    db_error: Optional[str]
+    db_checked_at: Optional[float] = Field(json_schema_extra={"description": "Unix time of the last probe"})
+    device_queue_depth: Optional[int] = Field(json_schema_extra={"description": "Requests waiting for the device"})
+    threadpool_queued: Optional[int] = Field(json_schema_extra={"description": "Calls waiting for a worker thread"})
+    updated_at: float = Field(json_schema_extra={"description": "Unix time at which this response was built"})
+
+
+class ReadinessResponse(BaseModel, validate_assignment=True):
+    ready: bool
+    reasons: list[str] = Field(json_schema_extra={"description": "Why the app is not ready"})
+    warmup_seconds: Optional[float] = Field(json_schema_extra={"description": "Start to ready"})
+    warmup_steps: list[WarmupStepModel]
+    health: HealthResponse
+
+
+class PreviewStatsResponse(BaseModel, validate_assignment=True):
+    subscribers: int
+    running: bool
+    starts: int
+    stops: int
+    last_start_seconds: Optional[float] = Field(
+        json_schema_extra={"description": "Camera start latency of the last preview start"}
+    )
+    last_first_frame_seconds: Optional[float] = Field(
+        json_schema_extra={"description": "Time from the last preview start to its first frame"}
+    )
+    avg_start_seconds: Optional[float]
+    avg_first_frame_seconds: Optional[float]
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import time
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+
+from loguru import logger
+
+
+@dataclass
+class PreviewLifecycleStats:
+    subscribers: int
+    running: bool
+    starts: int
+    stops: int
+    # Seconds spent in `start()`, and from `start()` to the first frame, for the last start
+    last_start_seconds: float | None
+    last_first_frame_seconds: float | None
+    # Averages over all starts
+    avg_start_seconds: float | None
+    avg_first_frame_seconds: float | None
+
+
+class PreviewLifecycleManager:
+    """
+    Reference counts the preview subscribers (stream tickets, shared memory ring readers...).
+    The preview starts with the first subscriber. When the last one leaves, it is kept warm for `keep_warm` seconds:
+    a page reload or a network blip reconnects to the running preview instead of paying the camera start latency.
+    """
+
+    ALWAYS_ON = "always-on"
+
+    def __init__(self, start: Callable[[], None], stop: Callable[[], None], keep_warm: float):
+        self._start = start
+        self._stop = stop
+        self._keep_warm = keep_warm
+        self._lock = threading.RLock()
+        self._subscribers: set[Hashable] = set()
+        self._running = False
+        self._stop_timer: threading.Timer | None = None
+        self._started_at: float | None = None
+        self._starts = 0
+        self._stops = 0
+        self._first_frames = 0
+        self._last_start_seconds: float | None = None
+        self._last_first_frame_seconds: float | None = None
+        self._total_start_seconds = 0.0
+        self._total_first_frame_seconds = 0.0
+
+    def acquire(self, subscriber: Hashable) -> int:
+        """Subscribe, starting the preview if needed. Returns the subscriber count."""
+        with self._lock:
+            self._cancel_stop_timer()
+            if not self._running:
+                started_at = time.monotonic()
+                self._start()
+                self._running = True
+                self._started_at = started_at
+                self._starts += 1
+                self._last_start_seconds = time.monotonic() - started_at
+                self._total_start_seconds += self._last_start_seconds
+                logger.info(f"Preview started in {self._last_start_seconds * 1000:.0f} ms")
+            self._subscribers.add(subscriber)
+            return len(self._subscribers)
+
+    def release(self, subscriber: Hashable) -> int:
+        """Unsubscribe, the preview stops after the keep warm period once nobody is subscribed."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if len(self._subscribers) == 0 and self._running:
+                if self._keep_warm > 0:
+                    logger.info(f"No more audience. Keeping preview warm for {self._keep_warm} s")
+                    self._stop_timer = threading.Timer(self._keep_warm, self._on_keep_warm_expired)
+                    self._stop_timer.daemon = True
+                    self._stop_timer.start()
+                else:
+                    self._stop_if_unused()
+            return len(self._subscribers)
+
+    def is_subscribed(self, subscriber: Hashable) -> bool:
+        with self._lock:
+            return subscriber in self._subscribers
+
+    def keep_always_on(self) -> None:
+        """Start the preview now and never stop it."""
+        try:
+            self.acquire(self.ALWAYS_ON)
+        except Exception as e:
+            logger.error(f"Failed to start always-on preview: {e}")
+
+    def frame_received(self) -> None:
+        # Called for every frame, from the SDK preview callback: keep it cheap
+        started_at = self._started_at
+        if started_at is None:
+            return
+        with self._lock:
+            if self._started_at is None:
+                return
+            self._started_at = None
+            self._first_frames += 1
+            self._last_first_frame_seconds = time.monotonic() - started_at
+            self._total_first_frame_seconds += self._last_first_frame_seconds
+            logger.info(f"Preview first frame after {self._last_first_frame_seconds * 1000:.0f} ms")
+
+    def stats(self) -> PreviewLifecycleStats:
+        with self._lock:
+            return PreviewLifecycleStats(
+                subscribers=len(self._subscribers),
+                running=self._running,
+                starts=self._starts,
+                stops=self._stops,
+                last_start_seconds=self._last_start_seconds,
+                last_first_frame_seconds=self._last_first_frame_seconds,
+                avg_start_seconds=self._total_start_seconds / self._starts if self._starts > 0 else None,
+                avg_first_frame_seconds=(
+                    self._total_first_frame_seconds / self._first_frames if self._first_frames > 0 else None
+                ),
+            )
+
+    def _cancel_stop_timer(self) -> None:
+        if self._stop_timer is not None:
+            self._stop_timer.cancel()
+            self._stop_timer = None
+
+    def _on_keep_warm_expired(self) -> None:
+        with self._lock:
+            # A timer cancelled while already waiting for the lock must not stop a preview in use again
+            if self._stop_timer is not threading.current_thread():
+                return
+            self._stop_timer = None
+            self._stop_if_unused()
+
+    def _stop_if_unused(self) -> None:
+        with self._lock:
+            if len(self._subscribers) > 0 or not self._running:
+                return
+            logger.info("Stopping preview")
+            self._running = False
+            self._started_at = None
+            self._stops += 1
+            try:
+                self._stop()
+            except Exception as e:
+                logger.error(f"Failed to stop preview: {e}")
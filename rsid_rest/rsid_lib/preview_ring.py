@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Shared memory ring of raw preview frames, for consumers on the same host (recorders, analytics sidecars...) and
+the HTTP workers of a device broker deployment.
+
+The server writes every preview frame into the next slot of a `multiprocessing.shared_memory` ring. Readers attach
+to the ring by name and map frames as numpy arrays without copying them. The preview keeps running while at least
+one reader is subscribed, i.e. refreshed its heartbeat within the subscriber timeout.
+
+Layout (little-endian):
+- Ring header: magic, version, slot count, slot size, subscriber count, latest sequence.
+- Subscriber table: pid and heartbeat (`time.monotonic_ns()`) per subscriber.
+- Slots: frame header (sequence, timestamp, width, height, format, size) followed by the frame data.
+
+A frame stays valid until the writer wraps around to its slot: `PreviewFrame.valid()` tells if it was overwritten
+while being processed.
+
+Example reader::
+
+    with PreviewRingReader("rsid_preview") as reader:
+        while True:
+            frame = reader.wait_frame(timeout=1.0)
+            if frame is not None:
+                process(frame.image)  # numpy view in shared memory, copy it to keep it
+"""
+
+import os
+import struct
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from loguru import logger
+
+MAGIC = b"RSPV"
+VERSION = 1
+FORMAT_RGB = 1
+
+_RING_HEADER = struct.Struct("<4sIIIIIQ")  # magic, version, slots, slot size, subscribers, padding, latest sequence
+_SUBSCRIBER = struct.Struct("<IIQ")  # pid, padding, heartbeat
+_FRAME_HEADER = struct.Struct("<QQIIII")  # sequence, timestamp, width, height, format, size
+_SLOTS_ALIGNMENT = 64
+_LATEST_OFFSET = _RING_HEADER.size - 8
+
+
+def _align(size: int) -> int:
+    return (size + _SLOTS_ALIGNMENT - 1) // _SLOTS_ALIGNMENT * _SLOTS_ALIGNMENT
+
+
+@dataclass
+class _Layout:
+    slots: int
+    slot_size: int
+    subscribers: int
+
+    @property
+    def slots_offset(self) -> int:
+        return _align(_RING_HEADER.size + self.subscribers * _SUBSCRIBER.size)
+
+    @property
+    def slot_stride(self) -> int:
+        return _align(_FRAME_HEADER.size + self.slot_size)
+
+    @property
+    def total_size(self) -> int:
+        return self.slots_offset + self.slots * self.slot_stride
+
+    def subscriber_offset(self, index: int) -> int:
+        return _RING_HEADER.size + index * _SUBSCRIBER.size
+
+    def slot_offset(self, sequence: int) -> int:
+        return self.slots_offset + (sequence % self.slots) * self.slot_stride
+
+
+class PreviewFrameRing:
+    """Writer side, owned by the server. Single writer: `publish` is called from the SDK preview callback only."""
+
+    def __init__(self, name: str, slots: int, slot_size: int, subscribers: int = 16):
+        self.layout = _Layout(slots=slots, slot_size=slot_size, subscribers=subscribers)
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=self.layout.total_size)
+        except FileExistsError:  # Left behind by a crashed server
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=self.layout.total_size)
+        self._shm.buf[: self.layout.slots_offset] = bytes(self.layout.slots_offset)
+        _RING_HEADER.pack_into(self._shm.buf, 0, MAGIC, VERSION, slots, slot_size, subscribers, 0, 0)
+        self._sequence = 0
+        self._oversized_logged = False
+        logger.info(f"Preview frame ring {name}: {slots} slots of {slot_size} bytes")
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def publish(self, data, width: int, height: int, frame_format: int = FORMAT_RGB) -> None:
+        data = memoryview(data).cast("B")
+        if data.nbytes > self.layout.slot_size:
+            if not self._oversized_logged:
+                logger.warning(f"Preview frame ring: {data.nbytes} bytes frame exceeds slot size, not published")
+                self._oversized_logged = True
+            return
+        sequence = self._sequence + 1
+        offset = self.layout.slot_offset(sequence)
+        # Invalidate the slot first: readers of the frame being overwritten see the sequence change
+        _FRAME_HEADER.pack_into(self._shm.buf, offset, 0, 0, 0, 0, 0, 0)
+        data_offset = offset + _FRAME_HEADER.size
+        self._shm.buf[data_offset: data_offset + data.nbytes] = data
+        _FRAME_HEADER.pack_into(
+            self._shm.buf, offset, sequence, time.time_ns(), width, height, frame_format, data.nbytes
+        )
+        struct.pack_into("<Q", self._shm.buf, _LATEST_OFFSET, sequence)
+        self._sequence = sequence
+
+    def active_subscribers(self, timeout: float) -> int:
+        now = time.monotonic_ns()
+        count = 0
+        for index in range(self.layout.subscribers):
+            pid, _, heartbeat = _SUBSCRIBER.unpack_from(self._shm.buf, self.layout.subscriber_offset(index))
+            if pid != 0 and now - heartbeat < timeout * 1e9:
+                count += 1
+        return count
+
+    def close(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+
+@dataclass
+class PreviewFrame:
+    sequence: int
+    timestamp_ns: int
+    width: int
+    height: int
+    format: int
+    image: np.ndarray  # Read-only view in shared memory
+    _reader: "PreviewRingReader"
+
+    def valid(self) -> bool:
+        """False once the writer started overwriting this frame."""
+        return self._reader.slot_sequence(self.sequence) == self.sequence
+
+
+class PreviewRingReader:
+    """
+    Reader side, for local consumers. Subscribing keeps the preview running: the heartbeat is refreshed by a
+    background thread every `heartbeat_interval` seconds, keep it below the server `preview_shm_subscriber_timeout`.
+    """
+
+    def __init__(self, name: str = "rsid_preview", subscribe: bool = True, heartbeat_interval: float = 1.0):
+        self._shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            # Attaching registers the segment for removal when this process exits, only the server owns it
+            resource_tracker.unregister(self._shm._name, "shared_memory")  # pylint: disable=protected-access
+        magic, version, slots, slot_size, subscribers, _, _ = _RING_HEADER.unpack_from(self._shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self._shm.close()
+            raise ValueError(f"{name} is not a version {VERSION} preview frame ring")
+        self.layout = _Layout(slots=slots, slot_size=slot_size, subscribers=subscribers)
+        self._last_sequence = 0
+        self._subscriber: int | None = None
+        self._stop = threading.Event()
+        self._heartbeat_thread: threading.Thread | None = None
+        if subscribe:
+            self._subscribe(heartbeat_interval)
+
+    def _subscribe(self, heartbeat_interval: float) -> None:
+        pid = os.getpid()
+        stale_before = time.monotonic_ns() - int(10 * heartbeat_interval * 1e9)
+        for index in range(self.layout.subscribers):
+            offset = self.layout.subscriber_offset(index)
+            other_pid, _, heartbeat = _SUBSCRIBER.unpack_from(self._shm.buf, offset)
+            if other_pid == 0 or heartbeat < stale_before:
+                _SUBSCRIBER.pack_into(self._shm.buf, offset, pid, 0, time.monotonic_ns())
+                self._subscriber = index
+                break
+        if self._subscriber is None:
+            raise RuntimeError("Preview frame ring: no free subscriber slot")
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat, args=(heartbeat_interval,), name="preview-ring-heartbeat", daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def _heartbeat(self, interval: float) -> None:
+        offset = self.layout.subscriber_offset(self._subscriber)
+        while not self._stop.wait(interval):
+            _SUBSCRIBER.pack_into(self._shm.buf, offset, os.getpid(), 0, time.monotonic_ns())
+
+    def latest_sequence(self) -> int:
+        return struct.unpack_from("<Q", self._shm.buf, _LATEST_OFFSET)[0]
+
+    def slot_sequence(self, sequence: int) -> int:
+        return struct.unpack_from("<Q", self._shm.buf, self.layout.slot_offset(sequence))[0]
+
+    def latest_frame(self) -> PreviewFrame | None:
+        """Latest complete frame, None if no frame was published yet."""
+        sequence = self.latest_sequence()
+        if sequence == 0:
+            return None
+        offset = self.layout.slot_offset(sequence)
+        header = _FRAME_HEADER.unpack_from(self._shm.buf, offset)
+        if header[0] != sequence:  # Overwritten in the meantime, the writer is a full ring ahead
+            return None
+        _, timestamp_ns, width, height, frame_format, size = header
+        data = self._shm.buf[offset + _FRAME_HEADER.size: offset + _FRAME_HEADER.size + size]
+        image = np.frombuffer(data, dtype=np.uint8).reshape(height, width, -1)
+        return PreviewFrame(sequence, timestamp_ns, width, height, frame_format, image, self)
+
+    def wait_frame(self, timeout: float | None = None, poll_interval: float = 0.005) -> PreviewFrame | None:
+        """Next frame not returned yet. None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.latest_sequence() == self._last_sequence:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+        frame = self.latest_frame()
+        if frame is not None:
+            self._last_sequence = frame.sequence
+        return frame
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+        if self._subscriber is not None:
+            _SUBSCRIBER.pack_into(self._shm.buf, self.layout.subscriber_offset(self._subscriber), 0, 0, 0)
+            self._subscriber = None
+        self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+
+class PreviewRingSubscription:
+    """
+    Preview of another process' frames: reads the ring in a background thread and hands a copy of every complete
+    frame to `on_frame`. Used by the HTTP workers of a device broker deployment, the broker owns the camera.
+    """
+
+    def __init__(self, name: str, on_frame: Callable[[np.ndarray], None]):
+        self._reader = PreviewRingReader(name)
+        self._on_frame = on_frame
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="preview-ring-subscription", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                frame = self._reader.wait_frame(timeout=0.5)
+                if frame is None:
+                    continue
+                image = frame.image.copy()
+                if frame.valid():  # Not overwritten while copying
+                    self._on_frame(image)
+        finally:
+            self._reader.close()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import rsid_py
+
+from ..core import metrics
+
+
+@dataclass
+class RecentMatch:
+    user_id: str
+    groups: list[str]
+    faceprints: rsid_py.Faceprints
+    expires_at: float
+
+
+class RecentMatchCache:
+    """
+    Faceprints of recently authenticated users, tried before the vector search.
+    At a gate the same people authenticate many times a day, a confident match here skips the search entirely.
+    The trade-offs: a miss costs up to `capacity` matches, and a confident match here is returned even if a user that
+    wasn't recently matched would score higher. Keep the capacity small.
+    """
+
+    def __init__(self, capacity: int, ttl: float):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[str, RecentMatch] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def candidates(self, zone: str | None = None) -> list[RecentMatch]:
+        """Non-expired entries (of users in `zone` if set), most recently matched first."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [user_id for user_id, entry in self._entries.items() if entry.expires_at <= now]
+            for user_id in expired:
+                del self._entries[user_id]
+            metrics.RECENT_MATCH_ENTRIES.set(len(self._entries))
+            return [entry for entry in reversed(self._entries.values()) if zone is None or zone in entry.groups]
+
+    def add(self, user_id: str, groups: list[str], faceprints: rsid_py.Faceprints) -> None:
+        with self._lock:
+            self._entries[user_id] = RecentMatch(user_id, groups, faceprints, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            metrics.RECENT_MATCH_ENTRIES.set(len(self._entries))
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.RECENT_MATCH_LOOKUPS.labels("hit" if hit else "miss").inc()
+
+    def evict(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+            metrics.RECENT_MATCH_ENTRIES.set(len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            metrics.RECENT_MATCH_ENTRIES.set(0)
@@ -3,29 +3,49 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import asyncio
+import atexit
 import copy
 import math
 import os
 import threading
+import time
 import uuid
+import weakref
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import cv2
 import numpy as np
 import rsid_py
-from cv2.typing import MatLike
 from fastapi.concurrency import run_in_threadpool
 from loguru import logger
-from simplejpeg import encode_jpeg
 from starlette.responses import AsyncContentStream
 
 from . import models
 from .gen.models import AuthenticateStatusEnum
-from .host_db_local_file import HostDBLocalFile
+from .candidate_cut import HybridScoreLog, adaptive_candidate_count
+from .device_broker import get_broker_client, is_broker_process, use_broker
+from .device_query_cache import DeviceQueryCache
+from .faceprints_cache import FaceprintsCacheStats
+from .host_db_base import faceprints_from_payload, faceprints_to_payload
+from .maintenance import MaintenanceScheduler
+from .matcher_pool import MatcherPool, MatcherWorkerDied, default_matcher_factory
+from .preview_lifecycle import PreviewLifecycleManager, PreviewLifecycleStats
+from .preview_ring import PreviewFrameRing, PreviewRingSubscription
+from .recent_matches import RecentMatchCache
+from .sdk_log import install_sdk_log_callback
+from .write_behind import FaceprintsWriteBehindQueue
 from .models import AuthenticationResponse, DeviceInfoResponse, EnrollResponse
 from .models import FaceRect as FaceRectModel
+from ..core import metrics
 from ..core.config import get_app_settings
-from ..core.settings.base import HostModeAuthTypes, StreamEncodingStypes
+from ..core.settings.base import HostModeAuthTypes, PreviewVariantTypes, StreamEncodingStypes
+
+# cv2, simplejpeg and the host DB (qdrant_client) are imported on first use: they slow down the start
+if TYPE_CHECKING:
+    from cv2.typing import MatLike
 
 if os.name == "nt":  # sys.platform == 'win32':
     from serial.tools.list_ports_windows import comports
@@ -35,19 +55,104 @@
     raise ImportError(f"Sorry: no implementation for your platform ('{os.name}') available")
 
 
+@dataclass
+class _BestMatch:
+    user_id: str
+    groups: list[str]
+    score: int
+    should_update: bool
+    # Faceprints to keep for the user: the adapted ones when `should_update` is set
+    faceprints: rsid_py.Faceprints
+
+
 class RSIDApiWrapper:
     _instance = None
     _lock = threading.Lock()
+    # Coroutines of an event loop queue here (FIFO) before waiting for _lock: a single thread of the pool waits
+    _device_waiters: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = weakref.WeakKeyDictionary()
     _condition = asyncio.Condition()
     _preview_condition = threading.Condition()
-    _preview: rsid_py.Preview | None = None
-    _preview_tickets: list[uuid.UUID] = []
-    _preview_image = None
+    _preview: rsid_py.Preview | PreviewRingSubscription | None = None
     _preview_encoder_lock = threading.Lock()
+    # Latest raw frame from the SDK, and the last encoded image of each variant with the frame number it comes from
+    _preview_frame: rsid_py.Image | np.ndarray | None = None
+    _preview_frame_number: int = 0
+    _preview_images: dict[PreviewVariantTypes, tuple[int, Any]] = {}
+    _preview_ring: PreviewFrameRing | None = None
+    _initialized: bool = False
+    _host_matcher = None
+    _host_matcher_lock = threading.Lock()
+    # Requests waiting for the device lock
+    _queue_depth: int = 0
+    _queue_depth_lock = threading.Lock()
 
     def __init__(self):
-        self.db = HostDBLocalFile()
+        # Singleton: __init__ runs on every RSIDApiWrapper() call, keep the DB (and its caches) alive.
+        if self._initialized:
+            return
         self._port = None
+        settings = get_app_settings()
+        self.device_cache = DeviceQueryCache(ttl=settings.device_query_cache_ttl)
+        self.matcher_pool: MatcherPool | None = None
+        self.recent_matches: RecentMatchCache | None = None
+        self.write_behind: FaceprintsWriteBehindQueue | None = None
+        self.score_log: HybridScoreLog | None = None
+        self.maintenance: MaintenanceScheduler | None = None
+        # The device broker only serves the serial port, the HTTP workers own the host DB
+        if not is_broker_process():
+            self._init_host_db()
+        self.preview_lifecycle = PreviewLifecycleManager(
+            start=self._start_preview, stop=self._stop_preview, keep_warm=settings.preview_keep_warm_seconds
+        )
+        if settings.preview_always_on and not use_broker():
+            threading.Thread(target=self.preview_lifecycle.keep_always_on, name="preview-start", daemon=True).start()
+        # The broker publishes the frames for the workers
+        if (settings.preview_shm_ring and not use_broker()) or is_broker_process():
+            RSIDApiWrapper._preview_ring = PreviewFrameRing(
+                name=settings.preview_shm_name,
+                slots=settings.preview_shm_slots,
+                slot_size=settings.preview_shm_slot_size,
+            )
+            atexit.register(RSIDApiWrapper._preview_ring.close)
+            threading.Thread(target=self._watch_preview_subscribers, name="preview-ring-watcher", daemon=True).start()
+        self._initialized = True
+
+    def _init_host_db(self) -> None:
+        # Imported on first use: qdrant_client takes most of the import time
+        from .host_db_local_file import HostDBLocalFile
+
+        settings = get_app_settings()
+        self.db = HostDBLocalFile()
+        # HTTP workers share the DB: a change made by one of them invalidates the gallery caches of the others
+        self._gallery_marker = Path(f"{settings.db_file}.gallery")
+        self._gallery_version = self._read_gallery_version()
+        workers = settings.host_mode_matcher_workers
+        self.matcher_pool = MatcherPool(workers=workers) if workers > 0 else None
+        if settings.host_mode_recent_matches:
+            self.recent_matches = RecentMatchCache(
+                capacity=settings.host_mode_recent_matches_size,
+                ttl=settings.host_mode_recent_matches_ttl,
+            )
+        if settings.host_mode_write_behind:
+            # One journal per worker: a worker replays the journals of the workers that are gone
+            journal_name = f"pending.{os.getpid()}.jsonl" if use_broker() else "pending.jsonl"
+            self.write_behind = FaceprintsWriteBehindQueue(
+                db=self.db,
+                journal_file=Path(f"{settings.db_file}.{journal_name}"),
+                flush_interval=settings.host_mode_write_behind_flush_interval,
+                batch_size=settings.host_mode_write_behind_batch_size,
+                min_interval=settings.host_mode_update_min_interval,
+                orphan_journals=f"{Path(settings.db_file).name}.pending.*.jsonl" if use_broker() else None,
+            )
+        if settings.host_mode_hybrid_score_log is not None:
+            self.score_log = HybridScoreLog(settings.host_mode_hybrid_score_log)
+        if settings.host_mode_maintenance:
+            self.maintenance = MaintenanceScheduler(
+                db=self.db,
+                window=settings.host_mode_maintenance_window,
+                idle_seconds=settings.host_mode_maintenance_idle_seconds,
+                min_fragmentation=settings.host_mode_maintenance_min_fragmentation,
+            )
 
     def __new__(cls):
         if cls._instance is None:
@@ -56,10 +161,126 @@ def __new__(cls):
                     cls._instance = super().__new__(cls)
         return cls._instance
 
+    async def startup(self) -> None:
+        await self.db.prewarm_faceprints_cache()
+        if self.write_behind is not None:
+            self.write_behind.start()
+        if self.maintenance is not None:
+            self.maintenance.start()
+
+    async def shutdown(self) -> None:
+        if self.maintenance is not None:
+            await self.maintenance.stop()
+        if self.write_behind is not None:
+            await self.write_behind.stop()
+        self.db.save_faceprints_cache_stats()
+        if self.matcher_pool is not None:
+            self.matcher_pool.close()
+
+    def _on_gallery_changed(self) -> None:
+        if self.matcher_pool is not None:
+            self.matcher_pool.invalidate()
+        try:
+            self._gallery_marker.write_text(uuid.uuid4().hex)
+            self._gallery_version = self._read_gallery_version()
+        except OSError as e:
+            logger.warning(f"Unable to update the gallery marker {self._gallery_marker}: {e}")
+
+    def _read_gallery_version(self) -> int | None:
+        try:
+            return self._gallery_marker.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _sync_gallery(self) -> None:
+        """Drop the gallery caches if another process changed the gallery since we last looked."""
+        version = self._read_gallery_version()
+        if version == self._gallery_version:
+            return
+        self._gallery_version = version
+        if self.matcher_pool is not None:
+            self.matcher_pool.invalidate()
+        if self.recent_matches is not None:
+            self.recent_matches.clear()
+
+    def _device(self) -> "RSIDApiWrapper":
+        """Owner of the serial port: the device broker in the HTTP workers of a multi-worker deployment."""
+        return get_broker_client() if use_broker() else self
+
     def set_port(self, port: str):
         with self._lock:
+            if port != self._port:
+                # Another device, or the same one reconnected
+                self.device_cache.invalidate()
             self._port = port
 
+    def _queue_for_device(self, waiting: int) -> None:
+        with self._queue_depth_lock:
+            RSIDApiWrapper._queue_depth += waiting
+            metrics.DEVICE_QUEUE_DEPTH.labels(self._port or "").set(self._queue_depth)
+
+    def query_device_queue_depth(self) -> int:
+        """Requests waiting for the device."""
+        return self._queue_depth
+
+    @contextmanager
+    def _locked_device(self) -> Iterator[None]:
+        """Hold the device lock, recording how long the request queued behind the others."""
+        waiting_since = time.perf_counter()
+        self._queue_for_device(1)
+        try:
+            self._lock.acquire()
+        finally:
+            self._queue_for_device(-1)
+        try:
+            metrics.DEVICE_QUEUE_WAIT_SECONDS.labels(metrics.current_endpoint(), self._port or "").observe(
+                time.perf_counter() - waiting_since
+            )
+            yield
+        finally:
+            self._lock.release()
+
+    @asynccontextmanager
+    async def _locked_device_async(self) -> AsyncIterator[None]:
+        """
+        `_locked_device` for coroutines. Don't block the event loop while waiting: the holder may be a coroutine
+        awaiting on this very loop. The coroutines get the device in arrival order, the lock is acquired from a
+        thread of the pool.
+        """
+        waiting_since = time.perf_counter()
+        waiters = self._device_waiters.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+        self._queue_for_device(1)
+        try:
+            async with waiters:
+                acquire = asyncio.ensure_future(run_in_threadpool(self._lock.acquire))
+                try:
+                    await asyncio.shield(acquire)
+                except asyncio.CancelledError:
+                    # The thread still gets the lock, give it back
+                    acquire.add_done_callback(lambda f: f.exception() is None and self._lock.release())
+                    raise
+        finally:
+            self._queue_for_device(-1)
+        try:
+            metrics.DEVICE_QUEUE_WAIT_SECONDS.labels(metrics.current_endpoint(), self._port or "").observe(
+                time.perf_counter() - waiting_since
+            )
+            yield
+        finally:
+            self._lock.release()
+
+    def _connect(self) -> rsid_py.FaceAuthenticator:
+        # Every operation opens its own serial session with the device
+        with metrics.stage("connect", self._port):
+            try:
+                authenticator = rsid_py.FaceAuthenticator(self._port)
+            except Exception:
+                metrics.DEVICE_CONNECTS.labels(self._port or "", "error").inc()
+                self.device_cache.invalidate()
+                raise
+        metrics.DEVICE_CONNECTS.labels(self._port or "", "ok").inc()
+        return authenticator
+
     async def auth(self) -> AuthenticationResponse:
         logger.info(f"authenticating with {self._port}")
 
@@ -89,15 +310,16 @@ def on_faces(face_rects: list[rsid_py.FaceRect], timestamp: int):
                 faces.append(FaceRectModel.from_rsid_face_rect(face))
             logger.debug(f"detected {len(faces)} face(s)")
 
-        with self._lock:
+        async with self._locked_device_async():
             async with self._condition:
-                with rsid_py.FaceAuthenticator(self._port) as authenticator:
+                with self._connect() as authenticator:
                     try:
-                        authenticator.authenticate(
-                            on_hint=on_hint,
-                            on_result=on_result,
-                            on_faces=on_faces,
-                        )
+                        with metrics.stage("authenticate", self._port):
+                            authenticator.authenticate(
+                                on_hint=on_hint,
+                                on_result=on_result,
+                                on_faces=on_faces,
+                            )
                     except Exception as e:
                         logger.error(e)
                         exception = e
@@ -107,21 +329,46 @@ def on_faces(face_rects: list[rsid_py.FaceRect], timestamp: int):
 
         if exception is not None:
             raise exception
-        return AuthenticationResponse(
-            user_id=user_id,
-            faces=faces,
-            status=AuthenticateStatusEnum.from_rsid_py(auth_result),
-        )
+        status = AuthenticateStatusEnum.from_rsid_py(auth_result)
+        metrics.count_auth(status, self._port)
+        return AuthenticationResponse(user_id=user_id, faces=faces, status=status)
+
+    async def auth_host(self, zone: str | None = None) -> AuthenticationResponse:
+        logger.info(f"authenticating with {self._port}" + (f" in zone {zone}" if zone is not None else ""))
+        if self.maintenance is not None:
+            self.maintenance.note_activity()
+
+        status, extracted_faceprints, faces = await self._device().extract_faceprints_for_auth()
+        if status != AuthenticateStatusEnum.Success:
+            metrics.count_auth(status, self._port)
+            return AuthenticationResponse(user_id=None, faces=faces, status=status)
+
+        # The device is released: matching runs on the host matcher, off the event loop
+        self._sync_gallery()
+        best_match: _BestMatch | None = None
+        if self.recent_matches is not None:
+            with metrics.stage("recent_match", self._port):
+                best_match = await run_in_threadpool(self._match_recent_in_process, extracted_faceprints, zone)
+        if best_match is None:
+            best_match = await self._match_db(extracted_faceprints, zone)
+
+        if best_match is None:
+            # Return with Forbidden status
+            metrics.count_auth(AuthenticateStatusEnum.Forbidden, self._port)
+            return AuthenticationResponse(user_id=None, faces=faces, status=AuthenticateStatusEnum.Forbidden)
 
-    async def auth_host(self) -> AuthenticationResponse:
-        logger.info(f"authenticating with {self._port}")
+        await self._apply_match(best_match)
+        metrics.count_auth(status, self._port)
+        return AuthenticationResponse(user_id=best_match.user_id, faces=faces, status=status)
 
+    async def extract_faceprints_for_auth(
+        self,
+    ) -> tuple[AuthenticateStatusEnum, rsid_py.ExtractedFaceprintsElement | None, list[FaceRectModel] | None]:
+        """Serial part of the host mode authentication: the faceprints extracted by the device, and the faces."""
         auth_result: rsid_py.AuthenticateStatus | None = None
         extracted_faceprints: rsid_py.ExtractedFaceprintsElement | None = None
-        faces: list[rsid_py.FaceRect] | None = None
+        faces: list[FaceRectModel] | None = None
         exception: Exception | None = None
-        best_match_updated_faceprints: rsid_py.Faceprints | None = None
-        best_match_db_record = None
 
         def on_hint(hint: rsid_py.AuthenticateStatus | None):
             # SDK Context
@@ -153,13 +400,14 @@ def on_result(
                 extracted_faceprints = copy.copy(faceprints)
             self._condition.notify()
 
-        with self._lock:
+        async with self._locked_device_async():
             async with self._condition:
-                with rsid_py.FaceAuthenticator(self._port) as authenticator:
+                with self._connect() as authenticator:
                     try:
-                        authenticator.extract_faceprints_for_auth(
-                            on_result=on_result, on_hint=on_hint, on_faces=on_faces
-                        )
+                        with metrics.stage("extract_faceprints_for_auth", self._port):
+                            authenticator.extract_faceprints_for_auth(
+                                on_result=on_result, on_hint=on_hint, on_faces=on_faces
+                            )
                     except Exception as e:
                         logger.error(e)
                         exception = e
@@ -169,64 +417,265 @@ def on_result(
                 # Wait for callback response.
                 await self._condition.wait_for(lambda: auth_result is not None)
 
-                if exception is not None:
-                    raise exception
-
-                if auth_result != rsid_py.AuthenticateStatus.Success:
-                    return AuthenticationResponse(
-                        user_id=None,
-                        faces=faces,
-                        status=AuthenticateStatusEnum.from_rsid_py(auth_result),
-                    )
-
-                faceprints_db: list = []
-                if get_app_settings().host_mode_auth_type == HostModeAuthTypes.hybrid:
-                    faceprints_db = await self.db.get_faceprints(extracted_faceprints)
-                elif get_app_settings().host_mode_auth_type == HostModeAuthTypes.device:
-                    faceprints_db = await self.db.get_all_faceprints()
-
-                logger.info(f"Searching in {len(faceprints_db)} DB faceprints...")
-
-                max_score = -100
-                for i, db_record in enumerate(faceprints_db):
-                    db_faceprints = rsid_py.Faceprints()
-                    db_faceprints.flags = db_record["flags"]
-                    db_faceprints.version = db_record["version"]
-                    db_faceprints.features_type = db_record["features_type"]
-                    db_faceprints.adaptive_descriptor_nomask = db_record["adaptive_descriptor_nomask"]
-                    db_faceprints.adaptive_descriptor_withmask = db_record["adaptive_descriptor_withmask"]
-                    db_faceprints.enroll_descriptor = db_record["enroll_descriptor"]
-
-                    out_faceprints = rsid_py.Faceprints()
-                    # TODO: Grab MatcherConfidenceLevel from device
-                    match_result = authenticator.match_faceprints(
-                        extracted_faceprints,
-                        db_faceprints,
-                        out_faceprints,
-                        # rsid_py.MatcherConfidenceLevel.High,
-                    )
-                    logger.debug(f"match_result for user {i}: {match_result}")
-                    if match_result.success:
-                        logger.info(f"Match success for user {i} with score {match_result.score}")
-                        if match_result.score > max_score:
-                            max_score = match_result.score
-                            best_match_db_record = db_record
-                            best_match_updated_faceprints = out_faceprints
-
-        if best_match_db_record is None:
-            # Return with Forbidden status
-            return AuthenticationResponse(user_id=None, faces=faces, status=AuthenticateStatusEnum.Forbidden)
+        if exception is not None:
+            raise exception
+        return AuthenticateStatusEnum.from_rsid_py(auth_result), extracted_faceprints, faces
+
+    async def _apply_match(self, best_match: _BestMatch, updates: dict[str, rsid_py.Faceprints] | None = None) -> None:
+        """
+        Bookkeeping after a successful match: caches and the adaptive faceprints update.
+        Without write-behind, the update is added to `updates` if set, for the caller to write them in one batch.
+        """
+        user_id = best_match.user_id
+        self.db.faceprints_cache.note_match(user_id)
+        if self.recent_matches is not None:
+            self.recent_matches.add(user_id, best_match.groups, best_match.faceprints)
+
+        if best_match.should_update:
+            if self.write_behind is not None and self.write_behind.running:
+                # Don't make the user wait for the DB write
+                self.write_behind.enqueue(user_id, best_match.faceprints)
+            elif updates is not None:
+                updates[user_id] = best_match.faceprints  # Last one wins
+            else:
+                await self.db.update_faceprints(user_id, best_match.faceprints)
+            if self.matcher_pool is not None:
+                await self.matcher_pool.update(user_id, best_match.faceprints)
+
+    def _match_recent(
+        self,
+        authenticator: rsid_py.FaceAuthenticator,
+        extracted_faceprints: rsid_py.ExtractedFaceprintsElement,
+        zone: str | None = None,
+    ) -> _BestMatch | None:
+        if self.recent_matches is None:
+            return None
+        best_match: _BestMatch | None = None
+        for entry in self.recent_matches.candidates(zone):
+            out_faceprints = rsid_py.Faceprints()
+            match_result = authenticator.match_faceprints(
+                extracted_faceprints,
+                entry.faceprints,
+                out_faceprints,
+                rsid_py.MatcherConfidenceLevel.High,
+            )
+            if match_result.success and (best_match is None or match_result.score > best_match.score):
+                best_match = _BestMatch(
+                    user_id=entry.user_id,
+                    groups=entry.groups,
+                    score=match_result.score,
+                    should_update=match_result.should_update,
+                    faceprints=out_faceprints if match_result.should_update else entry.faceprints,
+                )
+        self.recent_matches.record(hit=best_match is not None)
+        logger.debug(
+            f"Recent matches {'hit' if best_match is not None else 'miss'} "
+            f"- hit ratio {self.recent_matches.hit_ratio:.2%}"
+        )
+        return best_match
+
+    def _match_recent_in_process(
+        self, extracted_faceprints: rsid_py.ExtractedFaceprintsElement, zone: str | None = None
+    ) -> _BestMatch | None:
+        with self._host_matcher_lock:
+            return self._match_recent(self._get_host_matcher(), extracted_faceprints, zone)
+
+    async def _match_db(
+        self, extracted_faceprints: rsid_py.ExtractedFaceprintsElement, zone: str | None = None
+    ) -> _BestMatch | None:
+        settings = get_app_settings()
+        faceprints_db: list | None = None
+        if settings.host_mode_auth_type == HostModeAuthTypes.hybrid:
+            faceprints_db = await self.db.get_faceprints(extracted_faceprints, zone)
+            scores = [r["score"] for r in faceprints_db]
+            faceprints_db = self._cut_candidates(faceprints_db)
+            best_match = await self._match_candidates(extracted_faceprints, faceprints_db, zone)
+            self._log_scores(scores, faceprints_db, best_match)
+            return best_match
+        if self.matcher_pool is None:
+            faceprints_db = await self.db.get_all_faceprints(zone)
+        return await self._match_candidates(extracted_faceprints, faceprints_db, zone)
+
+    @staticmethod
+    def _cut_candidates(faceprints_db: list) -> list:
+        settings = get_app_settings()
+        scores = [r["score"] for r in faceprints_db]
+        return faceprints_db[: adaptive_candidate_count(
+            scores,
+            cut=settings.host_mode_hybrid_cut,
+            min_results=settings.host_mode_hybrid_min_results,
+            max_results=settings.host_mode_hybrid_max_results or len(scores),
+            relative_threshold=settings.host_mode_hybrid_relative_threshold,
+        )]
+
+    def _log_scores(self, scores: list[float], faceprints_db: list, best_match: _BestMatch | None) -> None:
+        if self.score_log is None:
+            return
+        matched_rank = None
+        if best_match is not None:
+            matched_rank = next((i for i, r in enumerate(faceprints_db) if r["user_id"] == best_match.user_id), None)
+        self.score_log.write(scores, len(faceprints_db), matched_rank)
+
+    async def _match_candidates(
+        self,
+        extracted_faceprints: rsid_py.ExtractedFaceprintsElement,
+        faceprints_db: list | None,
+        zone: str | None,
+    ) -> _BestMatch | None:
+        """Best match among `faceprints_db`, or among the whole gallery held by the matcher pool if None."""
+        settings = get_app_settings()
+        pool = self.matcher_pool
+
+        if pool is not None and (
+            faceprints_db is None or len(faceprints_db) >= settings.host_mode_matcher_pool_min_candidates
+        ):
+            # Device auth type matches against the whole gallery held by the workers
+            point_ids = None if faceprints_db is None else [r["point_id"] for r in faceprints_db]
+            try:
+                if pool.stale:
+                    await pool.load(await self.db.get_all_faceprints())
+                logger.info(f"Searching in {'all' if point_ids is None else len(point_ids)} DB faceprints "
+                            f"with {pool.size} matcher worker(s)...")
+                with metrics.stage("match_faceprints_pool", self._port):
+                    pool_result = await pool.match(extracted_faceprints, point_ids, zone)
+            except MatcherWorkerDied as e:
+                logger.error(f"{e}, matching in process")
+                if faceprints_db is None:
+                    faceprints_db = await self.db.get_all_faceprints(zone)
+                return await run_in_threadpool(self._match_in_process, extracted_faceprints, faceprints_db)
+            if pool_result is None:
+                return None
+            logger.info(f"Match success for user {pool_result.point_id} with score {pool_result.score}")
+            return _BestMatch(
+                user_id=pool_result.user_id,
+                groups=pool_result.groups,
+                score=pool_result.score,
+                should_update=pool_result.should_update,
+                faceprints=faceprints_from_payload(pool_result.faceprints),
+            )
 
-        user_id = best_match_db_record["user_id"]
+        return await run_in_threadpool(self._match_in_process, extracted_faceprints, faceprints_db)
+
+    def _match_in_process(
+        self, extracted_faceprints: rsid_py.ExtractedFaceprintsElement, faceprints_db: list
+    ) -> _BestMatch | None:
+        """`_match_locally` on the host matcher, for the calls from a thread."""
+        with self._host_matcher_lock:
+            return self._match_locally(self._get_host_matcher(), extracted_faceprints, faceprints_db)
+
+    @classmethod
+    def _get_host_matcher(cls) -> rsid_py.FaceAuthenticator:
+        """Matcher for host side matching, to use with `_host_matcher_lock` held."""
+        if cls._host_matcher is None:
+            cls._host_matcher = default_matcher_factory()
+        return cls._host_matcher
+
+    def _match_locally(
+        self,
+        authenticator: rsid_py.FaceAuthenticator,
+        extracted_faceprints: rsid_py.ExtractedFaceprintsElement,
+        faceprints_db: list,
+    ) -> _BestMatch | None:
+        logger.info(f"Searching in {len(faceprints_db)} DB faceprints...")
+
+        best_match: _BestMatch | None = None
+        cache_stats = FaceprintsCacheStats()
+        with metrics.stage("match_faceprints", self._port):
+            for i, db_record in enumerate(faceprints_db):
+                db_faceprints = self.db.faceprints_cache.get(db_record, cache_stats)
+
+                out_faceprints = rsid_py.Faceprints()
+                # TODO: Grab MatcherConfidenceLevel from device
+                match_result = authenticator.match_faceprints(
+                    extracted_faceprints,
+                    db_faceprints,
+                    out_faceprints,
+                    # rsid_py.MatcherConfidenceLevel.High,
+                )
+                logger.debug(f"match_result for user {i}: {match_result}")
+                if match_result.success:
+                    logger.info(f"Match success for user {i} with score {match_result.score}")
+                    if best_match is None or match_result.score > best_match.score:
+                        best_match = _BestMatch(
+                            user_id=db_record["user_id"],
+                            groups=db_record.get("groups") or [],
+                            score=match_result.score,
+                            should_update=match_result.should_update,
+                            faceprints=out_faceprints if match_result.should_update else db_faceprints,
+                        )
+        logger.debug(f"Faceprints cache: {cache_stats}")
+        return best_match
+
+    async def match_batch(
+        self, items: list[rsid_py.ExtractedFaceprintsElement], zone: str | None = None
+    ) -> list[_BestMatch | None]:
+        """
+        Match faceprints extracted by remote devices against the host DB.
+        Recent matches are tried first, hybrid auth type runs one batched vector search for the items they missed.
+        """
+        if self.maintenance is not None:
+            self.maintenance.note_activity()
+        self._sync_gallery()
+        settings = get_app_settings()
+        pool = self.matcher_pool
+        results: list[_BestMatch | None] = [None] * len(items)
+
+        def match_recent() -> None:
+            with self._host_matcher_lock:
+                for i, extracted in enumerate(items):
+                    results[i] = self._match_recent(self._get_host_matcher(), extracted, zone)
+
+        # Matching is CPU bound, keep it off the event loop. One host matcher for the whole batch.
+        if self.recent_matches is not None:
+            with metrics.stage("recent_match", self._port):
+                await run_in_threadpool(match_recent)
+        # Only the items the recent matches missed are searched
+        missed = [i for i in range(len(items)) if results[i] is None]
+
+        searched: dict[int, list] = {}
+        candidates: dict[int, list | None]
+        if len(missed) == 0:
+            candidates = {}
+        elif settings.host_mode_auth_type == HostModeAuthTypes.hybrid:
+            search_results = await self.db.get_faceprints_batch([items[i] for i in missed], zone)
+            searched = dict(zip(missed, search_results, strict=True))
+            candidates = {i: self._cut_candidates(records) for i, records in searched.items()}
+        elif pool is None:
+            faceprints_db = await self.db.get_all_faceprints(zone)
+            candidates = dict.fromkeys(missed, faceprints_db)
+        else:
+            candidates = dict.fromkeys(missed)
+
+        def use_pool(i: int) -> bool:
+            return pool is not None and (
+                candidates[i] is None or len(candidates[i]) >= settings.host_mode_matcher_pool_min_candidates
+            )
 
-        if match_result.should_update:
-            await self.db.update_faceprints(user_id, best_match_updated_faceprints)
+        def match_locally() -> None:
+            with self._host_matcher_lock:
+                for i in missed:
+                    if not use_pool(i):
+                        results[i] = self._match_locally(self._get_host_matcher(), items[i], candidates[i])
 
-        return AuthenticationResponse(
-            user_id=user_id,
-            faces=faces,
-            status=AuthenticateStatusEnum.from_rsid_py(auth_result),
+        await run_in_threadpool(match_locally)
+        pooled = [i for i in missed if use_pool(i)]
+        pooled_results = await asyncio.gather(
+            *(self._match_candidates(items[i], candidates[i], zone) for i in pooled)
         )
+        for i, result in zip(pooled, pooled_results, strict=True):
+            results[i] = result
+
+        for i, records in searched.items():
+            self._log_scores([r["score"] for r in records], candidates[i], results[i])
+        updates: dict[str, rsid_py.Faceprints] = {}
+        for result in results:
+            if result is not None:
+                await self._apply_match(result, updates)
+        if len(updates) > 0:
+            await self.db.update_faceprints_batch(
+                {user_id: faceprints_to_payload(faceprints) for user_id, faceprints in updates.items()}
+            )
+        return results
 
     async def enroll(self, user_id: str) -> EnrollResponse:
         logger.info(f"enrolling user: {user_id}")
@@ -253,17 +702,18 @@ def on_faces(faces: list[rsid_py.FaceRect], timestamp: int):
             # TODO: Publish on websocket?
             logger.debug(f"detected {len(faces)} face(s)")
 
-        with self._lock:
+        async with self._locked_device_async():
             async with self._condition:
-                with rsid_py.FaceAuthenticator(self._port) as authenticator:
+                with self._connect() as authenticator:
                     try:
-                        await run_in_threadpool(authenticator.enroll,
-                                                on_hint=on_hint,
-                                                on_progress=on_progress,
-                                                on_result=on_result,
-                                                on_faces=on_faces,
-                                                user_id=user_id,
-                                                )
+                        with metrics.stage("enroll", self._port):
+                            await run_in_threadpool(authenticator.enroll,
+                                                    on_hint=on_hint,
+                                                    on_progress=on_progress,
+                                                    on_result=on_result,
+                                                    on_faces=on_faces,
+                                                    user_id=user_id,
+                                                    )
                     except Exception as e:
                         exception = e
                         logger.error(e)
@@ -274,9 +724,18 @@ def on_faces(faces: list[rsid_py.FaceRect], timestamp: int):
 
         if exception is not None:
             raise exception
-        return EnrollResponse(user_id=user_id, status=models.EnrollStatusEnum.from_rsid_py(enroll_result))
+        status = models.EnrollStatusEnum.from_rsid_py(enroll_result)
+        metrics.count_enroll(status, self._port)
+        return EnrollResponse(user_id=user_id, status=status)
+
+    def _read_enroll_image(self, file_path: Path) -> "MatLike":
+        import cv2
+
+        return self._resize_if_big(cv2.imread(str(file_path)))
+
+    def _resize_if_big(self, im_cv: "MatLike") -> "MatLike":
+        import cv2
 
-    def _resize_if_big(self, im_cv: MatLike) -> MatLike:
         # TODO: Review this logic to match the one in C# instead.
         max_enroll_image_size: int = 890 * 1024  # Max allowed buffer to enroll is 900kb
         img_size = math.prod(im_cv.shape)
@@ -292,14 +751,21 @@ def _resize_if_big(self, im_cv: MatLike) -> MatLike:
         return im_cv
 
     async def enroll_image(self, user_id: str, file_path: Path) -> EnrollResponse:
+        image = await run_in_threadpool(self._read_enroll_image, file_path)
+        return await self._device().enroll_image_pixels(user_id, image)
+
+    async def enroll_image_pixels(self, user_id: str, image: np.ndarray) -> EnrollResponse:
+        """Serial part of `enroll_image`: the image read, BGR."""
         exception: Exception | None = None
-        image = await run_in_threadpool(self._resize_if_big, (cv2.imread(str(file_path))))
         h, w, _ = image.shape
 
-        with self._lock:
-            with rsid_py.FaceAuthenticator(self._port) as f:
+        async with self._locked_device_async():
+            with self._connect() as f:
                 try:
-                    enroll_result = await run_in_threadpool(f.enroll_image, user_id, image.flatten().tolist(), w, h)
+                    with metrics.stage("enroll_image", self._port):
+                        enroll_result = await run_in_threadpool(
+                            f.enroll_image, user_id, image.flatten().tolist(), w, h
+                        )
                 except Exception as e:
                     logger.error(e)
                     exception = e
@@ -308,9 +774,23 @@ async def enroll_image(self, user_id: str, file_path: Path) -> EnrollResponse:
 
         if exception is not None:
             raise exception
-        return EnrollResponse(user_id=user_id, status=models.EnrollStatusEnum.from_rsid_py(enroll_result))
-
-    async def enroll_host(self, user_id: str) -> EnrollResponse:
+        status = models.EnrollStatusEnum.from_rsid_py(enroll_result)
+        metrics.count_enroll(status, self._port)
+        return EnrollResponse(user_id=user_id, status=status)
+
+    async def enroll_host(self, user_id: str, groups: list[str] | None = None) -> EnrollResponse:
+        status, extracted_prints = await self._device().extract_faceprints_for_enroll()
+        if status == models.EnrollStatusEnum.Success:
+            db_item = self._host_faceprints(extracted_prints)
+            db_item.adaptive_descriptor_withmask = [0] * 515  # deprecated.
+            await self._add_host_user(user_id, db_item, groups)
+        metrics.count_enroll(status, self._port)
+        return EnrollResponse(user_id=user_id, status=status)
+
+    async def extract_faceprints_for_enroll(
+        self,
+    ) -> tuple[models.EnrollStatusEnum, rsid_py.ExtractedFaceprintsElement | None]:
+        """Serial part of the host mode enrollment: the faceprints extracted by the device."""
         enroll_status: rsid_py.EnrollStatus | None = None
         extracted_prints: rsid_py.ExtractedFaceprintsElement | None = None
 
@@ -338,72 +818,72 @@ def on_hint(s: rsid_py.EnrollStatus):
         def on_faces(faces: list[rsid_py.FaceRect], i: int):
             logger.info(f"on_faces {faces}")
 
-        with self._lock:
+        async with self._locked_device_async():
             async with self._condition:
-                with rsid_py.FaceAuthenticator(self._port) as authenticator:
+                with self._connect() as authenticator:
                     try:
-                        await run_in_threadpool(authenticator.extract_faceprints_for_enroll,
-                                                on_progress=on_progress,
-                                                on_hint=on_hint,
-                                                on_faces=on_faces,
-                                                on_result=on_fp_enroll_result,
-                                                )
+                        with metrics.stage("extract_faceprints_for_enroll", self._port):
+                            await run_in_threadpool(authenticator.extract_faceprints_for_enroll,
+                                                    on_progress=on_progress,
+                                                    on_hint=on_hint,
+                                                    on_faces=on_faces,
+                                                    on_result=on_fp_enroll_result,
+                                                    )
                     finally:
                         authenticator.disconnect()
                 await self._condition.wait_for(lambda: enroll_status is not None)
+        return models.EnrollStatusEnum.from_rsid_py(enroll_status), extracted_prints
+
+    @staticmethod
+    def _host_faceprints(extracted_prints: rsid_py.ExtractedFaceprintsElement) -> rsid_py.Faceprints:
+        db_item = rsid_py.Faceprints()
+        db_item.version = extracted_prints.version
+        db_item.features_type = extracted_prints.features_type
+        db_item.flags = extracted_prints.flags
+        db_item.adaptive_descriptor_nomask = extracted_prints.features
+        db_item.enroll_descriptor = extracted_prints.features
+        return db_item
+
+    async def _add_host_user(self, user_id: str, db_item: rsid_py.Faceprints, groups: list[str] | None) -> None:
+        try:
+            await self.db.add_faceprints(user_id, db_item, groups)
+            self._on_gallery_changed()
+        except Exception as e:
+            logger.error(e)
+            raise e
 
-        if enroll_status == rsid_py.EnrollStatus.Success:
-            try:
-                db_item = rsid_py.Faceprints()
-                db_item.version = extracted_prints.version
-                db_item.features_type = extracted_prints.features_type
-                db_item.flags = extracted_prints.flags
-                db_item.adaptive_descriptor_nomask = extracted_prints.features
-                db_item.adaptive_descriptor_withmask = [0] * 515  # deprecated.
-                db_item.enroll_descriptor = extracted_prints.features
-                await self.db.add_faceprints(user_id, db_item)
-            except Exception as e:
-                logger.error(e)
-                raise e
-
-        return EnrollResponse(user_id=user_id, status=models.EnrollStatusEnum.from_rsid_py(enroll_status))
+    async def enroll_host_image(
+        self, user_id: str, file_path: Path, groups: list[str] | None = None
+    ) -> EnrollResponse:
+        image = await run_in_threadpool(self._read_enroll_image, file_path)
+        extracted_prints = await self._device().extract_image_faceprints_for_enroll(image)
+        # db_item.adaptive_descriptor_withmask = [0]    # FIXME: deprecated?
+        await self._add_host_user(user_id, self._host_faceprints(extracted_prints), groups)
+        metrics.count_enroll(models.EnrollStatusEnum.Success, self._port)
+        return EnrollResponse(user_id=user_id, status=models.EnrollStatusEnum.Success)
 
-    async def enroll_host_image(self, user_id: str, file_path: Path) -> EnrollResponse:
-        image = await run_in_threadpool(self._resize_if_big, (cv2.imread(str(file_path))))
+    async def extract_image_faceprints_for_enroll(self, image: np.ndarray) -> rsid_py.ExtractedFaceprintsElement:
+        """Serial part of `enroll_host_image`: the image read, BGR."""
         h, w, _ = image.shape
-        extracted_prints: rsid_py.ExtractedFaceprintsElement
-        with self._lock:
+        async with self._locked_device_async():
             async with self._condition:
-                with rsid_py.FaceAuthenticator(self._port) as f:
+                with self._connect() as f:
                     try:
-                        extracted_prints = await run_in_threadpool(
-                            f.extract_image_faceprints_for_enroll,
-                            image.flatten().tolist(),
-                            w,
-                            h,
-                        )
+                        with metrics.stage("extract_image_faceprints_for_enroll", self._port):
+                            return await run_in_threadpool(
+                                f.extract_image_faceprints_for_enroll,
+                                image.flatten().tolist(),
+                                w,
+                                h,
+                            )
                     finally:
                         f.disconnect()
-        try:
-            db_item = rsid_py.Faceprints()
-            db_item.version = extracted_prints.version
-            db_item.features_type = extracted_prints.features_type
-            db_item.flags = extracted_prints.flags
-            db_item.adaptive_descriptor_nomask = extracted_prints.features
-            # db_item.adaptive_descriptor_withmask = [0]    # FIXME: deprecated?
-            db_item.enroll_descriptor = extracted_prints.features
-            await self.db.add_faceprints(user_id, db_item)
-        except Exception as e:
-            logger.error(e)
-            raise e
-
-        return EnrollResponse(user_id=user_id, status=models.EnrollStatusEnum.Success)
 
     async def query_users(self) -> list[str]:
         users = []
         exception: Exception | None = None
-        with self._lock:
-            with rsid_py.FaceAuthenticator(self._port) as f:
+        async with self._locked_device_async():
+            with self._connect() as f:
                 try:
                     users = await run_in_threadpool(f.query_user_ids)
                 except Exception as e:
@@ -419,10 +899,13 @@ async def query_host_users(self) -> list[str]:
         users = await self.db.get_user_ids()
         return users
 
+    async def query_host_users_count(self) -> int:
+        return await self.db.count_users()
+
     async def remove_user(self, user_id: str) -> None:
         exception: Exception | None = None
-        with self._lock:
-            with rsid_py.FaceAuthenticator(self._port) as f:
+        async with self._locked_device_async():
+            with self._connect() as f:
                 try:
                     users = f.query_user_ids()
                     if user_id in users:
@@ -438,12 +921,56 @@ async def remove_user(self, user_id: str) -> None:
             raise exception
 
     async def remove_host_user(self, user_id: str) -> None:
+        if self.write_behind is not None:
+            self.write_behind.discard(user_id)
+        if self.recent_matches is not None:
+            self.recent_matches.evict(user_id)
         await self.db.delete_user(user_id=user_id)
+        self._on_gallery_changed()
+
+    async def remove_host_users(self, user_ids: list[str]) -> list[str]:
+        """Removes `user_ids` from the host DB, returns the ones that were not found."""
+        for user_id in user_ids:
+            if self.write_behind is not None:
+                self.write_behind.discard(user_id)
+            if self.recent_matches is not None:
+                self.recent_matches.evict(user_id)
+        not_found = await self.db.delete_users(user_ids)
+        self._on_gallery_changed()
+        return not_found
+
+    async def remove_all_host_users(self) -> None:
+        if self.write_behind is not None:
+            self.write_behind.clear()
+        if self.recent_matches is not None:
+            self.recent_matches.clear()
+        await self.db.delete_all_users()
+        self._on_gallery_changed()
+
+    async def export_host_users(self, cursor: str | None, page_size: int) -> AsyncIterator[tuple[str, Any]]:
+        """Yields ("record", dict) items page by page, each page followed by a ("cursor", next cursor) item."""
+        while True:
+            records, cursor = await self.db.export_page(cursor, page_size)
+            for record in records:
+                yield "record", record
+            yield "cursor", cursor
+            if cursor is None:
+                break
+
+    async def import_host_users(self, records: list[dict], dedupe: bool) -> int:
+        for record in records:
+            if self.write_behind is not None:
+                self.write_behind.discard(record["user_id"])
+            if self.recent_matches is not None:
+                self.recent_matches.evict(record["user_id"])
+        imported = await self.db.import_records(records, dedupe=dedupe)
+        self._on_gallery_changed()
+        return imported
 
     def remove_all_users(self) -> None:
         exception: Exception | None = None
-        with self._lock:
-            with rsid_py.FaceAuthenticator(self._port) as authenticator:
+        with self._locked_device():
+            with self._connect() as authenticator:
                 try:
                     authenticator.remove_all_users()
                 except Exception as e:
@@ -454,9 +981,13 @@ def remove_all_users(self) -> None:
         if exception is not None:
             raise exception
 
-    def query_device_info(self) -> DeviceInfoResponse:
+    def query_device_info(self, refresh: bool = False) -> DeviceInfoResponse:
+        """Serial number and firmware version, cached. `refresh` reads them from the device."""
+        return self.device_cache.get("device_info", self._read_device_info, refresh).model_copy()
+
+    def _read_device_info(self) -> DeviceInfoResponse:
         exception: Exception | None = None
-        with self._lock:
+        with self._locked_device():
             with rsid_py.DeviceController(self._port) as device_controller:
                 try:
                     serial_number: str = device_controller.query_serial_number()
@@ -472,13 +1003,18 @@ def query_device_info(self) -> DeviceInfoResponse:
                 finally:
                     device_controller.disconnect()
         if exception is not None:
+            self.device_cache.invalidate()
             raise exception
         return device_info
 
-    def query_device_config(self) -> models.DeviceConfig:
+    def query_device_config(self, refresh: bool = False) -> models.DeviceConfig:
+        """Device config, cached. `refresh` reads it from the device."""
+        return self.device_cache.get("device_config", self._read_device_config, refresh).model_copy()
+
+    def _read_device_config(self) -> models.DeviceConfig:
         exception: Exception | None = None
-        with self._lock:
-            with rsid_py.FaceAuthenticator(self._port) as f:
+        with self._locked_device():
+            with self._connect() as f:
                 try:
                     config = f.query_device_config()
                     config = models.DeviceConfig.from_rsid_config(config)
@@ -493,8 +1029,8 @@ def query_device_config(self) -> models.DeviceConfig:
 
     def update_device_config(self, config: models.DeviceConfig) -> models.DeviceConfig:
         exception: Exception | None = None
-        with self._lock:
-            with rsid_py.FaceAuthenticator(self._port) as f:
+        with self._locked_device():
+            with self._connect() as f:
                 try:
                     rsid_config = rsid_py.DeviceConfig()
                     rsid_config.algo_flow = config.algo_flow.to_rsid_py()
@@ -503,86 +1039,168 @@ def update_device_config(self, config: models.DeviceConfig) -> models.DeviceConf
                     rsid_config.face_selection_policy = config.face_selection_policy.to_rsid_py()
                     rsid_config.matcher_confidence_level = config.matcher_confidence_level.to_rsid_py()
                     f.set_device_config(rsid_config)
+                    # Read back in the same session: the device may adjust the requested config
+                    updated_config = models.DeviceConfig.from_rsid_config(f.query_device_config())
                 except Exception as e:
                     logger.error(e)
                     exception = e
                 finally:
                     f.disconnect()
+                    # Even on failure, the config may have been partially applied
+                    self.device_cache.invalidate()
         if exception is not None:
             raise exception
-        return self.query_device_config()
+        self.device_cache.put("device_config", updated_config)
+        return updated_config.model_copy()
 
-    async def stream(self, ticket: uuid.UUID) -> AsyncContentStream:
-        self._preview_tickets.append(ticket)
-        logger.info(
-            f"Starting stream for user with ticket {ticket.hex}. " f"Audience count: {len(self._preview_tickets)}"
+    def _on_preview_image(self, image: rsid_py.Image | np.ndarray) -> None:
+        # SDK context (or frame ring subscription thread), don't do much work here.
+        try:
+            if self._preview_ring is not None:
+                self._preview_ring.publish(image.get_buffer(), image.width, image.height)
+            self.preview_lifecycle.frame_received()
+            metrics.PREVIEW_FRAMES.labels(self._port or "").inc()
+            with self._preview_condition:
+                RSIDApiWrapper._preview_frame = image
+                RSIDApiWrapper._preview_frame_number += 1
+                self._preview_condition.notify_all()
+        except Exception as preview_ex:
+            logger.error(preview_ex)
+
+    def _start_preview(self) -> None:
+        # Called by the preview lifecycle manager only, it serializes starts and stops
+        if use_broker():
+            # The broker owns the camera and publishes its frames, subscribing keeps its preview running
+            RSIDApiWrapper._preview = PreviewRingSubscription(get_app_settings().preview_shm_name,
+                                                              self._on_preview_image)
+            return
+        preview_cfg = rsid_py.PreviewConfig()
+        preview_cfg.camera_number = get_app_settings().preview_camera_number
+        preview_cfg.preview_mode = rsid_py.PreviewMode.__members__[get_app_settings().preview_mode.value.upper()]
+        # preview_cfg.portrait_mode = True
+        # preview_cfg.rotate_raw = False
+        preview = rsid_py.Preview(preview_cfg)
+        preview.start(self._on_preview_image, None)
+        RSIDApiWrapper._preview = preview
+
+    def _stop_preview(self) -> None:
+        preview, RSIDApiWrapper._preview = self._preview, None
+        RSIDApiWrapper._preview_frame = None
+        RSIDApiWrapper._preview_images = {}
+        if preview is not None:
+            preview.stop()
+
+    def _watch_preview_subscribers(self) -> None:
+        # Shared memory subscribers don't call in: subscribe the preview for them, release it when they are gone.
+        timeout = get_app_settings().preview_shm_subscriber_timeout
+        subscribed = False
+        start_failed = False
+        while True:
+            time.sleep(1.0)
+            try:
+                active = self._preview_ring.active_subscribers(timeout) > 0
+                if active and not subscribed:
+                    logger.info("Preview frame ring subscribed")
+                    self.preview_lifecycle.acquire(self._preview_ring)
+                elif subscribed and not active:
+                    logger.info("Preview frame ring unsubscribed")
+                    self.preview_lifecycle.release(self._preview_ring)
+                subscribed = active
+                start_failed = False
+            except Exception as e:
+                if not start_failed:  # Don't log every second while the camera is missing
+                    logger.error(f"Preview frame ring: {e}")
+                start_failed = True
+
+    def query_preview_stats(self) -> PreviewLifecycleStats:
+        return self.preview_lifecycle.stats()
+
+    @staticmethod
+    def _preview_variant_size(variant: PreviewVariantTypes, width: int, height: int) -> tuple[int, int]:
+        if variant == PreviewVariantTypes.p720 and height > 720:
+            return round(width * 720 / height), 720
+        thumbnail_width = get_app_settings().preview_thumbnail_width
+        if variant == PreviewVariantTypes.thumbnail and width > thumbnail_width:
+            return thumbnail_width, round(height * thumbnail_width / width)
+        return width, height
+
+    @staticmethod
+    def _encode_image(array2d: np.ndarray, variant: PreviewVariantTypes) -> Any:
+        settings = get_app_settings()
+        height, width = array2d.shape[:2]
+        size = RSIDApiWrapper._preview_variant_size(variant, width, height)
+        if size != (width, height):
+            import cv2
+
+            array2d = cv2.resize(array2d, size, interpolation=cv2.INTER_AREA)
+        if settings.preview_stream_type == StreamEncodingStypes.webp:
+            import cv2
+
+            array2d = array2d[:, :, ::-1]  # RGB to BGR
+            _, encoded = cv2.imencode(".webp", array2d, [cv2.IMWRITE_WEBP_QUALITY, settings.preview_webp_quality])
+            return encoded
+        from simplejpeg import encode_jpeg
+
+        # array2d = np.flip(array2d, 1)
+        return encode_jpeg(
+            array2d,
+            # colorspace="RGB",
+            fastdct=True,
+            quality=settings.preview_jpeg_quality,
         )
-        device_preview_image: rsid_py.Image | None = None
-
-        async def encode_image_async():
-            nonlocal device_preview_image
-            jpeg_quality: int = get_app_settings().preview_jpeg_quality
-            webp_quality: int = get_app_settings().preview_webp_quality
-            with (self._preview_encoder_lock):
-                if device_preview_image is None:  # Some other thread took care of this
-                    return
-                try:
-                    buffer = memoryview(device_preview_image.get_buffer())
-                    arr = np.asarray(buffer, dtype=np.uint8)
-                    array2d = arr.reshape(device_preview_image.height, device_preview_image.width, -1)
-                    if get_app_settings().preview_stream_type == StreamEncodingStypes.webp:
-                        array2d = array2d[:, :, ::-1]  # RGB to BGR
-                        _, self._preview_image = cv2.imencode(
-                            ".webp", array2d, [cv2.IMWRITE_WEBP_QUALITY, webp_quality]
-                        )
-                    else:
-                        # array2d = np.flip(array2d, 1)
-                        self._preview_image = encode_jpeg(
-                            array2d,
-                            # colorspace="RGB",
-                            fastdct=True,
-                            quality=jpeg_quality,
-                        )
-                        # array2d = array2d[:, :, ::-1]     # RGB to BGR
-                        # (flag, self._preview_image) = cv2.imencode(".jpg", array2d,
-                        #   [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality])
-                except Exception as encoding_ex:
-                    logger.error(encoding_ex)
-                finally:
-                    device_preview_image = None
-
-        def on_preview_image(image: rsid_py.Image):
-            # SDK context, don't do much work here.
-            nonlocal device_preview_image
+        # array2d = array2d[:, :, ::-1]     # RGB to BGR
+        # (flag, encoded) = cv2.imencode(".jpg", array2d,
+        #   [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality])
+
+    def _encode_preview(self, variant: PreviewVariantTypes) -> Any:
+        """
+        Encoded image of the latest frame for `variant`. Each variant is encoded at most once per frame, and only
+        when a viewer asks for it.
+        """
+        with self._preview_encoder_lock:
+            frame, frame_number = self._preview_frame, self._preview_frame_number
+            encoded_number, encoded = self._preview_images.get(variant, (0, None))
+            # No frame yet, or some other thread took care of this one
+            if frame is None or frame_number == encoded_number:
+                return encoded
             try:
-                with self._preview_condition:
-                    device_preview_image = image
-                    self._preview_condition.notify_all()
-            except Exception as preview_ex:
-                logger.error(preview_ex)
-
-        with self._lock:
-            if self._preview is None:
-                preview_cfg = rsid_py.PreviewConfig()
-                preview_cfg.camera_number = get_app_settings().preview_camera_number
-                preview_cfg.preview_mode = rsid_py.PreviewMode.MJPEG_1080P
-                # preview_cfg.portrait_mode = True
-                # preview_cfg.rotate_raw = False
-                self._preview = rsid_py.Preview(preview_cfg)
-                self._preview.start(on_preview_image, None)
+                if isinstance(frame, np.ndarray):  # From the frame ring
+                    arr = frame
+                else:
+                    arr = np.asarray(memoryview(frame.get_buffer()), dtype=np.uint8)
+                    arr = arr.reshape(frame.height, frame.width, -1)
+                encoded = self._encode_image(arr, variant)
+            except Exception as encoding_ex:
+                logger.error(encoding_ex)
+            self._preview_images[variant] = (frame_number, encoded)
+            return encoded
+
+    def warm_up_encoders(self) -> None:
+        """Encode a blank 1080p frame in every preview variant: the first viewer doesn't wait for the encoders."""
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        for variant in PreviewVariantTypes:
+            self._encode_image(frame, variant)
+
+    async def stream(
+        self, ticket: uuid.UUID, variant: PreviewVariantTypes = PreviewVariantTypes.full
+    ) -> AsyncContentStream:
+        audience = self.preview_lifecycle.acquire(ticket)
+        logger.info(
+            f"Starting {variant.value} stream for user with ticket {ticket.hex}. " f"Audience count: {audience}"
+        )
 
         with self._preview_condition:
             try:
                 while True:
                     self._preview_condition.wait()
-                    if ticket not in self._preview_tickets:  # Client disconnected?
+                    if not self.preview_lifecycle.is_subscribed(ticket):  # Client disconnected?
                         continue
                     # Similar to flask image streaming:
                     # https://stackoverflow.com/a/57763063
-                    await encode_image_async()
-                    if self._preview_image is None:  # No encoded image available?
+                    preview_image = self._encode_preview(variant)
+                    if preview_image is None:  # No encoded image available?
                         continue
-                    length = str(len(self._preview_image)).encode()
+                    length = str(len(preview_image)).encode()
                     content_type = (b"image/webp"
                                     if get_app_settings().preview_stream_type == StreamEncodingStypes.webp
                                     else b"image/jpeg")
@@ -595,7 +1213,7 @@ def on_preview_image(image: rsid_py.Image):
                         + length
                         + b"\r\n"
                         + b"\r\n"
-                        + bytearray(self._preview_image)
+                        + bytearray(preview_image)
                         + b"\r\n"
                     )
 
@@ -603,17 +1221,13 @@ def on_preview_image(image: rsid_py.Image):
                     # https://github.com/encode/starlette/discussions/1776#discussioncomment-3207518
                     await asyncio.sleep(0.0015)  # Fix to max 60fps - F400 series max is ~15fps to ~16fps @1080p
                     # Note: asyncio.sleep is a must even if set to 0
-            except asyncio.CancelledError:  # Client disconnected
-                self.revoke_preview_ticket(ticket)
-                # raise GeneratorExit from e
+            finally:  # Client disconnected (cancelled) or generator closed
+                if self.preview_lifecycle.is_subscribed(ticket):
+                    self.revoke_preview_ticket(ticket)
 
     def revoke_preview_ticket(self, ticket: uuid.UUID) -> None:
-        self._preview_tickets.remove(ticket)
-        logger.info(f"User with ticket {ticket.hex} disconnected. " f"Audience count: {len(self._preview_tickets)}")
-        if len(self._preview_tickets) == 0:
-            logger.info("No more audience. Stopping preview")
-            self._preview.stop()
-            self._preview = None
+        audience = self.preview_lifecycle.release(ticket)
+        logger.info(f"User with ticket {ticket.hex} disconnected. " f"Audience count: {audience}")
 
     def query_update_status(self) -> models.UpdateCheckerResponse:
         available, local, remote = rsid_py.UpdateChecker.is_update_available(self._port)
@@ -626,7 +1240,7 @@ async def query_fw_update_status(self, file_path: Path) -> models.FWUpdateStatus
         # def progress_callback(progress: float):
         #     logger.info(f"progress: {progress}")
         #     updater.update(progress_callback=progress_callback)
-        with self._lock:
+        async with self._locked_device_async():
             with rsid_py.FWUpdater(str(file_path), self._port) as updater:
                 fw_file_info = await run_in_threadpool(updater.get_firmware_bin_info)
                 device_fw_info = await run_in_threadpool(updater.get_device_firmware_info)
@@ -649,24 +1263,14 @@ async def query_fw_update_status(self, file_path: Path) -> models.FWUpdateStatus
             )
 
 
-def lib_log(level: rsid_py.LogLevel, message: str):
-    log_map = {
-        rsid_py.LogLevel.Debug: logger.debug,
-        rsid_py.LogLevel.Info: logger.info,
-        rsid_py.LogLevel.Warning: logger.warning,
-        rsid_py.LogLevel.Error: logger.error,
-        rsid_py.LogLevel.Critical: logger.critical,
-        rsid_py.LogLevel.Trace: logger.trace,
-    }
-    log_map[level](message.strip())
-
-
-rsid_py.set_log_callback(callback=lib_log,  # noqa: E741
-                         log_level=rsid_py.LogLevel.Trace,
-                         do_formatting=False)
+install_sdk_log_callback(logging_level=get_app_settings().logging_level,
+                         queue_size=get_app_settings().sdk_log_queue_size,
+                         sample_rate=get_app_settings().sdk_log_sample_rate)
 
 
 def get_rsid_api() -> RSIDApiWrapper:
+    if use_broker():
+        return get_broker_client()  # The broker finds and owns the device
     settings = get_app_settings()
     if settings.auto_detect:
         iterator = sorted(comports(include_links=True))
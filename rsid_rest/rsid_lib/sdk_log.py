@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import atexit
+import logging
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+import rsid_py
+from asgi_correlation_id import correlation_id
+from loguru import logger
+
+from ..core import metrics
+
+# Messages differing only by numbers (frame numbers, timings, ...) are sampled as the same message
+_NUMBERS = re.compile(r"\d+")
+
+
+def sdk_log_level(logging_level: int) -> rsid_py.LogLevel:
+    """SDK level forwarding the messages `logging_level` lets through: the SDK doesn't format what we'd drop."""
+    if logging_level <= 5:  # loguru TRACE
+        return rsid_py.LogLevel.Trace
+    if logging_level <= logging.DEBUG:
+        return rsid_py.LogLevel.Debug
+    if logging_level <= logging.INFO:
+        return rsid_py.LogLevel.Info
+    if logging_level <= logging.WARNING:
+        return rsid_py.LogLevel.Warning
+    if logging_level <= logging.ERROR:
+        return rsid_py.LogLevel.Error
+    return rsid_py.LogLevel.Critical
+
+
+@dataclass
+class SDKLogStats:
+    forwarded: int = 0
+    dropped: int = 0  # Queue full
+    sampled: int = 0  # Over the per message rate
+
+
+class SDKLogForwarder:
+    """
+    SDK log callback that never blocks the SDK thread emitting the message (preview, serial, request threads).
+
+    The callback only samples and enqueues: a message repeated more than `sample_rate` times a second is counted, not
+    enqueued, and a message arriving while `queue_size` messages are pending is dropped. A background thread logs
+    the queued messages with loguru, under the correlation id of the request they were emitted for.
+    """
+
+    def __init__(self, queue_size: int, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.stats = SDKLogStats()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        # Message key -> (window start, count in window, correlation id of the last sampled out message)
+        self._windows: dict[tuple, list] = {}
+        self._thread = threading.Thread(target=self._run, name="sdk-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def __call__(self, level: rsid_py.LogLevel, message: str) -> None:
+        # SDK context, don't do much work here.
+        cid = correlation_id.get()
+        if self.sample_rate > 0 and not self._sample(level, message, cid):
+            self.stats.sampled += 1
+            metrics.SDK_LOG_MESSAGES.labels("sampled").inc()
+            return
+        try:
+            self._queue.put_nowait((level, message, cid))
+        except queue.Full:
+            self.stats.dropped += 1
+            metrics.SDK_LOG_MESSAGES.labels("dropped").inc()
+
+    def _sample(self, level: rsid_py.LogLevel, message: str, cid: str | None) -> bool:
+        key = (level, _NUMBERS.sub("#", message[:80].rstrip()))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= 1.0:
+                suppressed = window[1] - self.sample_rate if window is not None else 0
+                if len(self._windows) > 1000:
+                    self._windows.clear()  # Don't grow with unique messages
+                self._windows[key] = [now, 1, None]
+                if suppressed > 0:
+                    self._queue_summary(level, message, suppressed, window[2])
+                return True
+            window[1] += 1
+            if window[1] <= self.sample_rate:
+                return True
+            window[2] = cid
+            return False
+
+    def _queue_summary(self, level: rsid_py.LogLevel, message: str, suppressed: int, cid: str | None) -> None:
+        try:
+            self._queue.put_nowait((level, f"{message.strip()} ({suppressed} similar messages suppressed)", cid))
+        except queue.Full:
+            pass
+
+    def _run(self) -> None:
+        log_map = {
+            rsid_py.LogLevel.Debug: "DEBUG",
+            rsid_py.LogLevel.Info: "INFO",
+            rsid_py.LogLevel.Warning: "WARNING",
+            rsid_py.LogLevel.Error: "ERROR",
+            rsid_py.LogLevel.Critical: "CRITICAL",
+            rsid_py.LogLevel.Trace: "TRACE",
+        }
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            level, message, cid = item
+            correlation_id.set(cid)
+            logger.log(log_map.get(level, "INFO"), message.strip())
+            self.stats.forwarded += 1
+            metrics.SDK_LOG_MESSAGES.labels("forwarded").inc()
+
+    def stop(self) -> None:
+        """Log the pending messages and stop."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+
+
+_forwarder: SDKLogForwarder | None = None
+
+
+def get_sdk_log_forwarder() -> SDKLogForwarder | None:
+    return _forwarder
+
+
+def install_sdk_log_callback(logging_level: int, queue_size: int, sample_rate: int) -> SDKLogForwarder:
+    global _forwarder
+    if _forwarder is None:
+        _forwarder = SDKLogForwarder(queue_size=queue_size, sample_rate=sample_rate)
+    rsid_py.set_log_callback(callback=_forwarder,
+                             log_level=sdk_log_level(logging_level),
+                             do_formatting=False)
+    return _forwarder
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from ..core import metrics
+from ..core.config import get_app_settings
+from ..core.settings.base import ApplicationDBTypes, WarmupStepTypes
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    done: bool = False
+    attempts: int = 0
+    seconds: float | None = None  # Duration of the last attempt
+    error: str | None = None  # Error of the last attempt
+
+
+class Warmup:
+    """
+    Pays the first request costs before the app reports ready: port discovery and wrapper creation (host DB client,
+    collection check), first DB load (a user count), encoders initialization and serial connect. Failed steps are
+    retried every `retry_interval` seconds; the steps after a failed one wait for the next attempt.
+    """
+
+    def __init__(self, steps: list[WarmupStepTypes], retry_interval: float):
+        self.retry_interval = retry_interval
+        self.steps = {step: WarmupStep(name=step.value) for step in steps}
+        self.started_at = time.monotonic()
+        self.seconds: float | None = None  # Until all the steps succeeded
+        self._api = None
+        self._task: asyncio.Task | None = None
+        if len(self.steps) == 0:
+            self._set_ready()
+
+    @property
+    def ready(self) -> bool:
+        return self.seconds is not None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while not self.ready:
+            for step_type, step in self.steps.items():
+                if step.done:
+                    continue
+                if not await self._run_step(step_type, step):
+                    break
+            else:
+                self._set_ready()
+                return
+            await asyncio.sleep(self.retry_interval)
+
+    async def _run_step(self, step_type: WarmupStepTypes, step: WarmupStep) -> bool:
+        started_at = time.perf_counter()
+        step.attempts += 1
+        try:
+            await self._step_functions[step_type](self)
+            step.done, step.error = True, None
+        except Exception as e:
+            step.error = f"{type(e).__name__}: {e}"
+        step.seconds = time.perf_counter() - started_at
+        metrics.WARMUP_STEP_SECONDS.labels(step.name).set(step.seconds)
+        if step.done:
+            logger.info(f"Warm-up: {step.name} done in {step.seconds * 1000:.0f} ms")
+        else:
+            logger.warning(f"Warm-up: {step.name} failed (attempt {step.attempts}), retrying in "
+                           f"{self.retry_interval:.0f} s: {step.error}")
+        return step.done
+
+    def _set_ready(self) -> None:
+        self.seconds = time.monotonic() - self.started_at
+        metrics.WARMUP_READY.set(1)
+        logger.info(f"Warm-up complete in {self.seconds:.2f} s, ready")
+
+    async def _get_api(self):
+        if self._api is None:
+            from .rsid_api_wrapper import get_rsid_api
+
+            self._api = await run_in_threadpool(get_rsid_api)
+        return self._api
+
+    async def _port_discovery(self) -> None:
+        await self._get_api()
+
+    async def _db(self) -> None:
+        if get_app_settings().db_mode == ApplicationDBTypes.host:
+            await (await self._get_api()).query_host_users_count()  # Opens the DB without reading the payloads
+
+    async def _encoders(self) -> None:
+        await run_in_threadpool((await self._get_api()).warm_up_encoders)
+
+    async def _device(self) -> None:
+        await run_in_threadpool((await self._get_api()).query_device_info)
+
+    _step_functions = {
+        WarmupStepTypes.port_discovery: _port_discovery,
+        WarmupStepTypes.db: _db,
+        WarmupStepTypes.encoders: _encoders,
+        WarmupStepTypes.device: _device,
+    }
+
+
+_warmup: Warmup | None = None
+
+
+def get_warmup() -> Warmup | None:
+    return _warmup
+
+
+def start_warmup(steps: list[WarmupStepTypes], retry_interval: float) -> Warmup:
+    global _warmup
+    _warmup = Warmup(steps=steps, retry_interval=retry_interval)
+    _warmup.start()
+    return _warmup
+
+
+async def stop_warmup() -> None:
+    global _warmup
+    if _warmup is not None:
+        await _warmup.stop()
+        _warmup = None
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any
+
+import rsid_py
+from loguru import logger
+
+from .host_db_base import HostDBBase, faceprints_to_payload
+from .interprocess_lock import InterProcessLock
+
+
+@dataclass
+class WriteBehindStats:
+    enqueued: int = 0
+    coalesced: int = 0
+    flushed: int = 0
+    rate_limited: int = 0
+    failed: int = 0
+    journaled: int = 0
+
+
+class FaceprintsWriteBehindQueue:
+    """
+    Defers adaptive faceprints updates so that authentication can return before the DB write.
+
+    Updates are coalesced per user (last write wins) and flushed in batches. A user is persisted at most once
+    every `min_interval` seconds; updates arriving in between replace the pending one.
+
+    Queued updates are appended to `journal_file` (JSON lines, a null payload discards the user) as they are
+    enqueued, and replayed on the next start(): a crash or a kill loses no update, only a power loss can lose the
+    writes the OS didn't persist yet. The journal is rewritten with the pending updates once it holds more than
+    `2 * pending + batch_size` lines, and truncated when everything was flushed.
+
+    With several processes sharing the DB, each one has its own journal, locked while the queue runs, and
+    `orphan_journals` is the glob of the journals in the same directory: the unlocked ones belong to processes
+    that are gone and are adopted on start().
+    """
+
+    def __init__(
+        self,
+        db: HostDBBase,
+        journal_file: Path,
+        flush_interval: float,
+        batch_size: int,
+        min_interval: float,
+        orphan_journals: str | None = None,
+    ):
+        self._db = db
+        self._journal_file = journal_file
+        self._orphan_journals = orphan_journals
+        self._journal_lock = InterProcessLock(self._lock_file(journal_file)) if orphan_journals is not None else None
+        self._journal: IO[str] | None = None
+        self._journal_lines = 0
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._min_interval = min_interval
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._last_flushed: dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.stats = WriteBehindStats()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        if self._journal_lock is not None:
+            self._journal_lock.acquire()
+        self._replay_journal(self._journal_file)
+        orphans = self._adopt_orphans()
+        self._rewrite_journal()
+        # The adopted updates are in our journal now
+        for journal_file, lock in orphans:
+            journal_file.unlink(missing_ok=True)
+            lock.release()
+            lock.path.unlink(missing_ok=True)
+        self._task = asyncio.create_task(self._run(), name="faceprints-write-behind")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Shutdown: persist everything, regardless of rate limiting
+        await self.flush(force=True)
+        if len(self._pending) > 0:
+            logger.warning(f"{len(self._pending)} pending faceprints update(s) kept in {self._journal_file}")
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self._journal_lock is not None:
+            self._journal_lock.release()
+            if len(self._pending) == 0:
+                # Nothing to adopt, don't leave files behind for each process
+                self._journal_file.unlink(missing_ok=True)
+                self._journal_lock.path.unlink(missing_ok=True)
+
+    def enqueue(self, user_id: str, faceprints: rsid_py.Faceprints) -> None:
+        self.stats.enqueued += 1
+        if user_id in self._pending:
+            self.stats.coalesced += 1
+        payload = faceprints_to_payload(faceprints)
+        self._pending[user_id] = payload
+        self._append_journal(user_id, payload)
+        if len(self._pending) >= self._batch_size:
+            self._wakeup.set()
+
+    def discard(self, user_id: str) -> None:
+        if self._pending.pop(user_id, None) is not None:
+            self._append_journal(user_id, None)
+        self._last_flushed.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._last_flushed.clear()
+        self._rewrite_journal()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Not wait_for(): it can swallow the cancellation of stop() when the event is set meanwhile
+                async with asyncio.timeout(self._flush_interval):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+
+    async def flush(self, force: bool = False) -> None:
+        async with self._flush_lock:
+            now = time.monotonic()
+            # Forget users whose rate limit window is over
+            self._last_flushed = {
+                user_id: t for user_id, t in self._last_flushed.items() if now - t < self._min_interval
+            }
+            due = [
+                user_id for user_id in self._pending if force or user_id not in self._last_flushed
+            ]
+            self.stats.rate_limited = len(self._pending) - len(due)
+            for i in range(0, len(due), self._batch_size):
+                batch = {user_id: self._pending.pop(user_id) for user_id in due[i: i + self._batch_size]}
+                try:
+                    skipped = await self._db.update_faceprints_batch(batch)
+                except Exception as e:
+                    logger.error(f"Write-behind batch of {len(batch)} update(s) failed: {e}")
+                    self.stats.failed += len(batch)
+                    for user_id, payload in batch.items():
+                        self._pending.setdefault(user_id, payload)  # Keep newer updates if any arrived
+                    return
+                self.stats.failed += len(skipped)
+                self.stats.flushed += len(batch) - len(skipped)
+                flushed_at = time.monotonic()
+                for user_id in batch:
+                    self._last_flushed[user_id] = flushed_at
+            pending = len(self._pending)
+            if self._journal_lines > 0 and (pending == 0 or self._journal_lines > 2 * pending + self._batch_size):
+                self._rewrite_journal()
+
+    def _append_journal(self, user_id: str, payload: dict[str, Any] | None) -> None:
+        if self._journal is None:
+            return
+        try:
+            self._journal.write(json.dumps({"user_id": user_id, "faceprints": payload}) + "\n")
+            self._journal.flush()
+            self._journal_lines += 1
+            self.stats.journaled += 1
+        except OSError as e:
+            logger.error(f"Unable to journal the faceprints update of {user_id}: {e}")
+
+    def _rewrite_journal(self) -> None:
+        """Replace the journal with the pending updates, atomically."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        tmp_file = self._journal_file.with_name(f"{self._journal_file.name}.tmp")
+        try:
+            with tmp_file.open("w") as f:
+                for user_id, payload in self._pending.items():
+                    f.write(json.dumps({"user_id": user_id, "faceprints": payload}) + "\n")
+            os.replace(tmp_file, self._journal_file)
+            self._journal_lines = len(self._pending)
+            self._journal = self._journal_file.open("a")
+        except OSError as e:
+            logger.error(f"Unable to write the faceprints updates journal {self._journal_file}: {e}")
+
+    @staticmethod
+    def _lock_file(journal_file: Path) -> Path:
+        return journal_file.with_name(f"{journal_file.name}.lock")
+
+    def _adopt_orphans(self) -> list[tuple[Path, InterProcessLock]]:
+        """Replay the journals of the processes that are gone, returns them with their lock, held."""
+        if self._orphan_journals is None:
+            return []
+        orphans = []
+        for journal_file in sorted(self._journal_file.parent.glob(self._orphan_journals)):
+            if journal_file == self._journal_file:
+                continue
+            lock = InterProcessLock(self._lock_file(journal_file))
+            if not lock.acquire(blocking=False):
+                continue  # Its process is running
+            if not journal_file.exists():
+                lock.release()  # Adopted by another process meanwhile
+                continue
+            logger.info(f"Adopting the faceprints updates journal {journal_file}")
+            self._replay_journal(journal_file)
+            orphans.append((journal_file, lock))
+        return orphans
+
+    def _replay_journal(self, journal_file: Path) -> None:
+        if not journal_file.exists():
+            return
+        replayed = 0
+        try:
+            with journal_file.open() as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line
+                    replayed += 1
+                    if entry["faceprints"] is None:
+                        self._pending.pop(entry["user_id"], None)
+                    else:
+                        self._pending[entry["user_id"]] = entry["faceprints"]
+        except OSError as e:
+            logger.error(f"Unable to replay the faceprints updates journal {journal_file}: {e}")
+        if replayed > 0:
+            logger.info(f"Replayed {replayed} faceprints update(s) from {journal_file}, "
+                        f"{len(self._pending)} pending")
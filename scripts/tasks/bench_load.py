@@ -0,0 +1,361 @@
+"""
+Load benchmark of the REST API, on the fake device backend.
+
+Starts the app in-process with uvicorn and drives it over HTTP with concurrent clients. Each scenario runs for
+`duration` seconds at every concurrency level:
+- `auth`: `/v1/auth/` in a loop.
+- `users`: user listing, and enroll + delete pairs.
+- `preview`: `concurrency` viewers of `/v1/preview/stream/`, latency is the time between frames.
+- `device_config`: device config reads and updates.
+- `mixed`: auth, users and device config calls, with a preview viewer for every 4 clients.
+
+The JSON report has the p50/p95/p99 latencies, throughput and event-loop lag of the server for each step, along
+with the commit and the fake device latencies. Compare it with the report of another commit with `baseline`.
+"""
+
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+REPORT_VERSION = 1
+SCENARIOS = ("auth", "users", "preview", "device_config", "mixed")
+# Throughput and latency changes beyond this ratio are reported as regressions
+REGRESSION_TOLERANCE = 0.10
+_LOOP_LAG_INTERVAL = 0.01
+
+
+@dataclass
+class _Recorder:
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+
+    def record(self, operation: str, seconds: float, ok: bool = True) -> None:
+        if ok:
+            self.latencies.setdefault(operation, []).append(seconds)
+        else:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+
+def _percentiles_ms(values: list[float]) -> dict[str, float] | None:
+    if len(values) == 0:
+        return None
+    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+    return {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3), "max": round(max(values) * 1000, 3)}
+
+
+class _InProcessServer:
+    """uvicorn on its own thread and event loop, the clients run on the main thread."""
+
+    def __init__(self, app):
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_until_complete, args=(self.server.serve(),), name="bench-server", daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        while not self.server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.server.should_exit = True
+        self._thread.join()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def measure_loop_lag(self) -> tuple[Future, list[float]]:
+        """Samples how late the server event loop wakes up, until the returned future is cancelled."""
+        samples: list[float] = []
+
+        async def probe():
+            while True:
+                started_at = time.perf_counter()
+                await asyncio.sleep(_LOOP_LAG_INTERVAL)
+                samples.append(max(0.0, time.perf_counter() - started_at - _LOOP_LAG_INTERVAL))
+
+        return asyncio.run_coroutine_threadsafe(probe(), self.loop), samples
+
+
+async def _timed(
+    client: httpx.AsyncClient, recorder: _Recorder, operation: str, method: str, url: str, **kwargs
+) -> httpx.Response | None:
+    started_at = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        recorder.record(operation, 0.0, ok=False)
+        return None
+    ok = response.status_code < 400
+    recorder.record(operation, time.perf_counter() - started_at, ok)
+    return response if ok else None
+
+
+async def _auth_client(client: httpx.AsyncClient, recorder: _Recorder, deadline: float, rnd: random.Random) -> None:
+    while time.perf_counter() < deadline:
+        await _timed(client, recorder, "auth", "GET", "/v1/auth/")
+
+
+async def _users_client(client: httpx.AsyncClient, recorder: _Recorder, deadline: float, rnd: random.Random) -> None:
+    while time.perf_counter() < deadline:
+        await _users_call(client, recorder, rnd)
+
+
+async def _users_call(client: httpx.AsyncClient, recorder: _Recorder, rnd: random.Random) -> None:
+    if rnd.random() < 0.7:
+        await _timed(client, recorder, "users_list", "GET", "/v1/users/")
+        return
+    user_id = f"bench-{rnd.getrandbits(32):08x}"
+    if await _timed(client, recorder, "users_enroll", "POST", "/v1/users/enroll/", params={"user_id": user_id}):
+        await _timed(client, recorder, "users_delete", "DELETE", f"/v1/users/{user_id}")
+
+
+async def _device_config_client(
+    client: httpx.AsyncClient, recorder: _Recorder, deadline: float, rnd: random.Random
+) -> None:
+    while time.perf_counter() < deadline:
+        await _device_config_call(client, recorder, rnd)
+
+
+async def _device_config_call(client: httpx.AsyncClient, recorder: _Recorder, rnd: random.Random) -> None:
+    response = await _timed(client, recorder, "device_config_get", "GET", "/v1/device/device-config/")
+    if response is not None and rnd.random() < 0.2:
+        await _timed(client, recorder, "device_config_put", "PUT", "/v1/device/device-config/",
+                     json=response.json()["config"])
+
+
+async def _mixed_client(client: httpx.AsyncClient, recorder: _Recorder, deadline: float, rnd: random.Random) -> None:
+    while time.perf_counter() < deadline:
+        draw = rnd.random()
+        if draw < 0.6:
+            await _timed(client, recorder, "auth", "GET", "/v1/auth/")
+        elif draw < 0.85:
+            await _users_call(client, recorder, rnd)
+        else:
+            await _device_config_call(client, recorder, rnd)
+
+
+async def _preview_viewer(client: httpx.AsyncClient, recorder: _Recorder, deadline: float, variant: str) -> None:
+    try:
+        async with client.stream("GET", "/v1/preview/stream/", params={"variant": variant}) as response:
+            last_frame_at = time.perf_counter()
+            first = True
+            async for chunk in response.aiter_bytes():
+                frames = chunk.count(b"--frame")
+                if frames > 0:
+                    now = time.perf_counter()
+                    # The first frame includes the camera start, time it separately
+                    recorder.record("preview_first_frame" if first else "preview_frame", now - last_frame_at)
+                    for _ in range(frames - 1):
+                        recorder.record("preview_frame", 0.0)
+                    last_frame_at = now
+                    first = False
+                if time.perf_counter() >= deadline:
+                    break
+    except httpx.HTTPError:
+        recorder.record("preview_frame", 0.0, ok=False)
+
+
+async def _run_step(
+    base_url: str, scenario: str, concurrency: int, duration: float, preview_variant: str, seed: int
+) -> _Recorder:
+    recorder = _Recorder()
+    clients: dict[str, Callable[..., Awaitable[None]]] = {
+        "auth": _auth_client,
+        "users": _users_client,
+        "device_config": _device_config_client,
+        "mixed": _mixed_client,
+    }
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+        tasks = []
+        if scenario == "preview":
+            viewers = concurrency
+        else:
+            viewers = concurrency // 4 if scenario == "mixed" else 0
+            tasks += [
+                clients[scenario](client, recorder, deadline, random.Random(seed * 1000 + i))
+                for i in range(concurrency)
+            ]
+        tasks += [_preview_viewer(client, recorder, deadline, preview_variant) for _ in range(viewers)]
+        await asyncio.gather(*tasks)
+    return recorder
+
+
+def _step_report(scenario: str, concurrency: int, elapsed: float, recorder: _Recorder, lag: list[float]) -> dict:
+    requests = sum(len(v) for op, v in recorder.latencies.items() if not op.startswith("preview"))
+    frames = sum(len(v) for op, v in recorder.latencies.items() if op.startswith("preview"))
+    all_requests = [s for op, v in recorder.latencies.items() if not op.startswith("preview") for s in v]
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests": requests,
+        "errors": sum(recorder.errors.values()),
+        "throughput_rps": round(requests / elapsed, 3),
+        "preview_fps": round(frames / elapsed, 3),
+        "latency_ms": _percentiles_ms(all_requests),
+        "operations": {
+            op: {
+                "count": len(recorder.latencies.get(op, [])),
+                "errors": recorder.errors.get(op, 0),
+                "latency_ms": _percentiles_ms(recorder.latencies.get(op, [])),
+            }
+            for op in sorted(recorder.latencies.keys() | recorder.errors.keys())
+        },
+        "event_loop_lag_ms": _percentiles_ms(lag),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parents[2],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(report: dict, baseline: dict) -> list[str]:
+    """Regressions of `report` against `baseline`, for the steps both have."""
+    previous = {(s["scenario"], s["concurrency"]): s for s in baseline["steps"]}
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('commit')}:")
+    for key in ("db_mode", "users", "duration", "preview_variant", "fake_latencies", "cpu_count"):
+        if report["meta"].get(key) != baseline["meta"].get(key):
+            print(f"Warning: runs differ in {key}, results may not be comparable")
+    print(f"{'scenario':>14} {'conc':>5} {'rps':>10} {'Δ rps':>8} {'p95 ms':>10} {'Δ p95':>8}")
+    for step in report["steps"]:
+        before = previous.get((step["scenario"], step["concurrency"]))
+        if before is None or step["latency_ms"] is None or before["latency_ms"] is None:
+            continue
+        rps_delta = step["throughput_rps"] / before["throughput_rps"] - 1 if before["throughput_rps"] > 0 else 0.0
+        p95_delta = step["latency_ms"]["p95"] / before["latency_ms"]["p95"] - 1 if before["latency_ms"]["p95"] else 0.0
+        flag = ""
+        if rps_delta < -REGRESSION_TOLERANCE or p95_delta > REGRESSION_TOLERANCE:
+            flag = "  REGRESSION"
+            regressions.append(f"{step['scenario']} x{step['concurrency']}")
+        print(f"{step['scenario']:>14} {step['concurrency']:>5} {step['throughput_rps']:>10.2f} "
+              f"{rps_delta:>+8.1%} {step['latency_ms']['p95']:>10.1f} {p95_delta:>+8.1%}{flag}")
+    return regressions
+
+
+def bench(
+    concurrency: str = "1,4,16",
+    duration: float = 10.0,
+    scenarios: str = ",".join(SCENARIOS),
+    users: int = 20,
+    db_mode: str = "host",
+    preview_variant: str = "thumbnail",
+    output: str = "bench-report.json",
+    baseline: str = "",
+    seed: int = 0,
+) -> None:
+    """
+    Sweep `scenarios` over `concurrency` levels, `users` being enrolled beforehand, and write the JSON report to
+    `output`. Fails if `baseline` is the report of another run and throughput or p95 latency regressed.
+    """
+    levels = [int(c) for c in concurrency.split(",")]
+    selected = [s.strip() for s in scenarios.split(",")]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    work_dir = Path(tempfile.mkdtemp(prefix="rsid-bench-"))
+    # Settings are read on import: configure the fake backend first
+    os.environ.update({
+        "rsid_backend": "fake",
+        "rsid_fake_seed": str(seed),
+        "db_mode": db_mode,
+        "db_file": str(work_dir / "vectors.db"),
+        "auto_detect": "False",
+        "com_port": "FAKE",
+        "logging_level": "30",
+    })
+    from rsid_rest.main import app
+    from rsid_rest.rsid_lib import fake_rsid_py
+
+    device_latencies = dict(fake_rsid_py.device.latencies)
+    report = {
+        "version": REPORT_VERSION,
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "db_mode": db_mode,
+            "users": users,
+            "duration": duration,
+            "preview_variant": preview_variant,
+            "fake_latencies": device_latencies,
+        },
+        "steps": [],
+    }
+
+    with _InProcessServer(app) as server:
+        # Enroll the gallery without the capture latencies, authentications then recognize these users
+        fake_rsid_py.device.configure(latencies={"enroll": 0.0, "extract_faceprints_for_enroll": 0.0})
+        with httpx.Client(base_url=server.url, timeout=60) as client:
+            for i in range(users):
+                client.post("/v1/users/enroll/", params={"user_id": f"user-{i}"}).raise_for_status()
+        # Users enrolled by the scenarios are deleted again: keep presenting the gallery only
+        gallery = sorted(fake_rsid_py.device.users) + fake_rsid_py.device.enrolled_faces
+        fake_rsid_py.device.configure(latencies=device_latencies, faces=gallery)
+
+        print(f"{'scenario':>14} {'conc':>5} {'rps':>10} {'fps':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} "
+              f"{'lag p99':>8} {'errors':>7}")
+        for scenario in selected:
+            for level in levels:
+                lag, lag_samples = server.measure_loop_lag()
+                started_at = time.perf_counter()
+                recorder = asyncio.run(_run_step(server.url, scenario, level, duration, preview_variant, seed))
+                elapsed = time.perf_counter() - started_at
+                lag.cancel()
+                step = _step_report(scenario, level, elapsed, recorder, list(lag_samples))
+                report["steps"].append(step)
+                latency = step["latency_ms"] or {"p50": float("nan"), "p95": float("nan"), "p99": float("nan")}
+                loop_lag = step["event_loop_lag_ms"] or {"p99": float("nan")}
+                print(f"{scenario:>14} {level:>5} {step['throughput_rps']:>10.2f} {step['preview_fps']:>8.1f} "
+                      f"{latency['p50']:>10.1f} {latency['p95']:>10.1f} {latency['p99']:>10.1f} "
+                      f"{loop_lag['p99']:>8.1f} {step['errors']:>7}")
+
+    Path(output).write_text(json.dumps(report, indent=2))
+    print(f"Report written to {output}")
+
+    if baseline:
+        regressions = _compare(report, json.loads(Path(baseline).read_text()))
+        if regressions:
+            print(f"Regressions beyond {REGRESSION_TOLERANCE:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import random
+import time
+import uuid
+
+from rsid_rest.rsid_lib.matcher_pool import MatcherPool
+
+FAKE_MATCH_COST_SECONDS = 20e-6
+
+
+class FakeMatchResult:
+    def __init__(self, success: bool, score: int):
+        self.success = success
+        self.should_update = False
+        self.score = score
+
+
+class FakeMatcher:
+    """Burns a fixed amount of CPU per match, like the SDK matcher does, without needing the SDK matcher."""
+
+    def match_faceprints(self, new_faceprints, existing_faceprints, updated_faceprints):
+        deadline = time.perf_counter() + FAKE_MATCH_COST_SECONDS
+        while time.perf_counter() < deadline:
+            pass
+        score = existing_faceprints.enroll_descriptor[0]
+        return FakeMatchResult(success=score > 4000, score=score)
+
+
+def fake_matcher_factory():
+    return FakeMatcher()
+
+
+def _gallery(size: int) -> list[dict]:
+    rnd = random.Random(0)
+    records = []
+    for i in range(size):
+        descriptor = [rnd.randint(-100, 100) for _ in range(515)]
+        descriptor[0] = 4096 if i == size // 2 else rnd.randint(0, 4000)
+        records.append(
+            {
+                "point_id": str(uuid.UUID(int=i)),
+                "user_id": f"user_{i}",
+                "flags": 0,
+                "version": 9,
+                "features_type": 0,
+                "adaptive_descriptor_nomask": descriptor,
+                "adaptive_descriptor_withmask": descriptor,
+                "enroll_descriptor": descriptor,
+            }
+        )
+    return records
+
+
+async def _run(workers: int, gallery: list[dict], requests: int, concurrency: int) -> float:
+    pool = MatcherPool(workers=workers, matcher_factory=fake_matcher_factory)
+    try:
+        await pool.load(gallery)
+        extracted = {"flags": 0, "version": 9, "features_type": 0, "features": [0] * 515}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                result = await pool.match(extracted)
+                assert result is not None and result.user_id == f"user_{len(gallery) // 2}"
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return time.perf_counter() - start
+    finally:
+        pool.close()
+
+
+def bench_matcher_pool(
+    gallery_size: int = 5000, requests: int = 40, concurrency: int = 4, max_workers: int | None = None
+) -> None:
+    max_workers = max_workers or os.cpu_count() or 1
+    gallery = _gallery(gallery_size)
+    print(f"Gallery: {gallery_size} faceprints, {requests} requests, concurrency {concurrency}, "
+          f"fake match cost {FAKE_MATCH_COST_SECONDS * 1e6:.0f} us")
+    print(f"{'workers':>8} {'seconds':>10} {'matches/s':>12} {'speedup':>8}")
+    baseline: float | None = None
+    steps = sorted({max_workers, *(2**i for i in range(max_workers.bit_length()) if 2**i <= max_workers)})
+    for workers in steps:
+        elapsed = asyncio.run(_run(workers, gallery, requests, concurrency))
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.3f} {gallery_size * requests / elapsed:>12.0f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    bench_matcher_pool()
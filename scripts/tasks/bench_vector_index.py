@@ -0,0 +1,131 @@
+import time
+from typing import Any
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from rsid_rest.core.config import get_app_settings
+from rsid_rest.rsid_lib.host_db_local_file import (
+    RSID_NUM_OF_RECOGNITION_FEATURES,
+    vector_index_config,
+    vector_search_params,
+)
+
+COLLECTION = "bench_vector_index"
+BATCH_SIZE = 10_000
+
+# Settings overrides to compare, the first one is the baseline
+CONFIGURATIONS: list[dict[str, Any]] = [
+    {},
+    {"host_mode_hnsw_ef": 64},
+    {"host_mode_hnsw_ef": 256},
+    {"host_mode_hnsw_m": 32, "host_mode_hnsw_ef_construct": 200},
+    {"host_mode_quantization": True},
+    {"host_mode_quantization": True, "host_mode_quantization_rescore": False},
+    {"host_mode_vectors_on_disk": True},
+    {"host_mode_vectors_on_disk": True, "host_mode_quantization": True},
+]
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def _users(batch: int, size: int) -> np.ndarray:
+    """
+    Synthetic enrolled faceprints: identities are spread around a few hundred "look-alike" clusters, which is harder
+    for the index than uniformly random vectors.
+    """
+    centers = np.random.default_rng(0).standard_normal((256, RSID_NUM_OF_RECOGNITION_FEATURES), dtype=np.float32)
+    rng = np.random.default_rng(batch + 1)
+    cluster = rng.integers(0, len(centers), size=size)
+    noise = rng.standard_normal((size, RSID_NUM_OF_RECOGNITION_FEATURES), dtype=np.float32)
+    return _normalized(centers[cluster] + 0.8 * noise)
+
+
+def _queries(points: int, count: int) -> np.ndarray:
+    """New captures of enrolled users: their faceprint plus some noise."""
+    rng = np.random.default_rng(2**31)
+    ids = np.sort(rng.integers(0, points, size=count))
+    vectors = np.empty((count, RSID_NUM_OF_RECOGNITION_FEATURES), dtype=np.float32)
+    for batch in np.unique(ids // BATCH_SIZE):
+        in_batch = ids // BATCH_SIZE == batch
+        offset = batch * BATCH_SIZE
+        vectors[in_batch] = _users(batch, min(BATCH_SIZE, points - offset))[ids[in_batch] - offset]
+    return _normalized(vectors + 0.02 * rng.standard_normal(vectors.shape, dtype=np.float32))
+
+
+def _exact_top_k(points: int, queries: np.ndarray, k: int) -> list[set[int]]:
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+    for batch, offset in enumerate(range(0, points, BATCH_SIZE)):
+        vectors = _users(batch, min(BATCH_SIZE, points - offset))
+        scores = np.concatenate([best_scores, queries @ vectors.T], axis=1)
+        batch_ids = np.broadcast_to(np.arange(offset, offset + len(vectors)), (len(queries), len(vectors)))
+        ids = np.concatenate([best_ids, batch_ids], axis=1)
+        top = np.argsort(-scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return [set(row.tolist()) for row in best_ids]
+
+
+def _estimated_ram_mb(points: int, settings) -> float:
+    vector_bytes = 0 if settings.host_mode_vectors_on_disk else RSID_NUM_OF_RECOGNITION_FEATURES * 4
+    if settings.host_mode_quantization:
+        vector_bytes += RSID_NUM_OF_RECOGNITION_FEATURES  # int8 copy, always in RAM
+    graph_bytes = settings.host_mode_hnsw_m * 2 * 4  # Level 0 links dominate
+    return points * (vector_bytes + graph_bytes) / 1024 / 1024
+
+
+def _load(client: QdrantClient, points: int, settings) -> float:
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(COLLECTION, **vector_index_config(settings))
+    start = time.perf_counter()
+    for batch, offset in enumerate(range(0, points, BATCH_SIZE)):
+        vectors = _users(batch, min(BATCH_SIZE, points - offset))
+        client.upload_collection(COLLECTION, vectors=vectors, ids=range(offset, offset + len(vectors)), wait=True)
+    # A server builds the HNSW graph in the background
+    while client.get_collection(COLLECTION).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+    return time.perf_counter() - start
+
+
+def bench_vector_index(
+    sizes: str = "10000,100000,1000000", queries: int = 200, k: int = 10, url: str | None = None
+) -> None:
+    """
+    Recall@K against exact search, QPS and estimated RAM of the vector index configurations in `CONFIGURATIONS`.
+    HNSW and quantization settings are ignored by the local (in-memory) Qdrant, pass `url` to benchmark a server.
+    """
+    client = QdrantClient(url=url) if url else QdrantClient(":memory:")
+    base_settings = get_app_settings()
+    try:
+        for points in (int(size) for size in sizes.split(",")):
+            query_vectors = _queries(points, queries)
+            expected = _exact_top_k(points, query_vectors, k)
+            print(f"\n{points} points, {queries} queries, recall@{k}")
+            print(f"{'configuration':<60} {'recall':>7} {'QPS':>8} {'RAM MB':>8} {'load s':>7}")
+            for overrides in CONFIGURATIONS:
+                settings = base_settings.model_copy(update=overrides)
+                load_seconds = _load(client, points, settings)
+                search_params = vector_search_params(settings)
+                hits = 0
+                start = time.perf_counter()
+                for vector, expected_ids in zip(query_vectors, expected, strict=True):
+                    found = client.query_points(
+                        COLLECTION, query=vector, limit=k, search_params=search_params, with_payload=False
+                    ).points
+                    hits += len(expected_ids & {point.id for point in found})
+                qps = queries / (time.perf_counter() - start)
+                name = ", ".join(f"{key.removeprefix('host_mode_')}={value}" for key, value in overrides.items())
+                print(f"{name or 'baseline':<60} {hits / (queries * k):>7.3f} {qps:>8.0f} "
+                      f"{_estimated_ram_mb(points, settings):>8.0f} {load_seconds:>7.1f}")
+    finally:
+        if client.collection_exists(COLLECTION):
+            client.delete_collection(COLLECTION)
+        client.close()
+
+
+if __name__ == "__main__":
+    bench_vector_index()
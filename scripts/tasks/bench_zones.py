@@ -0,0 +1,88 @@
+import random
+import statistics
+import time
+import uuid
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from rsid_rest.rsid_lib.host_db_local_file import RSID_NUM_OF_RECOGNITION_FEATURES, _zone_filter
+
+COLLECTION = "bench_zones"
+
+
+def _timed_search(client: QdrantClient, vector: np.ndarray, zone: str | None, limit: int) -> tuple[float, list]:
+    start = time.perf_counter()
+    points = client.search(
+        collection_name=COLLECTION,
+        query_vector=vector,
+        query_filter=_zone_filter(zone),
+        limit=limit,
+        search_params=models.SearchParams(hnsw_ef=128, exact=False),
+    )
+    return time.perf_counter() - start, points
+
+
+def bench_zones(
+    users: int = 100_000, zones: int = 50, queries: int = 50, limit: int = 10, url: str | None = None
+) -> None:
+    """
+    Compare unscoped and zone-scoped searches. Uses an in-memory Qdrant unless `url` points to a Qdrant server,
+    which is what should be used to measure latency at 100k users (local mode has no HNSW index).
+    """
+    rnd = random.Random(0)
+    rng = np.random.default_rng(0)
+    client = QdrantClient(url=url) if url else QdrantClient(":memory:")
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(
+        COLLECTION,
+        vectors_config=models.VectorParams(size=RSID_NUM_OF_RECOGNITION_FEATURES, distance=models.Distance.COSINE),
+    )
+    client.create_payload_index(COLLECTION, field_name="groups", field_schema="keyword")
+
+    zone_names = [f"zone_{i}" for i in range(zones)]
+    print(f"Loading {users} users in {zones} zones...")
+    batch = 1000
+    for offset in range(0, users, batch):
+        count = min(batch, users - offset)
+        vectors = rng.standard_normal((count, RSID_NUM_OF_RECOGNITION_FEATURES), dtype=np.float32)
+        points = []
+        for i in range(count):
+            # Most users are admitted in a single zone, some in a couple of them
+            groups = rnd.sample(zone_names, k=1 if rnd.random() < 0.8 else 2)
+            points.append(
+                models.PointStruct(
+                    id=str(uuid.UUID(int=offset + i)),
+                    vector=vectors[i],
+                    payload={"user_id": f"user_{offset + i}", "groups": groups},
+                )
+            )
+        client.upsert(COLLECTION, points=points, wait=True)
+
+    full_times, zone_times, eligible, wasted = [], [], [], []
+    for _ in range(queries):
+        zone = rnd.choice(zone_names)
+        vector = rng.standard_normal(RSID_NUM_OF_RECOGNITION_FEATURES, dtype=np.float32)
+        elapsed, points = _timed_search(client, vector, None, limit)
+        full_times.append(elapsed)
+        # Unscoped candidates outside the zone would have been sent to the matcher for nothing
+        wasted.append(sum(1 for p in points if zone not in p.payload["groups"]))
+        elapsed, _ = _timed_search(client, vector, zone, limit)
+        zone_times.append(elapsed)
+        eligible.append(client.count(COLLECTION, count_filter=_zone_filter(zone), exact=True).count)
+    client.close()
+
+    def ms(values: list[float], q: float) -> float:
+        return statistics.quantiles(values, n=100)[int(q) - 1] * 1000
+
+    print(f"Eligible users per zone: {statistics.mean(eligible):.0f} of {users} "
+          f"({users / statistics.mean(eligible):.1f}x fewer candidates for the device matcher)")
+    print(f"Unscoped top-{limit} candidates outside the zone: {statistics.mean(wasted):.1f} on average")
+    print(f"{'search':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    print(f"{'unscoped':>10} {ms(full_times, 50):>10.2f} {ms(full_times, 95):>10.2f}")
+    print(f"{'zone':>10} {ms(zone_times, 50):>10.2f} {ms(zone_times, 95):>10.2f}")
+
+
+if __name__ == "__main__":
+    bench_zones()
@@ -0,0 +1,83 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+from rsid_rest.core.settings.base import HybridCandidateCutTypes
+from rsid_rest.rsid_lib.candidate_cut import adaptive_candidate_count
+
+MIN_RESULTS = [1, 2, 3]
+RELATIVE_THRESHOLDS = [0.8, 0.85, 0.9, 0.93, 0.95, 0.97, 0.99]
+
+
+@dataclass
+class _Outcome:
+    settings: dict
+    avg_candidates: float
+    max_candidates: int
+    recall: float
+
+
+def _replay(entries: list[dict], max_results: int, **settings) -> _Outcome:
+    counts = [
+        adaptive_candidate_count(entry["scores"], max_results=max_results, **settings) for entry in entries
+    ]
+    matched = [(entry["matched"], count) for entry, count in zip(entries, counts, strict=True)]
+    matched = [(rank, count) for rank, count in matched if rank is not None]
+    recall = sum(1 for rank, count in matched if rank < count) / len(matched) if len(matched) > 0 else 1.0
+    return _Outcome(
+        settings={key: getattr(value, "value", value) for key, value in settings.items()},
+        avg_candidates=sum(counts) / len(counts),
+        max_candidates=max(counts),
+        recall=recall,
+    )
+
+
+def calibrate_hybrid(log_file: str = "vectors.db.scores.jsonl", max_results: int = 10, target_recall: float = 0.999):
+    """
+    Replay a `host_mode_hybrid_score_log` and suggest adaptive candidate cut settings.
+
+    Only authentications where every candidate was matched tell where the matched user ranked, so record the log
+    with `host_mode_hybrid_cut=none`. Recall is the fraction of logged matches the cut would have kept.
+    """
+    entries = [json.loads(line) for line in Path(log_file).read_text().splitlines() if line.strip()]
+    entries = [entry for entry in entries if len(entry["scores"]) > 0]
+    if len(entries) == 0:
+        print(f"No searches logged in {log_file}")
+        return
+    partial = sum(1 for entry in entries if entry["candidates"] < len(entry["scores"]))
+    print(f"{len(entries)} searches, {sum(1 for e in entries if e['matched'] is not None)} matches")
+    if partial > 0:
+        print(f"Warning: {partial} searches were cut while logging, recall is overestimated")
+
+    outcomes = [_replay(entries, max_results, cut=HybridCandidateCutTypes.none, min_results=1, relative_threshold=1)]
+    for min_results in MIN_RESULTS:
+        outcomes.append(
+            _replay(entries, max_results, cut=HybridCandidateCutTypes.gap, min_results=min_results,
+                    relative_threshold=1)
+        )
+        for threshold in RELATIVE_THRESHOLDS:
+            outcomes.append(
+                _replay(entries, max_results, cut=HybridCandidateCutTypes.relative, min_results=min_results,
+                        relative_threshold=threshold)
+            )
+
+    print(f"{'cut':<10} {'min':>4} {'threshold':>10} {'avg cand.':>10} {'max cand.':>10} {'recall':>8}")
+    for outcome in outcomes:
+        settings = outcome.settings
+        print(f"{settings['cut']:<10} {settings['min_results']:>4} {settings['relative_threshold']:>10} "
+              f"{outcome.avg_candidates:>10.2f} {outcome.max_candidates:>10} {outcome.recall:>8.4f}")
+
+    eligible = [outcome for outcome in outcomes if outcome.recall >= target_recall]
+    if len(eligible) == 0:
+        print(f"No setting reaches a recall of {target_recall}, keep host_mode_hybrid_cut=none")
+        return
+    best = min(eligible, key=lambda outcome: (outcome.avg_candidates, outcome.max_candidates))
+    print(f"\nSuggested (recall >= {target_recall}):")
+    print(f"host_mode_hybrid_cut={best.settings['cut']}")
+    print(f"host_mode_hybrid_min_results={best.settings['min_results']}")
+    if best.settings["cut"] == HybridCandidateCutTypes.relative.value:
+        print(f"host_mode_hybrid_relative_threshold={best.settings['relative_threshold']}")
+
+
+if __name__ == "__main__":
+    calibrate_hybrid()
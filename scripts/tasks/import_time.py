@@ -0,0 +1,66 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)$")
+
+# Imported on first use only: their import time belongs to the first request or the warm-up, not to the start
+LAZY_MODULES = ("cv2", "simplejpeg", "qdrant_client", "nicegui")
+
+
+def _measure(module: str, headless: bool) -> dict[str, tuple[int, int]]:
+    """Module -> (self us, cumulative us) of a fresh `import module`."""
+    env = {**os.environ, "headless": str(headless), "PYTHONPATH": os.pathsep.join(["rsid_rest/rsid_lib", "."])}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).resolve().parents[2],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    imports = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match is not None:
+            self_us, cumulative_us, name = match.groups()
+            imports[name] = (int(self_us), int(cumulative_us))
+    return imports
+
+
+def import_time(
+    module: str = "rsid_rest.main", budget_ms: float = 1500.0, runs: int = 3, top: int = 15, headless: bool = True
+) -> None:
+    """
+    Report the import time of `module` (`python -X importtime`, best of `runs`) and the slowest top level packages.
+    Fails if it exceeds `budget_ms` or if one of `LAZY_MODULES` is imported, to be run in CI.
+    """
+    best: dict[str, tuple[int, int]] | None = None
+    for _ in range(runs):
+        imports = _measure(module, headless)
+        if best is None or imports[module][1] < best[module][1]:
+            best = imports
+    total_ms = best[module][1] / 1000
+
+    # Self time of all the modules of each top level package: the package totals add up to the import time
+    packages: dict[str, int] = {}
+    for name, (self_us, _) in best.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"import {module} (headless={headless}): {total_ms:.0f} ms, budget {budget_ms:.0f} ms")
+    print(f"{'package':>30} {'ms':>8}")
+    for package, self_us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top]:
+        print(f"{package:>30} {self_us / 1000:>8.1f}")
+
+    failures = []
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.0f} ms over the {budget_ms:.0f} ms budget")
+    eager = [m for m in LAZY_MODULES if m in best and not (m == "nicegui" and not headless)]
+    if len(eager) > 0:
+        failures.append(f"imported at start, should be imported on first use: {', '.join(eager)}")
+    if len(failures) > 0:
+        print("\n".join(["", *failures]))
+        sys.exit(1)
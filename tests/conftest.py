@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+# The settings are read once, on first use: configure the app before importing it
+_DB_DIR = Path(tempfile.mkdtemp(prefix="rsid-tests-"))
+os.environ.update(
+    {
+        "app_env": "test",
+        "rsid_backend": "fake",
+        "headless": "True",
+        "auto_detect": "False",
+        "com_port": "fake",
+        "db_mode": "host",
+        "db_file": str(_DB_DIR / "vectors.db"),
+        "warmup_steps": "[]",
+        "loop_monitor": "False",
+        "host_mode_maintenance": "False",
+        "logging_level": "30",
+    }
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from rsid_rest.core.config import get_app_settings  # noqa: E402
+from rsid_rest.core.settings.base import ApplicationDBTypes  # noqa: E402
+from rsid_rest.main import app  # noqa: E402
+from rsid_rest.rsid_lib.fake_rsid_py import DEFAULT_LATENCIES, device  # noqa: E402
+from rsid_rest.rsid_lib.rsid_api_wrapper import RSIDApiWrapper  # noqa: E402
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def fake_device():
+    """The fake module without latencies, no users and no scripted outcome."""
+    device.reset()
+    if RSIDApiWrapper._instance is not None:
+        RSIDApiWrapper().device_cache.invalidate()  # Config and info of the previous test's device
+    device.configure(latencies=dict.fromkeys(DEFAULT_LATENCIES, 0.0))
+    yield device
+    device.reset()
+
+
+@pytest.fixture
+def api(client) -> RSIDApiWrapper:
+    """The wrapper of the running app, with an empty host DB and empty caches."""
+    api = RSIDApiWrapper()
+    client.portal.call(api.remove_all_host_users)
+    return api
+
+
+@pytest.fixture
+def device_mode(monkeypatch):
+    monkeypatch.setattr(get_app_settings(), "db_mode", ApplicationDBTypes.device)
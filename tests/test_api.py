@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from rsid_rest.rsid_lib.fake_rsid_py import AuthenticateStatus, EnrollStatus
+
+
+@pytest.fixture(autouse=True)
+def empty_db(api):
+    return api
+
+
+def enroll(client, fake_device, user_id: str, **params):
+    fake_device.present(user_id)
+    return client.post("/v1/users/enroll/", params={"user_id": user_id, **params})
+
+
+def test_enroll_and_auth(client, fake_device):
+    assert enroll(client, fake_device, "alice").status_code == 201
+    assert enroll(client, fake_device, "bob").status_code == 201
+
+    fake_device.present("bob")
+    response = client.get("/v1/auth/")
+    assert response.status_code == 200
+    assert response.json()["user_id"] == "bob"
+    assert response.json()["status"] == "AuthenticateStatus.Success"
+
+
+def test_auth_unknown_face(client, fake_device):
+    enroll(client, fake_device, "alice")
+
+    fake_device.present("mallory")
+    response = client.get("/v1/auth/")
+    assert response.status_code == 406
+    assert response.json()["user_id"] is None
+
+
+def test_auth_scripted_failure(client, fake_device):
+    enroll(client, fake_device, "alice")
+
+    fake_device.script("extract_faceprints_for_auth", AuthenticateStatus.Spoof)
+    response = client.get("/v1/auth/")
+    assert response.status_code == 406
+    assert response.json()["status"] == "AuthenticateStatus.Spoof"
+
+
+def test_auth_zone(client, fake_device):
+    enroll(client, fake_device, "alice", groups=["lobby"])
+    enroll(client, fake_device, "bob", groups=["lab"])
+
+    fake_device.present("alice")
+    assert client.get("/v1/auth/", params={"zone": "lobby"}).json()["user_id"] == "alice"
+    fake_device.present("alice")
+    assert client.get("/v1/auth/", params={"zone": "lab"}).status_code == 406
+
+
+def test_enroll_failure(client, fake_device):
+    fake_device.script("extract_faceprints_for_enroll", EnrollStatus.NoFaceDetected)
+    response = client.post("/v1/users/enroll/", params={"user_id": "alice"})
+    assert response.status_code == 406
+    assert client.get("/v1/users/").json()["users"] == []
+
+
+def test_users(client, fake_device):
+    for user_id in ["alice", "bob", "carol"]:
+        enroll(client, fake_device, user_id)
+    assert sorted(client.get("/v1/users/").json()["users"]) == ["alice", "bob", "carol"]
+
+    assert client.delete("/v1/users/bob").status_code == 200
+    assert sorted(client.get("/v1/users/").json()["users"]) == ["alice", "carol"]
+
+    response = client.post("/v1/users/bulk-delete", json={"user_ids": ["alice", "nobody"]})
+    assert response.json()["deleted"] == ["alice"]
+    assert response.json()["not_found"] == ["nobody"]
+
+    assert client.delete("/v1/users/clear-all/").status_code == 200
+    assert client.get("/v1/users/").json()["users"] == []
+
+
+def test_device_mode(client, fake_device, device_mode):
+    fake_device.present("alice")
+    assert client.post("/v1/users/enroll/", params={"user_id": "alice"}).status_code == 201
+    assert client.get("/v1/users/").json()["users"] == ["alice"]
+
+    fake_device.present("alice")
+    assert client.get("/v1/auth/").json()["user_id"] == "alice"
+    assert client.get("/v1/auth/", params={"zone": "lobby"}).status_code == 422
+    assert client.post("/v1/users/bulk-delete", json={"user_ids": ["alice"]}).status_code == 422
+
+    assert client.delete("/v1/users/alice").status_code == 200
+    assert client.get("/v1/users/").json()["users"] == []
+
+
+def test_device_config(client):
+    config = client.get("/v1/device/device-config/").json()["config"]
+    assert config["camera_rotation"] == "CameraRotation.Rotation_0_Deg"
+
+    config["camera_rotation"] = "CameraRotation.Rotation_180_Deg"
+    response = client.put("/v1/device/device-config/", json=config)
+    assert response.status_code == 200
+    assert response.json()["config"]["camera_rotation"] == "CameraRotation.Rotation_180_Deg"
+    # The cached config is dropped on update
+    assert client.get("/v1/device/device-config/").json()["config"]["camera_rotation"] == (
+        "CameraRotation.Rotation_180_Deg"
+    )
+
+
+def test_device_info(client):
+    response = client.get("/v1/device/device-info/")
+    assert response.status_code == 200
+    assert response.json()["serial_number"] == "FAKE00001"
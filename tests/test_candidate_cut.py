@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+
+import pytest
+
+from rsid_rest.core.settings.base import HybridCandidateCutTypes
+from rsid_rest.rsid_lib.candidate_cut import HybridScoreLog, adaptive_candidate_count
+
+SCORES = [0.95, 0.93, 0.91, 0.60, 0.58, 0.40, 0.39, 0.38]
+
+
+def count(scores, cut, min_results=1, max_results=10, relative_threshold=0.9) -> int:
+    return adaptive_candidate_count(scores, HybridCandidateCutTypes(cut), min_results, max_results, relative_threshold)
+
+
+def test_none():
+    assert count(SCORES, "none") == len(SCORES)
+    assert count(SCORES, "none", max_results=5) == 5
+
+
+def test_gap():
+    # The largest drop is after the third candidate
+    assert count(SCORES, "gap") == 3
+    # Only the drops after min_results are considered
+    assert count(SCORES, "gap", min_results=4) == 5
+    assert count(SCORES, "gap", max_results=2) == 1
+
+
+def test_relative():
+    assert count(SCORES, "relative") == 3
+    assert count(SCORES, "relative", relative_threshold=0.5) == 5
+    assert count(SCORES, "relative", min_results=4) == 4
+
+
+@pytest.mark.parametrize("cut", list(HybridCandidateCutTypes))
+def test_bounds(cut):
+    assert count([], cut.value) == 0
+    assert count([0.9], cut.value) == 1
+    # Flat scores: no gap to cut at, all within the relative threshold
+    assert count([0.5] * 20, cut.value, max_results=10) == 10
+
+
+def test_score_log(tmp_path):
+    log = HybridScoreLog(tmp_path / "scores.jsonl")
+    log.write([0.9, 0.5], candidates=1, matched_rank=0)
+    log.write([0.4], candidates=1, matched_rank=None)
+    log.stop()
+
+    lines = [json.loads(line) for line in (tmp_path / "scores.jsonl").read_text().splitlines()]
+    assert [(line["scores"], line["candidates"], line["matched"]) for line in lines] == [
+        ([0.9, 0.5], 1, 0),
+        ([0.4], 1, None),
+    ]
+    assert log.dropped == 0
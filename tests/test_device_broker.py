@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+from rsid_rest.core.config import get_app_settings
+from rsid_rest.rsid_lib import device_broker
+from rsid_rest.rsid_lib.device_broker import BrokerClient
+from rsid_rest.rsid_lib.fake_rsid_py import DEFAULT_LATENCIES
+from rsid_rest.rsid_lib.gen.models import AuthenticateStatusEnum
+from rsid_rest.rsid_lib.rsid_api_wrapper import RSIDApiWrapper
+
+AUTHKEY = "test-broker-authkey-0123456789"
+
+
+@pytest.fixture(scope="module")
+def broker(tmp_path_factory):
+    socket = tmp_path_factory.mktemp("broker") / "broker.sock"
+    env = {
+        **os.environ,
+        "db_mode": "device",
+        "device_broker_socket": str(socket),
+        "device_broker_authkey": AUTHKEY,
+        "preview_shm_name": f"rsid_test_{os.getpid()}",
+        "rsid_fake_latencies": json.dumps(dict.fromkeys(DEFAULT_LATENCIES, 0.0)),
+    }
+    process = subprocess.Popen([sys.executable, "-m", "rsid_rest.rsid_lib.device_broker"], env=env)
+    deadline = time.monotonic() + 30
+    while not socket.exists():
+        assert process.poll() is None and time.monotonic() < deadline, "the device broker didn't start"
+        time.sleep(0.1)
+    yield BrokerClient(str(socket), AUTHKEY.encode())
+    process.send_signal(signal.SIGINT)  # Closes the preview ring
+    process.wait(timeout=10)
+
+
+@pytest.mark.parametrize("authkey", [None, "short"])
+def test_authkey_required(monkeypatch, authkey):
+    monkeypatch.setattr(get_app_settings(), "device_broker_authkey", authkey)
+    with pytest.raises(RuntimeError, match="Misconfigured"):
+        device_broker._authkey()
+
+
+def test_wrong_authkey(broker):
+    with pytest.raises(AuthenticationError):
+        Client(broker.address, authkey=b"not-the-broker-authkey")
+
+
+def test_device_queries(broker):
+    assert broker.query_device_info().serial_number == "FAKE00001"
+    config = broker.query_device_config()
+    assert broker.update_device_config(config) == config
+    assert broker.query_device_queue_depth() == 0
+
+
+async def test_enroll_and_extract(broker):
+    assert (await broker.enroll(user_id="alice")).user_id == "alice"
+    assert await broker.query_users() == ["alice"]
+
+    status, extracted, faces = await broker.extract_faceprints_for_auth()
+    assert status == AuthenticateStatusEnum.Success
+    # Faceprints cross the socket with their SDK type
+    assert type(extracted).__name__ == "ExtractedFaceprintsElement"
+    assert len(extracted.features) == 515
+    assert len(faces) == 1
+
+    await broker.remove_user(user_id="alice")
+    assert await broker.query_users() == []
+
+
+def test_errors_cross_the_socket(broker):
+    with pytest.raises(AttributeError, match="no method"):
+        broker._call("startup", (), {})
+
+
+def test_other_attributes_are_local(broker):
+    # The host DB and matching run in the worker
+    assert broker.query_host_users == RSIDApiWrapper().query_host_users
+    assert "query_host_users" not in device_broker.BROKER_METHODS
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rsid_rest.rsid_lib import device_query_cache
+from rsid_rest.rsid_lib.device_query_cache import DeviceQueryCache
+
+
+class Query:
+    """A device query blocking until released, counting its calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = False
+
+    def __call__(self) -> int:
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(timeout=10)
+        if self.fail:
+            raise OSError("device gone")
+        return self.calls
+
+
+def test_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(device_query_cache.time, "monotonic", lambda: now[0])
+    cache = DeviceQueryCache(ttl=60)
+    query = Query()
+    query.release.set()
+    assert cache.get("info", query) == 1
+    assert cache.get("info", query) == 1
+    assert cache.get("info", query, refresh=True) == 2
+    now[0] += 60
+    assert cache.get("info", query) == 3
+
+
+def test_disabled():
+    cache = DeviceQueryCache(ttl=0)
+    query = Query()
+    query.release.set()
+    cache.put("info", 0)
+    assert [cache.get("info", query) for _ in range(2)] == [1, 2]
+
+
+def test_single_flight():
+    cache = DeviceQueryCache(ttl=60)
+    query = Query()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(cache.get, "info", query)
+        assert query.started.wait(timeout=10)
+        followers = [executor.submit(cache.get, "info", query) for _ in range(3)]
+        query.release.set()
+        assert [f.result(timeout=10) for f in [leader, *followers]] == [1, 1, 1, 1]
+    assert query.calls == 1
+
+
+def test_single_flight_error():
+    cache = DeviceQueryCache(ttl=60)
+    query = Query()
+    query.fail = True
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(cache.get, "info", query)
+        assert query.started.wait(timeout=10)
+        follower = executor.submit(cache.get, "info", query)
+        query.release.set()
+        for future in (leader, follower):
+            with pytest.raises(OSError):
+                future.result(timeout=10)
+    # Errors are not cached
+    query.fail = False
+    assert cache.get("info", query) == 2
+
+
+def test_invalidated_during_flight():
+    cache = DeviceQueryCache(ttl=60)
+    query = Query()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(cache.get, "config", query)
+        assert query.started.wait(timeout=10)
+        # E.g. the config is updated while it's being read: the result may predate the update
+        cache.invalidate()
+        query.release.set()
+        assert leader.result(timeout=10) == 1
+    assert cache.get("config", query) == 2
+    assert cache.get("config", query) == 2
+
+
+def test_device_info_is_cached(client, fake_device):
+    serial_number = client.get("/v1/device/device-info/").json()["serial_number"]
+    fake_device.serial_number = "FAKE00002"
+    assert client.get("/v1/device/device-info/").json()["serial_number"] == serial_number
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+from prometheus_client import REGISTRY
+
+from rsid_rest.rsid_lib.faceprints_cache import FACEPRINTS_ENTRY_BYTES, FaceprintsCache, FaceprintsCacheStats
+from rsid_rest.rsid_lib.fake_rsid_py import synthetic_features
+
+
+def record(point_id: str, identity: str, updated_at: str | None = None) -> dict:
+    features = synthetic_features(identity)
+    return {
+        "point_id": point_id,
+        "user_id": identity,
+        "created_at": "2024-01-01T00:00:00",
+        "updated_at": updated_at,
+        "flags": 0,
+        "version": 9,
+        "features_type": 0,
+        "adaptive_descriptor_nomask": features,
+        "adaptive_descriptor_withmask": [0] * len(features),
+        "enroll_descriptor": features,
+    }
+
+
+def lookups(result: str) -> float:
+    return REGISTRY.get_sample_value("rsid_faceprints_cache_lookups_total", {"result": result}) or 0.0
+
+
+def test_hit_on_same_revision():
+    cache = FaceprintsCache(max_mb=1)
+    hits = lookups("hit")
+    first = cache.get(record("1", "alice"))
+    request_stats = FaceprintsCacheStats()
+    assert cache.get(record("1", "alice"), request_stats) is first
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert (request_stats.hits, request_stats.misses) == (1, 0)
+    assert lookups("hit") == hits + 1
+    assert REGISTRY.get_sample_value("rsid_faceprints_cache_entries") == 1
+
+
+def test_new_revision_is_a_miss():
+    cache = FaceprintsCache(max_mb=1)
+    first = cache.get(record("1", "alice"))
+    updated = cache.get(record("1", "bob", updated_at="2024-01-02T00:00:00"))
+    assert updated is not first
+    assert updated.adaptive_descriptor_nomask == synthetic_features("bob")
+    assert (cache.stats.hits, cache.stats.misses) == (0, 2)
+    # The new revision replaced the old one
+    assert cache.get(record("1", "bob", updated_at="2024-01-02T00:00:00")) is updated
+    assert len(cache) == 1
+
+
+def test_invalidate_and_clear():
+    cache = FaceprintsCache(max_mb=1)
+    first = cache.get(record("1", "alice"))
+    cache.get(record("2", "bob"))
+    cache.invalidate("1")
+    assert cache.get(record("1", "alice")) is not first
+    cache.clear()
+    assert len(cache) == 0
+    assert REGISTRY.get_sample_value("rsid_faceprints_cache_entries") == 0
+
+
+def test_lru_bound():
+    cache = FaceprintsCache(max_mb=1)
+    cache.max_entries = 2
+    cache.get(record("1", "alice"))
+    cache.get(record("2", "bob"))
+    cache.get(record("1", "alice"))  # Most recently used
+    cache.get(record("3", "carol"))
+    assert len(cache) == 2
+    misses = cache.stats.misses
+    cache.get(record("1", "alice"))
+    assert cache.stats.misses == misses
+    cache.get(record("2", "bob"))
+    assert cache.stats.misses == misses + 1
+
+
+def test_disabled():
+    cache = FaceprintsCache(max_mb=0)
+    assert not cache.enabled
+    cache.get(record("1", "alice"))
+    cache.get(record("1", "alice"))
+    assert len(cache) == 0
+    assert cache.stats.misses == 2
+    assert FaceprintsCache(max_mb=1).max_entries == 1024 * 1024 // FACEPRINTS_ENTRY_BYTES
+
+
+def test_match_counts(tmp_path):
+    cache = FaceprintsCache(max_mb=1)
+    for user_id in ["alice", "bob", "bob", "carol", "carol", "carol"]:
+        cache.note_match(user_id)
+    cache.forget_user("alice")
+    assert cache.most_matched(2) == ["carol", "bob"]
+
+    cache.save_match_counts(tmp_path / "hits.json", keep=1)
+    loaded = FaceprintsCache(max_mb=1)
+    loaded.load_match_counts(tmp_path / "hits.json")
+    assert loaded.most_matched(10) == ["carol"]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import datetime
+
+import pytest
+
+from rsid_rest.rsid_lib.maintenance import MaintenanceScheduler
+
+
+@pytest.fixture
+def scheduler(client, api, fake_device) -> MaintenanceScheduler:
+    for user_id in ("alice", "bob", "carol"):
+        fake_device.present(user_id)
+        client.post("/v1/users/enroll/", params={"user_id": user_id})
+    client.delete("/v1/users/bob")
+    # The whole day is quiet hours and the DB is idle right away
+    return MaintenanceScheduler(api.db, window="00:00-00:00", idle_seconds=0, min_fragmentation=0)
+
+
+def test_window():
+    scheduler = MaintenanceScheduler(None, window="22:00-02:00", idle_seconds=0, min_fragmentation=0)
+    assert scheduler.current_window(datetime.datetime(2024, 1, 2, 1, 0)) == datetime.datetime(2024, 1, 1, 22, 0)
+    assert scheduler.current_window(datetime.datetime(2024, 1, 2, 12, 0)) is None
+
+
+def test_compact(client, scheduler):
+    assert client.portal.call(scheduler.run_once) is True
+    assert scheduler.last_report.compacted > 0
+    # Users are still there
+    assert sorted(client.get("/v1/users/").json()["users"]) == ["alice", "carol"]
+
+
+def test_activity_during_compaction_skips_the_swap(client, scheduler, monkeypatch):
+    db = scheduler._db
+    compact_storage = db.compact_storage
+    versions = []
+
+    def compact_storage_during_auth(storage_file, attempts=3, should_swap=None):
+        scheduler.note_activity()  # An authentication while the copy is written
+        versions.append(storage_file.stat().st_mtime_ns)
+        return compact_storage(storage_file, attempts, should_swap)
+
+    monkeypatch.setattr(db, "compact_storage", compact_storage_during_auth)
+    assert client.portal.call(scheduler.run_once) is True
+    assert scheduler.last_report.compacted == 0
+    assert versions == [f.stat().st_mtime_ns for f in db.storage_fragmentation()]
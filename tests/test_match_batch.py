@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from rsid_rest.core.config import get_app_settings
+from rsid_rest.core.settings.base import HostModeAuthTypes
+from rsid_rest.rsid_lib.fake_rsid_py import synthetic_features
+
+
+@pytest.fixture
+def enrolled(client, api, fake_device):
+    for user_id, groups in [("alice", ["lobby"]), ("bob", ["lab"]), ("carol", [])]:
+        fake_device.present(user_id)
+        client.post("/v1/users/enroll/", params={"user_id": user_id, "groups": groups})
+    return api
+
+
+@pytest.fixture
+def searched(enrolled, monkeypatch) -> list[int]:
+    """Number of items of each vector search batch."""
+    batches = []
+    search = enrolled.db.get_faceprints_batch
+
+    async def get_faceprints_batch(items, zone=None):
+        batches.append(len(items))
+        return await search(items, zone)
+
+    monkeypatch.setattr(enrolled.db, "get_faceprints_batch", get_faceprints_batch)
+    return batches
+
+
+def item(item_id: str, identity: str) -> dict:
+    return {"id": item_id, "features": synthetic_features(identity, noise=10, seed=int(item_id))}
+
+
+def match(client, *items: dict, zone: str | None = None) -> list[tuple[str, str | None]]:
+    response = client.post("/v1/match/batch", json={"items": list(items), "zone": zone})
+    assert response.status_code == 200
+    return [(result["id"], result["user_id"]) for result in response.json()["results"]]
+
+
+def test_batch(client, enrolled, searched):
+    results = match(client, item("1", "alice"), item("2", "mallory"), item("3", "carol"), item("4", "bob"))
+    assert results == [("1", "alice"), ("2", None), ("3", "carol"), ("4", "bob")]
+    assert searched == [4]
+
+
+def test_recent_matches_first(client, enrolled, searched):
+    match(client, item("1", "alice"))
+    hits = enrolled.recent_matches.hits
+
+    results = match(client, item("2", "alice"), item("3", "bob"), item("4", "alice"))
+    assert results == [("2", "alice"), ("3", "bob"), ("4", "alice")]
+    # Only bob needed the vector search
+    assert searched == [1, 1]
+    assert enrolled.recent_matches.hits == hits + 2
+
+
+def test_zone(client, enrolled):
+    match(client, item("1", "alice"))
+    results = match(client, item("2", "alice"), item("3", "bob"), zone="lab")
+    assert results == [("2", None), ("3", "bob")]
+
+
+def test_full_scan(client, enrolled, searched, monkeypatch):
+    monkeypatch.setattr(get_app_settings(), "host_mode_auth_type", HostModeAuthTypes.device)
+    assert match(client, item("1", "carol"), item("2", "mallory")) == [("1", "carol"), ("2", None)]
+    assert searched == []
+
+
+def test_device_db_mode(client, enrolled, device_mode):
+    assert client.post("/v1/match/batch", json={"items": [item("1", "alice")]}).status_code == 422
+
+
+def test_validation(client, enrolled):
+    assert client.post("/v1/match/batch", json={"items": []}).status_code == 422
+    assert client.post("/v1/match/batch", json={"items": [{"id": "1", "features": [1]}]}).status_code == 422
+
+
+def test_updates_written_in_one_batch(client, enrolled, monkeypatch):
+    monkeypatch.setattr(enrolled, "write_behind", None)
+    monkeypatch.setattr(enrolled, "recent_matches", None)
+    batches = []
+    update_faceprints_batch = enrolled.db.update_faceprints_batch
+
+    async def counted_update_faceprints_batch(updates):
+        batches.append(sorted(updates))
+        return await update_faceprints_batch(updates)
+
+    async def update_faceprints(user_id, faceprints):
+        raise AssertionError("updates are batched")
+
+    monkeypatch.setattr(enrolled.db, "update_faceprints_batch", counted_update_faceprints_batch)
+    monkeypatch.setattr(enrolled.db, "update_faceprints", update_faceprints)
+    results = match(client, item("1", "alice"), item("2", "bob"), item("3", "alice"))
+    assert results == [("1", "alice"), ("2", "bob"), ("3", "alice")]
+    assert batches == [["alice", "bob"]]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from rsid_rest.rsid_lib.fake_rsid_py import synthetic_features
+from rsid_rest.rsid_lib.matcher_pool import MatcherPool, MatcherWorkerDied
+
+USERS = ["alice", "bob", "carol", "dave", "erin", "frank", "grace"]
+
+
+def record(point_id: str, user_id: str, identity: str | None = None, groups: list[str] | None = None) -> dict:
+    features = synthetic_features(identity or user_id)
+    return {
+        "point_id": point_id,
+        "user_id": user_id,
+        "groups": groups or [],
+        "flags": 0,
+        "version": 9,
+        "features_type": 0,
+        "adaptive_descriptor_nomask": features,
+        "adaptive_descriptor_withmask": [0] * len(features),
+        "enroll_descriptor": features,
+    }
+
+
+def extracted(identity: str, noise: int = 10) -> dict:
+    return {"flags": 0, "version": 9, "features_type": 0, "features": synthetic_features(identity, noise, seed=1)}
+
+
+@pytest.fixture
+async def pool():
+    pool = MatcherPool(workers=3)
+    await pool.load([record(str(i), user_id, groups=["even" if i % 2 == 0 else "odd"])
+                     for i, user_id in enumerate(USERS)])
+    yield pool
+    pool.close()
+
+
+async def test_round_robin_shards(pool):
+    # "update" answers the number of records of the user held by each shard
+    for i, user_id in enumerate(USERS):
+        held = await pool._broadcast(*(("update", user_id, record("", user_id)) for _ in range(pool.size)))
+        assert held == [1 if shard == i % pool.size else 0 for shard in range(pool.size)]
+
+
+async def test_match_every_shard(pool):
+    assert not pool.stale
+    for i, user_id in enumerate(USERS):
+        result = await pool.match(extracted(user_id))
+        assert (result.point_id, result.user_id) == (str(i), user_id)
+    assert await pool.match(extracted("mallory")) is None
+
+
+async def test_match_filters(pool):
+    assert (await pool.match(extracted("bob"), zone="odd")).user_id == "bob"
+    assert await pool.match(extracted("bob"), zone="even") is None
+    assert (await pool.match(extracted("carol"), point_ids=["2", "5"])).user_id == "carol"
+    assert await pool.match(extracted("carol"), point_ids=["0", "1"]) is None
+
+
+async def test_best_result_across_shards():
+    pool = MatcherPool(workers=2)
+    try:
+        # The same user enrolled twice, in two shards: the closest faceprints win
+        await pool.load([record("0", "alice", identity="alice"), record("1", "alice", identity="alice-2")])
+        probe = extracted("alice", noise=0)
+        probe["features"] = [round(0.8 * a + 0.2 * b) for a, b in zip(
+            synthetic_features("alice"), synthetic_features("alice-2"), strict=True
+        )]
+        result = await pool.match(probe)
+        assert result.point_id == "0"
+        assert result.should_update
+    finally:
+        pool.close()
+
+
+async def test_dead_worker_is_respawned(pool):
+    dead = pool._workers[1]
+    dead.process.kill()
+    dead.process.join()
+
+    with pytest.raises(MatcherWorkerDied):
+        await pool.match(extracted("alice"))
+    assert pool.stale
+    assert pool._workers[1] is not dead
+    assert pool._workers[1].process.is_alive()
+
+    # The caller reloads the shards on the next match
+    await pool.load([record(str(i), user_id) for i, user_id in enumerate(USERS)])
+    assert (await pool.match(extracted("bob"))).user_id == "bob"
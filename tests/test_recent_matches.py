@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+from prometheus_client import REGISTRY
+
+from rsid_rest.core.config import get_app_settings
+from rsid_rest.core.settings.base import HostModeAuthTypes
+from rsid_rest.rsid_lib import fake_rsid_py, recent_matches
+from rsid_rest.rsid_lib.fake_rsid_py import Faceprints
+from rsid_rest.rsid_lib.recent_matches import RecentMatchCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(recent_matches.time, "monotonic", clock)
+    return clock
+
+
+def user_ids(entries) -> list[str]:
+    return [entry.user_id for entry in entries]
+
+
+def test_most_recent_first():
+    cache = RecentMatchCache(capacity=10, ttl=60)
+    for user_id in ["alice", "bob", "carol"]:
+        cache.add(user_id, [], Faceprints())
+    cache.add("alice", [], Faceprints())
+    assert user_ids(cache.candidates()) == ["alice", "carol", "bob"]
+
+
+def test_ttl(clock):
+    cache = RecentMatchCache(capacity=10, ttl=60)
+    cache.add("alice", [], Faceprints())
+    clock.now += 30
+    cache.add("bob", [], Faceprints())
+    clock.now += 30
+    assert user_ids(cache.candidates()) == ["bob"]
+    assert len(cache) == 1
+    assert REGISTRY.get_sample_value("rsid_recent_match_entries") == 1
+    # A new match renews the entry
+    cache.add("bob", [], Faceprints())
+    clock.now += 59
+    assert user_ids(cache.candidates()) == ["bob"]
+    clock.now += 1
+    assert cache.candidates() == []
+
+
+def test_capacity():
+    cache = RecentMatchCache(capacity=2, ttl=60)
+    for user_id in ["alice", "bob", "carol"]:
+        cache.add(user_id, [], Faceprints())
+    assert user_ids(cache.candidates()) == ["carol", "bob"]
+
+
+def test_evict_and_clear():
+    cache = RecentMatchCache(capacity=10, ttl=60)
+    cache.add("alice", [], Faceprints())
+    cache.add("bob", [], Faceprints())
+    cache.evict("alice")
+    assert user_ids(cache.candidates()) == ["bob"]
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_hit_ratio():
+    cache = RecentMatchCache(capacity=10, ttl=60)
+    hits = REGISTRY.get_sample_value("rsid_recent_match_lookups_total", {"result": "hit"}) or 0.0
+    assert cache.hit_ratio == 0.0
+    for hit in [True, True, True, False]:
+        cache.record(hit)
+    assert cache.hit_ratio == 0.75
+    assert REGISTRY.get_sample_value("rsid_recent_match_lookups_total", {"result": "hit"}) == hits + 3
+
+
+def test_auth_hits_after_a_match(client, api, fake_device):
+    fake_device.present("alice")
+    client.post("/v1/users/enroll/", params={"user_id": "alice"})
+    hits = api.recent_matches.hits
+
+    fake_device.present("alice", "alice")
+    assert client.get("/v1/auth/").json()["user_id"] == "alice"
+    assert client.get("/v1/auth/").json()["user_id"] == "alice"
+    assert api.recent_matches.hits == hits + 1
+    assert user_ids(api.recent_matches.candidates()) == ["alice"]
+
+
+def test_removed_user_is_evicted(client, api, fake_device):
+    fake_device.present("alice")
+    client.post("/v1/users/enroll/", params={"user_id": "alice"})
+    fake_device.present("alice")
+    client.get("/v1/auth/")
+
+    client.delete("/v1/users/alice")
+    assert api.recent_matches.candidates() == []
+    fake_device.present("alice")
+    assert client.get("/v1/auth/").status_code == 406
+
+
+def test_zone_candidates():
+    cache = RecentMatchCache(capacity=10, ttl=60)
+    cache.add("alice", ["lobby"], Faceprints())
+    cache.add("bob", ["lobby", "lab"], Faceprints())
+    cache.add("carol", [], Faceprints())
+    assert user_ids(cache.candidates("lobby")) == ["bob", "alice"]
+    assert user_ids(cache.candidates("lab")) == ["bob"]
+    assert user_ids(cache.candidates()) == ["carol", "bob", "alice"]
+
+
+@pytest.mark.parametrize("auth_type", list(HostModeAuthTypes))
+def test_recent_match_honours_zone(client, api, fake_device, monkeypatch, auth_type):
+    monkeypatch.setattr(get_app_settings(), "host_mode_auth_type", auth_type)
+    fake_device.present("alice", "bob")
+    client.post("/v1/users/enroll/", params={"user_id": "alice", "groups": ["lobby"]})
+    client.post("/v1/users/enroll/", params={"user_id": "bob", "groups": ["lobby", "lab"]})
+
+    fake_device.present("alice", "alice", "bob")
+    assert client.get("/v1/auth/", params={"zone": "lobby"}).json()["user_id"] == "alice"
+    # Recently matched, but not in the zone: neither the fast path nor the search match her
+    assert client.get("/v1/auth/", params={"zone": "lab"}).status_code == 406
+    assert client.get("/v1/auth/", params={"zone": "lab"}).json()["user_id"] == "bob"
+
+
+def test_miss_is_bounded_by_capacity(client, api, fake_device, monkeypatch):
+    monkeypatch.setattr(api.recent_matches, "capacity", 3)
+    for user_id in ["alice", "bob", "carol", "dave", "erin"]:
+        fake_device.present(user_id, user_id)
+        client.post("/v1/users/enroll/", params={"user_id": user_id})
+        client.get("/v1/auth/")
+    assert len(api.recent_matches) == 3
+
+    calls = []
+    match_faceprints = fake_rsid_py.FaceAuthenticator.match_faceprints
+
+    def counted_match_faceprints(self, *args, **kwargs):
+        calls.append(args)
+        return match_faceprints(self, *args, **kwargs)
+
+    async def no_db_match(extracted_faceprints, zone=None):
+        return None
+
+    monkeypatch.setattr(fake_rsid_py.FaceAuthenticator, "match_faceprints", counted_match_faceprints)
+    monkeypatch.setattr(api, "_match_db", no_db_match)
+    fake_device.present("mallory")
+    assert client.get("/v1/auth/").status_code == 406
+    assert len(calls) == 3
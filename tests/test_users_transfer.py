@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+
+import pytest
+
+from rsid_rest.rsid_lib import faceprints_transfer
+from rsid_rest.rsid_lib.fake_rsid_py import Faceprints
+
+
+@pytest.fixture(autouse=True)
+def empty_db(api):
+    return api
+
+
+def enroll(client, fake_device, *user_ids: str) -> None:
+    for user_id in user_ids:
+        fake_device.present(user_id)
+        assert client.post("/v1/users/enroll/", params={"user_id": user_id}).status_code == 201
+
+
+def users(client) -> list[str]:
+    return sorted(client.get("/v1/users/").json()["users"])
+
+
+def test_bulk_delete_drops_pending_updates(client, api, fake_device):
+    enroll(client, fake_device, "alice", "bob")
+    fake_device.present("alice")
+    client.get("/v1/auth/")
+    api.write_behind.enqueue("alice", Faceprints())
+
+    response = client.post("/v1/users/bulk-delete", json={"user_ids": ["alice", "nobody"]})
+    assert response.json()["deleted"] == ["alice"]
+    assert len(api.write_behind) == 0
+    assert api.recent_matches.candidates() == []
+    # A flush doesn't bring her back
+    client.portal.call(api.write_behind.flush, True)
+    assert users(client) == ["bob"]
+
+
+def test_clear_all(client, api, fake_device):
+    enroll(client, fake_device, "alice", "bob")
+    fake_device.present("bob")
+    client.get("/v1/auth/")
+    api.write_behind.enqueue("bob", Faceprints())
+
+    assert client.delete("/v1/users/clear-all/").status_code == 200
+    assert users(client) == []
+    assert len(api.write_behind) == 0
+    assert len(api.recent_matches) == 0
+    fake_device.present("bob")
+    assert client.get("/v1/auth/").status_code == 406
+
+
+def export(client, export_format: str = "ndjson", **params):
+    response = client.get("/v1/users/export", params={"format": export_format, **params})
+    assert response.status_code == 200
+    return response
+
+
+def ndjson_lines(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.parametrize(
+    "export_format, media_type",
+    [("ndjson", faceprints_transfer.NDJSON_MEDIA_TYPE), ("binary", faceprints_transfer.BINARY_MEDIA_TYPE)],
+)
+def test_round_trip(client, fake_device, export_format, media_type):
+    enroll(client, fake_device, "alice", "bob", "carol")
+    exported = export(client, export_format)
+    assert exported.headers["content-type"].startswith(media_type)
+
+    client.delete("/v1/users/clear-all/")
+    response = client.post("/v1/users/import", content=exported.content, headers={"content-type": media_type})
+    assert response.status_code == 200
+    assert (response.json()["imported"], response.json()["skipped"], response.json()["cursor"]) == (3, 0, None)
+    assert users(client) == ["alice", "bob", "carol"]
+    # The imported faceprints still match
+    fake_device.present("bob")
+    assert client.get("/v1/auth/").json()["user_id"] == "bob"
+
+
+def records(client) -> list[dict]:
+    return [line for line in ndjson_lines(export(client)) if "cursor" not in line]
+
+
+def test_import_dedupe(client, fake_device):
+    enroll(client, fake_device, "alice", "bob")
+    exported = export(client).content
+    headers = {"content-type": faceprints_transfer.NDJSON_MEDIA_TYPE}
+
+    # Re-importing the same records (a resumed import) upserts them
+    client.post("/v1/users/import", content=exported, headers=headers)
+    assert sorted(record["user_id"] for record in records(client)) == ["alice", "bob"]
+
+    # Deduplicated by default: a user already in the DB under another record is kept
+    client.delete("/v1/users/clear-all/")
+    enroll(client, fake_device, "alice")
+    kept = records(client)[0]["point_id"]
+    response = client.post("/v1/users/import", content=exported, headers=headers)
+    assert (response.json()["imported"], response.json()["skipped"]) == (1, 1)
+    assert {record["user_id"]: record["point_id"] for record in records(client)}["alice"] == kept
+
+    response = client.post("/v1/users/import", params={"dedupe": False}, content=exported, headers=headers)
+    assert (response.json()["imported"], response.json()["skipped"]) == (2, 0)
+    assert sorted(record["user_id"] for record in records(client)) == ["alice", "alice", "bob"]
+
+
+def test_export_pages(client, fake_device):
+    enroll(client, fake_device, "alice", "bob", "carol")
+    lines = ndjson_lines(export(client, page_size=2))
+    cursors = [line["cursor"] for line in lines if "cursor" in line]
+    assert len(cursors) == 2 and cursors[-1] is None
+
+    # Resuming from the first cursor exports the rest
+    resumed = ndjson_lines(export(client, cursor=cursors[0], page_size=2))
+    first_page = [line["user_id"] for line in lines[:2]]
+    rest = [line["user_id"] for line in resumed if "cursor" not in line]
+    assert sorted(first_page + rest) == ["alice", "bob", "carol"]
+
+
+def test_transfer_needs_host_mode(client, device_mode):
+    assert client.get("/v1/users/export").status_code == 422
+    assert client.post("/v1/users/import", content=b"").status_code == 422
+    assert client.get("/v1/users/export", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018-2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+
+import pytest
+
+from rsid_rest.rsid_lib.fake_rsid_py import Faceprints, synthetic_features
+from rsid_rest.rsid_lib.write_behind import FaceprintsWriteBehindQueue
+
+
+class FakeDB:
+    def __init__(self):
+        self.batches: list[dict] = []
+        self.fail = False
+
+    async def update_faceprints_batch(self, batch: dict) -> list[str]:
+        if self.fail:
+            raise OSError("DB unavailable")
+        self.batches.append(batch)
+        return []
+
+
+def faceprints(identity: str) -> Faceprints:
+    faceprints = Faceprints()
+    faceprints.adaptive_descriptor_nomask = synthetic_features(identity)
+    return faceprints
+
+
+def queue(db, journal_file, min_interval: float = 0.0, **kwargs) -> FaceprintsWriteBehindQueue:
+    return FaceprintsWriteBehindQueue(
+        db=db, journal_file=journal_file, flush_interval=60, batch_size=2, min_interval=min_interval, **kwargs
+    )
+
+
+@pytest.fixture
+def db():
+    return FakeDB()
+
+
+async def test_coalesce_and_batch(db, tmp_path):
+    q = queue(db, tmp_path / "pending.jsonl")
+    q.start()
+    q.enqueue("alice", faceprints("alice-1"))
+    q.enqueue("alice", faceprints("alice-2"))
+    q.enqueue("bob", faceprints("bob"))
+    q.enqueue("carol", faceprints("carol"))
+    assert len(q) == 3
+    assert q.stats.coalesced == 1
+
+    await q.flush()
+    assert [sorted(batch) for batch in db.batches] == [["alice", "bob"], ["carol"]]
+    # Last write wins
+    assert db.batches[0]["alice"]["adaptive_descriptor_nomask"] == synthetic_features("alice-2")
+    assert (len(q), q.stats.flushed) == (0, 3)
+    await q.stop()
+
+
+async def test_rate_limit(db, tmp_path):
+    q = queue(db, tmp_path / "pending.jsonl", min_interval=300)
+    q.start()
+    q.enqueue("alice", faceprints("alice-1"))
+    await q.flush()
+    q.enqueue("alice", faceprints("alice-2"))
+    await q.flush()
+    assert len(db.batches) == 1
+    assert (len(q), q.stats.rate_limited) == (1, 1)
+
+    # Shutdown persists everything
+    await q.stop()
+    assert db.batches[1]["alice"]["adaptive_descriptor_nomask"] == synthetic_features("alice-2")
+
+
+async def test_discard(db, tmp_path):
+    q = queue(db, tmp_path / "pending.jsonl")
+    q.start()
+    q.enqueue("alice", faceprints("alice"))
+    q.discard("alice")
+    await q.flush()
+    assert db.batches == []
+    await q.stop()
+
+
+async def test_failed_batch_is_kept(db, tmp_path):
+    q = queue(db, tmp_path / "pending.jsonl")
+    q.start()
+    q.enqueue("alice", faceprints("alice"))
+    db.fail = True
+    await q.flush()
+    assert (len(q), q.stats.failed) == (1, 1)
+    db.fail = False
+    await q.flush()
+    assert len(q) == 0
+    await q.stop()
+
+
+async def test_journal_replay(db, tmp_path):
+    journal_file = tmp_path / "pending.jsonl"
+    q = queue(db, journal_file)
+    q.start()
+    q.enqueue("alice", faceprints("alice-1"))
+    q.enqueue("bob", faceprints("bob"))
+    q.enqueue("alice", faceprints("alice-2"))
+    q.enqueue("carol", faceprints("carol"))
+    q.discard("carol")
+    # Journaled as queued, before any flush: a crash now loses nothing
+    assert len(journal_file.read_text().splitlines()) == 5
+    with journal_file.open("a") as f:
+        f.write('{"user_id": "torn"')
+
+    restarted = queue(db, journal_file)
+    restarted.start()
+    assert len(restarted) == 2
+    # The journal is compacted to the pending updates
+    assert sorted(json.loads(line)["user_id"] for line in journal_file.read_text().splitlines()) == ["alice", "bob"]
+    await restarted.flush()
+    assert db.batches[0]["alice"]["adaptive_descriptor_nomask"] == synthetic_features("alice-2")
+    assert journal_file.read_text() == ""
+    await restarted.stop()
+
+
+async def test_adopt_orphan_journals(db, tmp_path):
+    pattern = "vectors.db.pending.*.jsonl"
+    orphan = tmp_path / "vectors.db.pending.1.jsonl"
+    orphan.write_text(json.dumps({"user_id": "alice", "faceprints": {"flags": 0}}) + "\n")
+
+    first = queue(db, tmp_path / "vectors.db.pending.2.jsonl", orphan_journals=pattern)
+    first.start()
+    first.enqueue("bob", faceprints("bob"))
+    assert len(first) == 2
+    assert not orphan.exists()
+
+    # A running queue's journal is locked, not adopted
+    second = queue(db, tmp_path / "vectors.db.pending.3.jsonl", orphan_journals=pattern)
+    second.start()
+    assert len(second) == 0
+
+    await first.stop()
+    await second.stop()
+    assert sorted(db.batches[0]) == ["alice", "bob"]
+    assert list(tmp_path.iterdir()) == []